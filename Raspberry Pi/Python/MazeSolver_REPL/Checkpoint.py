@@ -0,0 +1,165 @@
+"""
+探索の再開機能(ジャーナル + スナップショット)
+    journal.bin: 1ステップごとに(from_pico, tiles_moved, to_pico, run_tiles)の4byteを追記する(tiles_movedがNoneならTILES_MOVED_NONE)
+    snapshot.json + map_<ステップ数>.npy: snapshot_intervalステップごとの探索の状態とマップの配列
+        (ChunkedMazeMapのときはチャンクを重ねた配列)
+    再開するときは最新のスナップショットを読み込み(マップはnp.loadでメモリマップ)、
+    スナップショットより後のジャーナルだけをcalc_to_picoで再生するので、最初から探索し直す必要はない
+    NumPyはスナップショットを読み書きするときにimportする(ジャーナルだけなら使わない)
+"""
+
+
+import contextlib
+import json
+import os
+
+from MazeBackend import get_map_class
+from MazeConstants import *
+
+
+# ジャーナルの1ステップのbyte数(from_pico, tiles_moved, to_pico, run_tiles)
+JOURNAL_RECORD_SIZE = 4
+
+
+class Checkpoint():
+    """MazeSolverの状態をディレクトリに保存し、そこから戻すクラス
+    """
+
+    def __init__(self, directory: str, snapshot_interval: int = 50, fsync: bool = False):
+        """
+        Args:
+            directory (str): 保存するディレクトリ(なければ作る)
+            snapshot_interval (int, optional): スナップショットを保存するステップの間隔
+            fsync (bool, optional): 書き込むたびにディスクまで書き出すか(電源が切れても残るが遅い)
+        """
+        self.directory = directory
+        self.snapshot_interval = snapshot_interval
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+        self.journal_path = os.path.join(directory, "journal.bin")
+        self.snapshot_path = os.path.join(directory, "snapshot.json")
+        # 追記用のファイルディスクリプタ(最初にrecordしたときに開く)
+        self.journal_fd = None
+        # ジャーナルに書いたステップ数
+        self.steps = self.count_steps()
+
+    def count_steps(self) -> int:
+        """ジャーナルにあるステップ数を返す関数(途中で切れた最後のステップは数えない)"""
+        if not os.path.exists(self.journal_path):
+            return 0
+        return os.path.getsize(self.journal_path)//JOURNAL_RECORD_SIZE
+
+    def read_journal_bytes(self, start: int = 0) -> bytes:
+        """ジャーナルのstartステップ目からのbyte列を返す関数(途中で切れた最後のステップは含まない)"""
+        if not os.path.exists(self.journal_path):
+            return b""
+        with open(self.journal_path, "rb") as file:
+            file.seek(start*JOURNAL_RECORD_SIZE)
+            return file.read((self.steps-start)*JOURNAL_RECORD_SIZE)
+
+    def read_journal(self, start: int = 0) -> list[tuple[int, int, int, int]]:
+        """ジャーナルのstartステップ目からの(from_pico, tiles_moved, to_pico, run_tiles)のリストを返す関数"""
+        data = self.read_journal_bytes(start)
+        return list(zip(*(data[i::JOURNAL_RECORD_SIZE] for i in range(JOURNAL_RECORD_SIZE))))
+
+    def record(self, solver, from_pico: int, to_pico: int, tiles_moved: int | None = None):
+        """1ステップをジャーナルに追記し、snapshot_intervalステップごとにスナップショットを保存する関数
+
+        Args:
+            solver (MazeSolver): calc_to_picoを呼んだ後のMazeSolver(run_tilesも記録する)
+            from_pico (int): calc_to_picoに渡したデータ
+            to_pico (int): calc_to_picoが返したデータ
+            tiles_moved (int | None, optional): calc_to_picoに渡したtiles_moved
+        """
+        if self.journal_fd is None:
+            # 途中で切れた最後のステップを捨ててから追記する
+            self.journal_fd = os.open(self.journal_path, os.O_WRONLY | os.O_CREAT)
+            os.ftruncate(self.journal_fd, self.steps*JOURNAL_RECORD_SIZE)
+            os.lseek(self.journal_fd, 0, os.SEEK_END)
+        os.write(self.journal_fd, bytes((from_pico, TILES_MOVED_NONE if tiles_moved is None else tiles_moved, to_pico,
+                                         solver.run_tiles)))
+        if self.fsync:
+            os.fsync(self.journal_fd)
+        self.steps += 1
+        if self.steps % self.snapshot_interval == 0:
+            self.save_snapshot(solver)
+
+    def save_snapshot(self, solver):
+        """solverの今の状態をスナップショットとして保存する関数
+
+        マップの配列を書いてからsnapshot.jsonを置き換えるので、途中で止まっても前のスナップショットが残る
+        """
+        import numpy as np
+
+        map_path = os.path.join(self.directory, "map_{}.npy".format(self.steps))
+        with open(map_path, "wb") as file:
+            np.save(file, solver.map_maze.buffer)
+            if self.fsync:
+                file.flush()
+                os.fsync(file.fileno())
+        snapshot = {"steps": self.steps, "map": os.path.basename(map_path),
+                    "map_state": solver.map_maze.get_state(), "solver_state": solver.get_state()}
+        previous = self.load_snapshot()
+        with open(self.snapshot_path+".tmp", "w") as file:
+            json.dump(snapshot, file)
+            if self.fsync:
+                file.flush()
+                os.fsync(file.fileno())
+        os.replace(self.snapshot_path+".tmp", self.snapshot_path)
+        # 前のスナップショットのマップはもう使わない
+        if previous is not None and previous["map"] != snapshot["map"]:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(self.directory, previous["map"]))
+
+    def load_snapshot(self) -> dict | None:
+        """最新のスナップショット(snapshot.jsonの中身)を返す関数(なければNone)"""
+        if not os.path.exists(self.snapshot_path):
+            return None
+        with open(self.snapshot_path) as file:
+            return json.load(file)
+
+    def restore(self, solver) -> int | None:
+        """solverを最新のスナップショットの状態にし、その後のジャーナルを再生する関数
+
+        カメラで見つけた被災者はジャーナルにないので、記録したto_picoの被災者のbitをそのまま報告したことにして再生する(MazeSolver.replay)
+
+        Args:
+            solver (MazeSolver): 状態を戻すMazeSolver(作ったばかりのもの)
+
+        Raises:
+            RuntimeError: 再生したcalc_to_picoの結果がジャーナルと違う
+
+        Returns:
+            int | None: 最後にpicoに送ったデータ(ジャーナルが空ならNone)
+        """
+        snapshot = self.load_snapshot()
+        start = 0
+        if snapshot is not None:
+            start = snapshot["steps"]
+            import numpy as np
+
+            # 書き換えてもファイルは変わらないコピーオンライトでメモリマップする
+            buffer = np.load(os.path.join(self.directory, snapshot["map"]), mmap_mode="c")
+            map_class = get_map_class(snapshot["solver_state"].get("map_type", MAP_DENSE))
+            solver.set_state(snapshot["solver_state"], map_class.from_state(buffer, snapshot["map_state"]))
+        # (from_pico, tiles_moved)と(to_pico, run_tiles)に分けて、MazeSolver.replayでまとめて再生する
+        data = self.read_journal_bytes(start)
+        reports = bytearray(len(data)//2)
+        reports[0::2], reports[1::2] = data[0::JOURNAL_RECORD_SIZE], data[1::JOURNAL_RECORD_SIZE]
+        recorded = bytearray(len(data)//2)
+        recorded[0::2], recorded[1::2] = data[2::JOURNAL_RECORD_SIZE], data[3::JOURNAL_RECORD_SIZE]
+        replies = solver.replay(reports, frame_size=2, expected=recorded)[0]
+        if replies != recorded:
+            index = next((index for index in range(0, len(recorded), 2) if replies[index:index+2] != recorded[index:index+2]))
+            raise RuntimeError("journal step {} replayed to {}, recorded {:08b} x{}".format(
+                start+index//2, "{:08b} x{}".format(*replies[index:index+2]) if index < len(replies) else "the end",
+                *recorded[index:index+2]))
+        if self.steps == 0:
+            return None
+        return recorded[-2] if recorded else self.read_journal(self.steps-1)[0][2]
+
+    def close(self):
+        """ジャーナルを閉じる関数"""
+        if self.journal_fd is not None:
+            os.close(self.journal_fd)
+            self.journal_fd = None
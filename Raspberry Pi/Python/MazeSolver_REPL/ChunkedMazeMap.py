@@ -0,0 +1,154 @@
+"""
+固定の大きさのチャンクに分けて持つ迷路のマップのクラス
+    マップを(チャンクy, チャンクx)をキーにしたchunk_size x chunk_sizeの配列のdictで持ち、
+    最初に書き込んだときにそのチャンクだけを確保する(書き込んでいないところはfill)
+    どの方向にもいくらでも伸ばせ、伸ばすときに配列のコピーは起きない
+    細長く探索したときや坂の先の別のエリアに行ったときも、メモリは探索したところの大きさに比例する
+    座標とget・set(MazeMapBaseの関数)の意味はMazeMapと同じなので、MazeSolverではどちらも同じように使える
+"""
+
+
+import numpy as np
+
+from MazeConstants import *
+from MazeMapBase import MazeMapBase
+
+
+# チャンクの一辺のセルの数(2の累乗 偶数なのでチャンクの中のセルの種類(タイル・壁)の並びはどのチャンクも同じ)
+CHUNK_SIZE = 32
+
+
+class ChunkedMazeMap(MazeMapBase):
+    """チャンクに分けて持つ、四方向にいくらでも伸ばせるマップのクラス
+
+    使っている範囲(top_left, shape)はMazeMapと同じように伸ばすが、範囲は座標の見出しや経路計算の範囲に使うだけで、
+    配列を確保するのは書き込んだチャンクだけ
+    """
+
+    def __init__(self, map_maze=None, fill: int = 0, chunk_size: int = CHUNK_SIZE):
+        """
+        Args:
+            map_maze (optional): 最初のマップ(2次元配列) 左上が座標(0,0)になる(Noneなら空)
+            fill (int, optional): 書き込んでいないところの値
+            chunk_size (int, optional): チャンクの一辺のセルの数(2の累乗)
+        """
+        if chunk_size < 2 or chunk_size & (chunk_size-1):
+            raise ValueError("chunk_size must be a power of two: {}".format(chunk_size))
+        self.fill = fill
+        self.chunk_size = chunk_size
+        # 座標をチャンクの座標にするシフトの量と、チャンクの中のインデックスにするマスク
+        self.shift = chunk_size.bit_length()-1
+        self.mask = chunk_size-1
+        # (チャンクy, チャンクx)ごとの配列
+        self.chunks = {}
+        # 使っている範囲の左上の座標(y,x)と大きさ(y,x)
+        self.top_left = [0, 0]
+        self.shape = [0, 0]
+        if map_maze is not None:
+            map_maze = np.asarray(map_maze, dtype=np.uint8)
+            self.shape = list(map_maze.shape)
+            for position_y, position_x in zip(*np.nonzero(map_maze != fill)):
+                self[int(position_y), int(position_x)] = map_maze[position_y, position_x]
+
+    def __getitem__(self, position: tuple[int, int]) -> int:
+        chunk = self.chunks.get((position[0] >> self.shift, position[1] >> self.shift))
+        if chunk is None:
+            return self.fill
+        return chunk[position[0] & self.mask, position[1] & self.mask]
+
+    def __setitem__(self, position: tuple[int, int], value: int):
+        key = (position[0] >> self.shift, position[1] >> self.shift)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self.chunks[key] = np.full((self.chunk_size, self.chunk_size), self.fill, dtype=np.uint8)
+        chunk[position[0] & self.mask, position[1] & self.mask] = value
+
+    def reader(self):
+        """座標(y, x)を受け取ってセルの値を返す関数を返す関数(経路計算のループで使う)"""
+        chunks = self.chunks
+        shift = self.shift
+        mask = self.mask
+        fill = self.fill
+
+        def read(position_y: int, position_x: int) -> int:
+            chunk = chunks.get((position_y >> shift, position_x >> shift))
+            if chunk is None:
+                return fill
+            return chunk[position_y & mask, position_x & mask]
+        return read
+
+    def extend(self, north: int = 0, south: int = 0, west: int = 0, east: int = 0):
+        """使っている範囲を各方向に指定したセルの数だけ伸ばす関数(配列は確保もコピーもしない 引数はMazeMapと同じ)"""
+        self.top_left[0] -= north
+        self.top_left[1] -= west
+        self.shape[0] += north+south
+        self.shape[1] += west+east
+
+    @property
+    def buffer(self) -> np.ndarray:
+        """チャンクをget_stateのchunksの順に重ねた(チャンクの数, chunk_size, chunk_size)の配列(Checkpointで保存する用 コピー)"""
+        if not self.chunks:
+            return np.zeros((0, self.chunk_size, self.chunk_size), dtype=np.uint8)
+        return np.stack(list(self.chunks.values()))
+
+    def get_state(self) -> dict:
+        """チャンクの配列以外の情報(チャンクの座標と使っている範囲)をdictで返す関数"""
+        return {"fill": int(self.fill), "chunk_size": self.chunk_size, "chunks": [list(key) for key in self.chunks],
+                "top_left": list(self.top_left), "shape": list(self.shape)}
+
+    @classmethod
+    def from_state(cls, buffer: np.ndarray, state: dict) -> "ChunkedMazeMap":
+        """get_stateの結果とbufferからChunkedMazeMapを作る関数(チャンクはbufferをコピーしないビュー)
+
+        Args:
+            buffer (np.ndarray): bufferの配列(np.loadでメモリマップしたものなど)
+            state (dict): get_stateの結果
+
+        Returns:
+            ChunkedMazeMap: 作ったChunkedMazeMap
+        """
+        map_maze = cls(fill=state["fill"], chunk_size=state["chunk_size"])
+        map_maze.chunks = {tuple(key): buffer[index] for index, key in enumerate(state["chunks"])}
+        map_maze.top_left = list(state["top_left"])
+        map_maze.shape = list(state["shape"])
+        return map_maze
+
+    def copy(self) -> "ChunkedMazeMap":
+        """チャンクごとコピーしたChunkedMazeMapを返す関数(コピーを書き換えても元のマップは変わらない)"""
+        map_maze = ChunkedMazeMap(fill=self.fill, chunk_size=self.chunk_size)
+        map_maze.chunks = {key: chunk.copy() for key, chunk in self.chunks.items()}
+        map_maze.top_left = list(self.top_left)
+        map_maze.shape = list(self.shape)
+        return map_maze
+
+    def iter_blocks(self):
+        """使っている範囲のうち確保したチャンクの部分を(左上の座標(y,x), 配列)で順に返す関数(配列はコピーしないビュー)"""
+        top, left = self.top_left
+        bottom, right = top+self.shape[0], left+self.shape[1]
+        for (chunk_y, chunk_x), chunk in self.chunks.items():
+            chunk_top, chunk_left = chunk_y << self.shift, chunk_x << self.shift
+            block_top, block_left = max(chunk_top, top), max(chunk_left, left)
+            block_bottom = min(chunk_top+self.chunk_size, bottom)
+            block_right = min(chunk_left+self.chunk_size, right)
+            if block_top < block_bottom and block_left < block_right:
+                yield ((block_top, block_left),
+                       chunk[block_top-chunk_top:block_bottom-chunk_top, block_left-chunk_left:block_right-chunk_left])
+
+    def view(self) -> np.ndarray:
+        """使っている範囲の配列を返す関数
+
+        MazeMapと違い、確保したチャンクを1つの配列に並べたコピーなので、書き換えてもマップは変わらない
+
+        Returns:
+            np.ndarray: 左上が座標top_leftに対応する配列
+        """
+        array = np.full(self.shape, self.fill, dtype=np.uint8)
+        for (block_top, block_left), block in self.iter_blocks():
+            block_top -= self.top_left[0]
+            block_left -= self.top_left[1]
+            array[block_top:block_top+block.shape[0], block_left:block_left+block.shape[1]] = block
+        return array
+
+    def nbytes(self) -> int:
+        """チャンクの配列のbyte数の合計"""
+        return len(self.chunks)*self.chunk_size*self.chunk_size
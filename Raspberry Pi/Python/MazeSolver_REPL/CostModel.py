@@ -0,0 +1,160 @@
+"""
+経路計算のコスト(動作にかかる時間[ms])のモデル
+    タイルに入る時間(普通・銀・バンプ/坂)と回転の時間(左右90度・180度)を持ち、すべての経路計算で使う
+    JSONの設定ファイルから読み込める
+        {"move": 1000, "silver": 1000, "bump_slope": 5000, "turn": 500, "u_turn": 900}
+    ロボットで記録したステップごとの時間(MazeLoggerのrecord_path)から最小二乗法で合わせられる
+    NumPyはWavefront用の配列(tile_cost_array)と最小二乗法を使うときだけimportする
+
+    python CostModel.py calibrate records.bin -o costs.json   記録からコストを求めて設定ファイルに書く
+"""
+
+
+import argparse
+import json
+
+from MazeConstants import *
+
+
+# 設定ファイルのキー
+COST_KEYS = ("move", "silver", "bump_slope", "turn", "u_turn")
+
+
+class CostModel():
+    """動作ごとのコスト[ms]のクラス
+
+    経路計算で小数の誤差が出ないように、コストはすべて整数にする
+    """
+
+    def __init__(self, move: int = COST_MOVE, silver: int = COST_SILVER, bump_slope: int = COST_BUMP,
+                 turn: int = COST_TURN, u_turn: int = COST_U_TURN):
+        """
+        Args:
+            move (int, optional): 普通のタイルに進む時間[ms]
+            silver (int, optional): 銀タイルに進む時間[ms]
+            bump_slope (int, optional): バンプ/坂のタイルを越える時間[ms]
+            turn (int, optional): 左右に90度回転する時間[ms]
+            u_turn (int, optional): 180度回転する時間[ms]
+        """
+        self.move = int(round(move))
+        self.silver = int(round(silver))
+        self.bump_slope = int(round(bump_slope))
+        self.turn = int(round(turn))
+        self.u_turn = int(round(u_turn))
+        # ロボットから見た向き(FRONT, LEFT, BACK, RIGHT)ごとの回転のコスト
+        self.turn_costs = (0, self.turn, self.u_turn, self.turn)
+        # タイルの値ごとの入るコスト(入れるかどうかは経路計算の側で決める 未探索タイルはゴールのときだけ入る)
+        tile_costs = [self.move]*256
+        tile_costs[TILE_SILVER] = self.silver
+        tile_costs[TILE_BUMP_SLOPE] = self.bump_slope
+        self.tile_costs = tuple(tile_costs)
+        # tile_costsのNumPyの配列(最初に使うときに作る)
+        self._tile_cost_array = None
+        # 1タイル進む最小のコスト(A*探索の推定コスト用)
+        self.min_move = min(self.move, self.silver, self.bump_slope)
+
+    @property
+    def tile_cost_array(self):
+        """タイルの値ごとの入るコストのNumPyの配列(Wavefront用)"""
+        if self._tile_cost_array is None:
+            import numpy as np
+            self._tile_cost_array = np.array(self.tile_costs, dtype=np.int64)
+        return self._tile_cost_array
+
+    def __repr__(self) -> str:
+        return "CostModel({})".format(", ".join("{}={}".format(key, value) for key, value in self.to_dict().items()))
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, CostModel) and self.to_dict() == other.to_dict()
+
+    def to_dict(self) -> dict:
+        return {key: getattr(self, key) for key in COST_KEYS}
+
+    @classmethod
+    def from_dict(cls, costs: dict) -> "CostModel":
+        """dict(キーはCOST_KEYS、ないものは初期値)からCostModelを作る関数"""
+        unknown = set(costs)-set(COST_KEYS)
+        if unknown:
+            raise ValueError("unknown cost keys: {}".format(", ".join(sorted(unknown))))
+        return cls(**costs)
+
+    @classmethod
+    def load(cls, path: str) -> "CostModel":
+        """JSONの設定ファイルから読み込む関数"""
+        with open(path) as file:
+            return cls.from_dict(json.load(file))
+
+    def save(self, path: str):
+        """JSONの設定ファイルに書き出す関数"""
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+    @classmethod
+    def calibrate(cls, records: list[tuple], initial: "CostModel | None" = None) -> "CostModel":
+        """ステップごとの記録の時刻の差から、最小二乗法でコストを求める関数
+
+        k番目の記録から次の記録までを、k番目のto_picoの動作(回転と前進)にかかった時間とする
+        次のfrom_picoで、入ったタイルがバンプ/坂(その先のタイルまで進む)か銀タイルかがわかる
+        黒タイルに入って戻ったステップは使わない
+        記録にない動作(例えば一度も180度回転していない)のコストはinitialのままにする
+        1タイルずつの指示(MazeSolverのmax_runが1)で記録したものを使う
+
+        Args:
+            records (list[tuple]): MazeLogger.read_recordsの結果
+            initial (CostModel | None, optional): 記録にない動作に使うコスト(Noneなら初期値)
+
+        Returns:
+            CostModel: 求めたコスト
+        """
+        import numpy as np
+
+        initial = cls() if initial is None else initial
+        # 行: ステップ, 列: COST_KEYSの動作の回数
+        features = []
+        durations = []
+        for record, record_next in zip(records, records[1:]):
+            from_pico_next = record_next[1]
+            if from_pico_next >> BLACK & 1:
+                continue
+            count = dict.fromkeys(COST_KEYS, 0)
+            direction_from_robot = MOVE_DIRECTIONS[record[2] & MOVE_BACK]
+            if direction_from_robot == BACK:
+                count["u_turn"] += 1
+            elif direction_from_robot != FRONT:
+                count["turn"] += 1
+            if from_pico_next >> BUMP_SLOPE & 1:
+                count["bump_slope"] += 1
+            count["silver" if from_pico_next >> SILVER & 1 else "move"] += 1
+            features.append([count[key] for key in COST_KEYS])
+            durations.append(record_next[-1]-record[-1])
+        costs = initial.to_dict()
+        if not features:
+            return cls.from_dict(costs)
+        features = np.array(features, dtype=float)
+        durations = np.array(durations, dtype=float)*1000
+        # 記録にある動作だけを求め、ない動作はinitialの時間を引いておく
+        observed = features.any(axis=0)
+        fixed = np.array([costs[key] for key in COST_KEYS], dtype=float)
+        durations -= features[:, ~observed] @ fixed[~observed]
+        solution = np.linalg.lstsq(features[:, observed], durations, rcond=None)[0]
+        for key, value in zip(np.array(COST_KEYS)[observed], solution):
+            costs[str(key)] = max(float(value), 0)
+        return cls.from_dict(costs)
+
+
+if __name__ == "__main__":
+    from MazeLogger import read_records
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    parser_calibrate = subparsers.add_parser("calibrate", help="ステップごとの記録からコストを求める")
+    parser_calibrate.add_argument("records", help="MazeLoggerのrecord_pathのファイル")
+    parser_calibrate.add_argument("--initial", help="記録にない動作に使う設定ファイル")
+    parser_calibrate.add_argument("-o", "--output", help="書き出す設定ファイル(省略すると表示だけ)")
+    args = parser.parse_args()
+
+    initial = CostModel.load(args.initial) if args.initial else None
+    cost_model = CostModel.calibrate(read_records(args.records), initial)
+    print(cost_model)
+    if args.output:
+        cost_model.save(args.output)
@@ -0,0 +1,175 @@
+"""
+探索の方針(どの未探索タイルに進むか)のクラス
+    calc_to_picoは、経路をたどっていないときにchoose_moveで隣の未探索タイルに進む向きを聞き、
+    進めない(行き止まり)ときはchoose_routeで次に向かう未探索タイルまでの経路を聞く
+    どちらもMazeSolverのマップ・位置・向き・未探索タイル(unknown_tiles)を読むだけで書き換えない
+    SpeculativePlannerのコピーからも呼ぶので、方針のクラスは状態を持たない
+
+    FRONTIER_LIFO: 右手法で進み、行き止まりでは最後に見つけた未探索タイルに向かう(RightHandLifoStrategy)
+    FRONTIER_NEAREST: 右手法で進み、行き止まりでは経路のコストが最小の未探索タイルに向かう(NearestFrontierStrategy)
+    FRONTIER_INFORMATION_GAIN: 新しくわかりそうなタイルの数/経路のコストが最大の未探索タイルに向かう(InformationGainStrategy)
+
+    新しい方針はExplorationStrategyを継承してSTRATEGIESに登録すると、MazeSolverのfrontier_strategyで選べる
+"""
+
+
+import heapq
+
+from MazeConstants import *
+
+
+class ExplorationStrategy():
+    """探索の方針の基底クラス(隣のタイルは右手法で選ぶ)
+    """
+
+    def choose_move(self, solver) -> int | None:
+        """隣の未探索タイルに進むときのロボットから見た向きを返す関数(右・前・左の順に、壁がなく未探索のタイル)
+
+        Args:
+            solver (MazeSolver): 今のタイルのマップを書き込んだMazeSolver
+
+        Returns:
+            int | None: RIGHT, FRONT, LEFTのどれか(行き止まりならNone)
+        """
+        for direction_from_robot in (RIGHT, FRONT, LEFT):
+            if (not solver.is_wall(solver.position, solver.direction, direction_from_robot)
+                    and solver.get_map(solver.position, solver.direction, direction_from_robot, True) == TILE_UNEXPLORED):
+                return direction_from_robot
+        return None
+
+    def choose_route(self, solver) -> list:
+        """行き止まりで次に向かう未探索タイルまでの経路を返す関数(unknown_tilesは空でない)
+
+        Args:
+            solver (MazeSolver): 行き止まりになったMazeSolver
+
+        Returns:
+            list: 経路(通るタイルのpositionのリスト 最後が向かう未探索タイル 到達できなければ空)
+        """
+        raise NotImplementedError
+
+
+class RightHandLifoStrategy(ExplorationStrategy):
+    """右手法で進み、行き止まりでは最後に見つけた未探索タイルに向かう方針
+    """
+
+    def choose_route(self, solver) -> list:
+        return solver.calc_path(solver.position, solver.unknown_tiles.last())
+
+
+class NearestFrontierStrategy(ExplorationStrategy):
+    """右手法で進み、行き止まりでは経路のコストが最小の未探索タイルに向かう方針
+    """
+
+    def choose_route(self, solver) -> list:
+        return solver.calc_path_to_nearest(solver.position, solver.unknown_tiles)
+
+
+class InformationGainStrategy(ExplorationStrategy):
+    """新しくわかりそうなタイルの数(情報の利得)を移動のコストで割ったものが最大のタイルに向かう方針
+
+    利得は、そのタイル自身と、壁があるとわかっていない隣のまだ見ていない(TILE_UNKNOWN)タイルの数(1~4)
+    """
+
+    # 利得の最大(そのタイルと隣の3つのタイル 来た方向は見ている)
+    MAX_GAIN = 4
+
+    def calc_gain(self, solver, position: tuple[int, int]) -> int:
+        """positionの未探索タイルに入ると新しくわかりそうなタイルの数を返す関数"""
+        map_maze = solver.map_maze
+        gain = 1
+        for direction in range(4):
+            wall = (position[y]+MV[direction][y], position[x]+MV[direction][x])
+            tile = (position[y]+MV[direction][y]*2, position[x]+MV[direction][x]*2)
+            if map_maze.contains(wall) and map_maze.is_wall(wall):
+                continue
+            if not map_maze.contains(tile) or map_maze[tile] == TILE_UNKNOWN:
+                gain += 1
+        return min(gain, self.MAX_GAIN)
+
+    def choose_move(self, solver) -> int | None:
+        """隣の未探索タイルのうち利得が最大のタイルに進む向きを返す関数(同じなら右・前・左の順)"""
+        best = None
+        best_gain = 0
+        for direction_from_robot in (RIGHT, FRONT, LEFT):
+            if (not solver.is_wall(solver.position, solver.direction, direction_from_robot)
+                    and solver.get_map(solver.position, solver.direction, direction_from_robot, True) == TILE_UNEXPLORED):
+                gain = self.calc_gain(solver, solver.get_map_position(solver.position, solver.direction,
+                                                                      direction_from_robot, True))
+                if gain > best_gain:
+                    best = direction_from_robot
+                    best_gain = gain
+        return best
+
+    def choose_route(self, solver) -> list:
+        """利得/コストが最大の未探索タイルまでの経路を返す関数(同じならコストが小さい方)
+
+        (タイル, 向き)のダイクストラ法でコストが小さい順に未探索タイルを確定していき、
+        これから確定するタイルの利得/コストが今の最大を超えられなくなったところで止める
+        """
+        read = solver.map_maze.reader()
+        top, left = solver.map_maze.top_left
+        bottom, right = top+solver.map_size[y]*2, left+solver.map_size[x]*2
+        turn_costs = solver.cost_model.turn_costs
+        tile_costs = solver.cost_model.tile_costs
+        goals = solver.unknown_tiles
+        start_state = (solver.position[y], solver.position[x], solver.direction % 4)
+        costs = {start_state: 0}
+        queue = [(0, *start_state)]
+        reached = set()
+        best = None
+        best_score = 0
+        while queue:
+            cost, position_y, position_x, direction = heapq.heappop(queue)
+            if cost > costs[(position_y, position_x, direction)]:
+                continue
+            if best is not None and self.MAX_GAIN/cost <= best_score:
+                break
+            if (position_y, position_x) in goals:
+                # 未探索タイルには入るだけで、その先には進まない
+                if (position_y, position_x) not in reached:
+                    reached.add((position_y, position_x))
+                    score = self.calc_gain(solver, (position_y, position_x))/cost
+                    if score > best_score:
+                        best = (position_y, position_x)
+                        best_score = score
+                continue
+            for direction_from_robot in (FRONT, RIGHT, LEFT, BACK):
+                direction_next = (direction+direction_from_robot) % 4
+                if read(position_y+MV[direction_next][y], position_x+MV[direction_next][x]) & MASK_WALL_EXIST == WALL_EXIST:
+                    continue
+                next_y = position_y+MV[direction_next][y]*2
+                next_x = position_x+MV[direction_next][x]*2
+                if not (top < next_y < bottom and left < next_x < right):
+                    continue
+                tile = read(next_y, next_x)
+                if tile in (TILE_UNKNOWN, TILE_UNEXPLORED, TILE_BLACK) and (next_y, next_x) not in goals:
+                    continue
+                cost_next = cost+turn_costs[direction_from_robot]+tile_costs[tile]
+                state_next = (next_y, next_x, direction_next)
+                if cost_next < costs.get(state_next, float('inf')):
+                    costs[state_next] = cost_next
+                    heapq.heappush(queue, (cost_next, *state_next))
+        if best is None:
+            return []
+        # 経路はMazeSolverの経路計算(plannerの設定)で求める
+        return solver.calc_path(solver.position, best)
+
+
+# frontier_strategyごとの方針のクラス
+STRATEGIES = {
+    FRONTIER_LIFO: RightHandLifoStrategy,
+    FRONTIER_NEAREST: NearestFrontierStrategy,
+    FRONTIER_INFORMATION_GAIN: InformationGainStrategy,
+}
+
+
+def make_strategy(frontier_strategy: int) -> ExplorationStrategy:
+    """frontier_strategy(FRONTIER_*かSTRATEGIESに登録したキー)の方針を作る関数
+
+    Raises:
+        ValueError: STRATEGIESにないfrontier_strategy
+    """
+    if frontier_strategy not in STRATEGIES:
+        raise ValueError("unknown frontier_strategy: {}".format(frontier_strategy))
+    return STRATEGIES[frontier_strategy]()
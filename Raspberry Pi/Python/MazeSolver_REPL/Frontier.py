@@ -0,0 +1,58 @@
+"""
+未探索タイル(フロンティア)の集合のクラス
+    dictのキーに座標を入れることで、追加・含まれるか・削除をO(1)で行い、追加した順番も保つ
+"""
+
+
+class Frontier():
+    """未探索タイルの集合のクラス
+
+    座標は(y,x)のlistでもtupleでもよい 取り出すときはlistで返す
+    """
+
+    def __init__(self, positions=()):
+        """
+        Args:
+            positions (optional): 最初に追加する座標
+        """
+        # 座標(y,x)のtupleをキーにしたdict(値は使わない)
+        self.tiles = dict.fromkeys(tuple(position) for position in positions)
+
+    def __len__(self) -> int:
+        return len(self.tiles)
+
+    def __contains__(self, position) -> bool:
+        return tuple(position) in self.tiles
+
+    def __iter__(self):
+        for position in self.tiles:
+            yield list(position)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+    def add(self, position):
+        """positionを追加する関数(すでにあれば一番新しいものにする)
+
+        Args:
+            position: 追加する座標(y,x)
+        """
+        position = tuple(position)
+        self.tiles.pop(position, None)
+        self.tiles[position] = None
+
+    def discard(self, position):
+        """positionがあれば削除する関数
+
+        Args:
+            position: 削除する座標(y,x)
+        """
+        self.tiles.pop(tuple(position), None)
+
+    def last(self) -> list[int, int]:
+        """一番最後に追加した座標を返す関数
+
+        Returns:
+            list[int,int]: 座標(y,x)
+        """
+        return list(next(reversed(self.tiles)))
@@ -0,0 +1,210 @@
+"""
+インクリメンタルな経路計算のクラス(D* Liteの考え方)
+    ゴールから逆向きに(タイル, 向き)ごとのゴールまでのコスト(g)を求めておき、呼び出しをまたいで使い回す
+    壁やタイルが変わったときは、変わったところの周りの状態だけを直す
+    ゴールを根にしているので、ロボットが動いても計算し直す必要はない
+"""
+
+
+import heapq
+
+from CostModel import CostModel
+from MazeConstants import *
+
+
+INF = float('inf')
+
+
+class IncrementalPlanner():
+    """ゴールまでのコストを保持し、マップの変化に合わせて直しながら経路を計算するクラス
+    """
+
+    def __init__(self, map_maze, goal_position: tuple[int, int], cost_model: CostModel | None = None):
+        """
+        Args:
+            map_maze (MazeMap): 経路を計算するマップ
+            goal_position (tuple[int, int]): ゴールの位置
+            cost_model (CostModel | None, optional): 動作のコスト(Noneなら初期値)
+        """
+        self.map_maze = map_maze
+        self.cost_model = CostModel() if cost_model is None else cost_model
+        # ロボットから見た向き(FRONT, LEFT, BACK, RIGHT)ごとの回転のコスト
+        self.turn_costs = self.cost_model.turn_costs
+        self.goal = (goal_position[y], goal_position[x])
+        # 状態(y, x, 向き)ごとのゴールまでのコスト
+        self.g = {}
+        # 1つ先の状態から求めたゴールまでのコスト
+        self.rhs = {}
+        # (キー, 状態)の優先度付きキュー(古いものは取り出したときに読み飛ばす)
+        self.queue = []
+        # 前回の計算から変わったセル
+        self.changed_cells = set()
+        # キューから取り出して処理した状態の数(プロファイラ用)
+        self.expanded = 0
+        for direction in range(4):
+            state = (self.goal[0], self.goal[1], direction)
+            self.rhs[state] = 0
+            heapq.heappush(self.queue, (0, state))
+
+    def notify(self, position: tuple[int, int]):
+        """マップのセル(壁かタイル)が変わったことを知らせる関数
+
+        Args:
+            position (tuple[int, int]): 変わったセルの座標(y,x)
+        """
+        self.changed_cells.add((position[y], position[x]))
+
+    def get_cell(self, position_y: int, position_x: int) -> int:
+        """マップの範囲外ならUNKNOWNを返すget"""
+        if self.map_maze.contains((position_y, position_x)):
+            return self.map_maze[position_y, position_x]
+        return UNKNOWN
+
+    def is_standable(self, position_y: int, position_x: int) -> bool:
+        """ロボットがいられる(探索済みで黒タイルでない)タイルか"""
+        return self.get_cell(position_y, position_x) not in (TILE_UNKNOWN, TILE_UNEXPLORED, TILE_BLACK)
+
+    def calc_move_cost(self, position_y: int, position_x: int, direction: int) -> float:
+        """タイルからdirectionの方向の隣のタイルに入るコスト(入れなければinf)
+
+        Args:
+            position_y (int): 出発するタイルのy座標
+            position_x (int): 出発するタイルのx座標
+            direction (int): 移動する絶対的な向き
+
+        Returns:
+            float: 移動のコスト(回転は含まない)
+        """
+        if self.get_cell(position_y+MV[direction][y], position_x+MV[direction][x]) & MASK_WALL_EXIST == WALL_EXIST:
+            return INF
+        next_y = position_y+MV[direction][y]*2
+        next_x = position_x+MV[direction][x]*2
+        tile = self.get_cell(next_y, next_x)
+        if tile in (TILE_UNKNOWN, TILE_UNEXPLORED, TILE_BLACK) and (next_y, next_x) != self.goal:
+            return INF
+        return self.cost_model.tile_costs[tile]
+
+    def calc_key(self, state: tuple[int, int, int]) -> float:
+        return min(self.g.get(state, INF), self.rhs.get(state, INF))
+
+    def update_state(self, state: tuple[int, int, int]):
+        """stateのrhsを1つ先の状態から求め直し、gと違えばキューに入れる関数"""
+        position_y, position_x, direction = state
+        if (position_y, position_x) != self.goal:
+            rhs = INF
+            if self.is_standable(position_y, position_x):
+                for direction_next in range(4):
+                    cost = self.calc_move_cost(position_y, position_x, direction_next)
+                    if cost == INF:
+                        continue
+                    state_next = (position_y+MV[direction_next][y]*2, position_x+MV[direction_next][x]*2, direction_next)
+                    rhs = min(rhs, self.turn_costs[(direction_next-direction) % 4]+cost+self.g.get(state_next, INF))
+            if rhs == INF:
+                self.rhs.pop(state, None)
+            else:
+                self.rhs[state] = rhs
+        if self.g.get(state, INF) != self.rhs.get(state, INF):
+            heapq.heappush(self.queue, (self.calc_key(state), state))
+
+    def update_predecessors(self, state: tuple[int, int, int]):
+        """stateに1回の移動で入れる状態をすべてupdate_stateする関数"""
+        position_y, position_x, direction = state
+        previous_y = position_y-MV[direction][y]*2
+        previous_x = position_x-MV[direction][x]*2
+        if not self.is_standable(previous_y, previous_x):
+            return
+        if self.calc_move_cost(previous_y, previous_x, direction) == INF:
+            return
+        for direction_previous in range(4):
+            self.update_state((previous_y, previous_x, direction_previous))
+
+    def apply_changes(self):
+        """変わったセルの周りの状態を直す関数"""
+        positions = set()
+        for position_y, position_x in self.changed_cells:
+            # タイル: そのタイルと隣のタイル
+            if position_y % 2 == 1 and position_x % 2 == 1:
+                positions.add((position_y, position_x))
+                for direction in range(4):
+                    positions.add((position_y+MV[direction][y]*2, position_x+MV[direction][x]*2))
+            # 壁: 壁をはさむ2つのタイル
+            elif position_y % 2 == 1:
+                positions.add((position_y, position_x-1))
+                positions.add((position_y, position_x+1))
+            else:
+                positions.add((position_y-1, position_x))
+                positions.add((position_y+1, position_x))
+        self.changed_cells.clear()
+        for position_y, position_x in positions:
+            for direction in range(4):
+                self.update_state((position_y, position_x, direction))
+
+    def compute(self, start_state: tuple[int, int, int]):
+        """start_stateのコストが確定するまでキューを処理する関数"""
+        while self.queue:
+            key, state = self.queue[0]
+            if key >= self.calc_key(start_state) and self.g.get(start_state, INF) == self.rhs.get(start_state, INF):
+                break
+            heapq.heappop(self.queue)
+            g = self.g.get(state, INF)
+            rhs = self.rhs.get(state, INF)
+            # 古いキーか、すでに整合している
+            if g == rhs or key != min(g, rhs):
+                continue
+            self.expanded += 1
+            if g > rhs:
+                self.g[state] = rhs
+            else:
+                self.g.pop(state, None)
+                self.update_state(state)
+            self.update_predecessors(state)
+
+    def calc_cost(self, start_position: tuple[int, int], start_direction: int) -> float:
+        """start_positionからゴールまでのコストを返す関数
+
+        Args:
+            start_position (tuple[int, int]): 開始位置
+            start_direction (int): 開始時の機体の向き
+
+        Returns:
+            float: コスト(到達できなければinf)
+        """
+        start_state = (start_position[y], start_position[x], start_direction % 4)
+        self.apply_changes()
+        self.update_state(start_state)
+        self.compute(start_state)
+        return self.g.get(start_state, INF)
+
+    def calc_path(self, start_position: tuple[int, int], start_direction: int) -> list:
+        """start_positionからゴールまでの最短経路を計算する関数
+
+        Args:
+            start_position (tuple[int, int]): 開始位置
+            start_direction (int): 開始時の機体の向き
+
+        Returns:
+            list: 最短経路(通るタイルのpositionのリスト 開始位置は含まずゴールは含む 到達できなければ空)
+        """
+        if self.calc_cost(start_position, start_direction) == INF:
+            return []
+        state = (start_position[y], start_position[x], start_direction % 4)
+        path = []
+        # コストが最小になる次の状態をたどる(FRONT, RIGHT, LEFT, BACKの順に優先)
+        while (state[0], state[1]) != self.goal:
+            best = None
+            min_cost = INF
+            for direction_from_robot in (FRONT, RIGHT, LEFT, BACK):
+                direction_next = (state[2]+direction_from_robot) % 4
+                cost = self.calc_move_cost(state[0], state[1], direction_next)
+                if cost == INF:
+                    continue
+                state_next = (state[0]+MV[direction_next][y]*2, state[1]+MV[direction_next][x]*2, direction_next)
+                cost += self.turn_costs[direction_from_robot]+self.g.get(state_next, INF)
+                if cost < min_cost:
+                    min_cost = cost
+                    best = state_next
+            if best is None:
+                return []
+            path.append([best[0], best[1]])
+            state = best
+        return path
@@ -0,0 +1,135 @@
+"""
+NumPyを使わない迷路のマップのクラス
+    MazeMapと同じく使っている範囲より大きいバッファを確保し、原点のオフセットで座標を変換するが、
+    バッファは標準ライブラリのbytearray(行を順に並べた1次元)で持つので、importにNumPyがいらない
+    Raspberry Piでは起動してから最初の動作までの時間の多くがNumPyのimportなので、探索だけならこちらの方が速く始められる
+    配列で一度に計算するところ(view, buffer)を使ったときだけNumPyをimportし、bytearrayをコピーせずに配列として見せる
+"""
+
+
+from MazeConstants import *
+from MazeMapBase import MazeMapBase
+
+
+class LiteMazeMap(MazeMapBase):
+    """四方向に伸ばせるマップのクラス(bytearray) 関数と座標はMazeMapと同じ
+    """
+
+    def __init__(self, map_maze, fill: int = 0):
+        """
+        Args:
+            map_maze: 最初のマップ(2次元のリストや配列) 左上が座標(0,0)になる
+            fill (int, optional): 伸ばしたところに入れる値
+        """
+        rows = [bytes(bytearray(int(value) for value in row)) for row in map_maze]
+        # 実際にデータを持つ1次元のバッファ(buffer_shape[1]ずつの行を順に並べる)
+        self.data = bytearray(b"".join(rows))
+        self.buffer_shape = [len(rows), len(rows[0]) if rows else 0]
+        # 伸ばしたところに入れる値
+        self.fill = fill
+        # 座標(0,0)のバッファの中でのインデックス(y,x)
+        self.origin = [0, 0]
+        # 使っている範囲の左上の座標(y,x)
+        self.top_left = [0, 0]
+        # 使っている範囲の大きさ(y,x)
+        self.shape = list(self.buffer_shape)
+
+    def __getitem__(self, position: tuple[int, int]) -> int:
+        return self.data[(position[0]+self.origin[0])*self.buffer_shape[1]+position[1]+self.origin[1]]
+
+    def __setitem__(self, position: tuple[int, int], value: int):
+        self.data[(position[0]+self.origin[0])*self.buffer_shape[1]+position[1]+self.origin[1]] = value
+
+    def reader(self):
+        """座標(y, x)を受け取ってセルの値を返す関数を返す関数(経路計算のループで使う マップを伸ばしたら作り直す)"""
+        data = self.data
+        width = self.buffer_shape[1]
+        # 座標(0,0)のバッファの中での位置
+        offset = self.origin[0]*width+self.origin[1]
+
+        def read(position_y: int, position_x: int) -> int:
+            return data[position_y*width+position_x+offset]
+        return read
+
+    def reserve(self, north: int = 0, south: int = 0, west: int = 0, east: int = 0):
+        """各方向に指定したセルの数だけ伸ばせるようにバッファを確保する関数(MazeMap.reserveと同じ)
+
+        足りないときは倍の大きさのバッファを確保し直し、使っている範囲を真ん中に1行ずつコピーする
+        """
+        height_old, width_old = self.buffer_shape
+        top = self.top_left[0]+self.origin[0]
+        left = self.top_left[1]+self.origin[1]
+        bottom = top+self.shape[0]
+        right = left+self.shape[1]
+        if top >= north and left >= west and bottom+south <= height_old and right+east <= width_old:
+            return
+        # 倍の大きさで確保し、余りを上下(左右)に半分ずつ分ける
+        height = max(height_old*2, self.shape[0]+north+south)
+        width = max(width_old*2, self.shape[1]+west+east)
+        top_new = north+(height-self.shape[0]-north-south)//2
+        left_new = west+(width-self.shape[1]-west-east)//2
+        data = bytearray([self.fill])*(height*width)
+        for row in range(self.shape[0]):
+            start = (top+row)*width_old+left
+            start_new = (top_new+row)*width+left_new
+            data[start_new:start_new+self.shape[1]] = self.data[start:start+self.shape[1]]
+        self.data = data
+        self.buffer_shape = [height, width]
+        self.origin = [top_new-self.top_left[0], left_new-self.top_left[1]]
+
+    @property
+    def buffer(self):
+        """バッファを(y, x)のNumPyの配列として見せる(コピーしないので書き換えるとマップも変わる NumPyをimportする)"""
+        import numpy as np
+        return np.frombuffer(self.data, dtype=np.uint8).reshape(self.buffer_shape)
+
+    def get_state(self) -> dict:
+        """バッファの外側の情報(座標の変換と使っている範囲)をdictで返す関数(MazeMap.get_stateと同じ)"""
+        return {"fill": int(self.fill), "origin": list(self.origin), "top_left": list(self.top_left), "shape": list(self.shape)}
+
+    @classmethod
+    def from_state(cls, buffer, state: dict) -> "LiteMazeMap":
+        """get_stateの結果とbufferからLiteMazeMapを作る関数(MazeMapのスナップショットも読める)
+
+        Args:
+            buffer: (y, x)のuint8の配列(np.loadしたものなど bytearrayにコピーする)
+            state (dict): get_stateの結果
+
+        Returns:
+            LiteMazeMap: 作ったLiteMazeMap
+        """
+        map_maze = cls([], state["fill"])
+        map_maze.data = bytearray(memoryview(buffer).cast("B"))
+        map_maze.buffer_shape = list(buffer.shape)
+        map_maze.origin = list(state["origin"])
+        map_maze.top_left = list(state["top_left"])
+        map_maze.shape = list(state["shape"])
+        return map_maze
+
+    def copy(self) -> "LiteMazeMap":
+        """バッファごとコピーしたLiteMazeMapを返す関数(コピーを書き換えても元のマップは変わらない)"""
+        map_maze = LiteMazeMap([], self.fill)
+        map_maze.data = bytearray(self.data)
+        map_maze.buffer_shape = list(self.buffer_shape)
+        map_maze.origin = list(self.origin)
+        map_maze.top_left = list(self.top_left)
+        map_maze.shape = list(self.shape)
+        return map_maze
+
+    def view(self):
+        """使っている範囲のNumPyの配列を返す関数(コピーしないので書き換えるとマップも変わる NumPyをimportする)
+
+        Returns:
+            np.ndarray: 左上が座標top_leftに対応する配列
+        """
+        top = self.top_left[0]+self.origin[0]
+        left = self.top_left[1]+self.origin[1]
+        return self.buffer[top:top+self.shape[0], left:left+self.shape[1]]
+
+    def iter_blocks(self):
+        """使っている範囲を(左上の座標(y,x), 配列)で返す関数(MazeMapと同じく範囲全体の1つだけ)"""
+        yield (self.top_left[0], self.top_left[1]), self.view()
+
+    def nbytes(self) -> int:
+        """バッファのbyte数"""
+        return len(self.data)
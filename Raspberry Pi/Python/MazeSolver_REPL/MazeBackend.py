@@ -0,0 +1,57 @@
+"""
+マップの実装(バックエンド)の選び方
+    numpy: NumPyの配列で持つMazeMap
+    lite: 標準ライブラリのbytearrayで持つLiteMazeMap(NumPyをimportしないので起動が速い)
+    環境変数MAZE_BACKEND(numpy, lite, auto)で選ぶ 省略したときはauto
+        auto: すでにNumPyをimportしていればnumpy、していなければlite
+    どちらのときも、Wavefront・MazeRenderer・Checkpointなど配列で一度に計算するところは、使ったときにNumPyをimportする
+    ChunkedMazeMap(MAP_CHUNKED)はチャンクがNumPyの配列なので、バックエンドによらずNumPyを使う
+
+    MAZE_BACKEND=lite python main.py /dev/ttyACM0
+"""
+
+
+import os
+import sys
+
+from MazeConstants import *
+
+
+BACKEND_NUMPY = "numpy"
+BACKEND_LITE = "lite"
+BACKEND_AUTO = "auto"
+BACKENDS = (BACKEND_NUMPY, BACKEND_LITE, BACKEND_AUTO)
+
+
+def get_backend() -> str:
+    """環境変数MAZE_BACKENDからバックエンド(BACKEND_NUMPYかBACKEND_LITE)を決める関数
+
+    Raises:
+        ValueError: MAZE_BACKENDがBACKENDSのどれでもない
+    """
+    backend = os.environ.get("MAZE_BACKEND", BACKEND_AUTO).lower()
+    if backend not in BACKENDS:
+        raise ValueError("MAZE_BACKEND must be one of {}: {}".format(", ".join(BACKENDS), backend))
+    if backend == BACKEND_AUTO:
+        return BACKEND_NUMPY if "numpy" in sys.modules else BACKEND_LITE
+    return backend
+
+
+def get_map_class(map_type: int = MAP_DENSE, backend: str | None = None) -> type:
+    """マップのクラスを返す関数(使うクラスのモジュールだけをimportする)
+
+    Args:
+        map_type (int, optional): マップの持ち方(MAP_DENSE, MAP_CHUNKED)
+        backend (str | None, optional): MAP_DENSEのときのバックエンド(Noneならget_backend())
+
+    Returns:
+        type: MazeMap, LiteMazeMap, ChunkedMazeMapのどれか
+    """
+    if map_type == MAP_CHUNKED:
+        from ChunkedMazeMap import ChunkedMazeMap
+        return ChunkedMazeMap
+    if (get_backend() if backend is None else backend) == BACKEND_NUMPY:
+        from MazeMap import MazeMap
+        return MazeMap
+    from LiteMazeMap import LiteMazeMap
+    return LiteMazeMap
@@ -0,0 +1,188 @@
+"""
+たくさんの迷路をプロセスプールで並列に探索するバッチ
+    (大きさ, シード, 未探索タイルの選び方, 経路計算の方法)の組み合わせごとにMazeSimulatorで最後まで探索し、
+    組み合わせ(シード以外)ごとに集計する
+    ワーカーからは1ステップの時間をMazeProfilerのHistogramにまとめて返すので、迷路が多くても転送は小さい
+    1つの迷路で例外が出ても止まらず、errorに記録して残りを続ける
+
+    --exportを渡すと、探索ごとにMazeExportのファイル(<frontier>_<planner>_<size>_<seed>.mzr)を書き出す
+    --cameraを渡すと、MazeSolverにVictimQueueを付け、視覚的被災者をカメラの代わりにシミュレーターから入れる
+
+    python MazeBatch.py --sizes 8 16 32 --seeds 100 --planner heap wavefront --frontier lifo nearest
+    python MazeBatch.py --sizes 16 --seeds 100 --export runs && python MazeExport.py summary runs/*.mzr
+"""
+
+
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from MazeConstants import *
+from MazeLogger import MazeLogger
+from MazeProfiler import Histogram
+from MazeSimulator import MazeSimulator
+from MazeSolver import MazeSolver
+from VictimQueue import VictimQueue
+
+
+PLANNERS = {"heap": PLANNER_HEAP, "incremental": PLANNER_INCREMENTAL, "wavefront": PLANNER_WAVEFRONT}
+FRONTIER_STRATEGIES = {"lifo": FRONTIER_LIFO, "nearest": FRONTIER_NEAREST, "gain": FRONTIER_INFORMATION_GAIN}
+
+# 迷路を作るときのMazeSimulator.generateの引数(黒タイル・坂・銀タイル・被災者あり)
+MAZE_OPTIONS = {"loop_ratio": 0.15, "black_ratio": 0.05, "bump_ratio": 0.05, "silver_ratio": 0.05, "victim_ratio": 0.1}
+
+
+def make_jobs(sizes, seeds: int, frontier_strategies, planners) -> list[tuple[int, int, str, str]]:
+    """組み合わせをすべて並べる関数
+
+    Args:
+        sizes: 迷路の一辺のタイル数のリスト
+        seeds (int): 1つの組み合わせで試すシードの数(0から)
+        frontier_strategies: FRONTIER_STRATEGIESのキーのリスト
+        planners: PLANNERSのキーのリスト
+
+    Returns:
+        list[tuple[int, int, str, str]]: (大きさ, シード, 未探索タイルの選び方, 経路計算の方法)のリスト
+    """
+    return [(size, seed, frontier, planner)
+            for frontier, planner, size, seed in itertools.product(frontier_strategies, planners, sizes, range(seeds))]
+
+
+def run_job(job: tuple[int, int, str, str], max_steps: int = 100000, export: str | None = None,
+            camera: bool = False) -> dict:
+    """1つの迷路を探索する関数(ワーカーで実行する)
+
+    Args:
+        job (tuple[int, int, str, str]): (大きさ, シード, 未探索タイルの選び方, 経路計算の方法)
+        max_steps (int, optional): 最大のステップ数
+        export (str | None, optional): 探索した後にMazeSolver.exportで書き出すディレクトリ(Noneなら書き出さない)
+        camera (bool, optional): VictimQueueを付けて、視覚的被災者をカメラの代わりに入れるか
+
+    Returns:
+        dict: size, seed, frontier, planner, steps, visited, tiles, returned, victims, robot_time,
+              coverage_steps, coverage_time(MazeSimulator.runと同じ),
+              step_histogram(1ステップの時間[ns]のHistogram), error(例外の文字列 出なければNone)
+    """
+    size, seed, frontier, planner = job
+    result = {"size": size, "seed": seed, "frontier": frontier, "planner": planner, "error": None}
+    try:
+        simulator = MazeSimulator.generate(size, size, seed, **MAZE_OPTIONS)
+        solver = MazeSolver(FRONTIER_STRATEGIES[frontier], PLANNERS[planner], MazeLogger(LOG_OFF),
+                            victim_queue=VictimQueue() if camera else None)
+        summary = simulator.run(solver, max_steps)
+        if export is not None:
+            solver.export(os.path.join(export, "{}_{}_{}_{}.mzr".format(frontier, planner, size, seed)))
+    except Exception as error:
+        result["error"] = repr(error)
+        return result
+    step_histogram = Histogram()
+    for step_time in summary.pop("step_times"):
+        step_histogram.add(int(step_time*1e9))
+    result.update(summary)
+    result["step_histogram"] = step_histogram
+    return result
+
+
+def is_complete(result: dict) -> bool:
+    """すべてのタイルを通ってスタートに戻ったか"""
+    return result["error"] is None and result["returned"] and result["visited"] == result["tiles"]
+
+
+def run_batch(jobs, workers: int | None = None, chunksize: int = 4, max_steps: int = 100000,
+              export: str | None = None, camera: bool = False) -> list[dict]:
+    """jobsをプロセスプールで並列に探索する関数
+
+    Args:
+        jobs: make_jobsの結果
+        workers (int | None, optional): プロセスの数(NoneならCPUの数)
+        chunksize (int, optional): 1回にワーカーに渡すjobの数
+        max_steps (int, optional): 1つの迷路の最大のステップ数
+        export (str | None, optional): 探索ごとのファイルを書き出すディレクトリ(なければ作る)
+        camera (bool, optional): run_jobのcamera
+
+    Returns:
+        list[dict]: jobsと同じ順のrun_jobの結果
+    """
+    jobs = list(jobs)
+    if export is not None:
+        os.makedirs(export, exist_ok=True)
+    with ProcessPoolExecutor(workers) as executor:
+        return list(executor.map(run_job, jobs, [max_steps]*len(jobs), [export]*len(jobs), [camera]*len(jobs),
+                                 chunksize=chunksize))
+
+
+def aggregate(results: list[dict]) -> dict:
+    """結果を(未探索タイルの選び方, 経路計算の方法, 大きさ)ごとに集計する関数
+
+    Returns:
+        dict: キーごとのmazes(迷路の数), complete(is_completeの数), errors(例外の数), steps・robot_time(平均),
+              coverage_steps・coverage_time・tiles_per_move(すべてのタイルを通るまでのステップ数・時間[ms]・
+              1ステップあたりに通った新しいタイルの数の平均 すべて通った迷路だけ),
+              step_histogram(すべての迷路の1ステップの時間をまとめたHistogram), failed(完了しなかったシードのリスト)
+    """
+    groups = {}
+    for result in results:
+        key = (result["frontier"], result["planner"], result["size"])
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {"mazes": 0, "complete": 0, "errors": 0, "steps": 0, "robot_time": 0,
+                                   "covered": 0, "coverage_steps": 0, "coverage_time": 0, "tiles_per_move": 0,
+                                   "step_histogram": Histogram(), "failed": []}
+        group["mazes"] += 1
+        if result["error"] is not None:
+            group["errors"] += 1
+            group["failed"].append(result["seed"])
+            continue
+        if is_complete(result):
+            group["complete"] += 1
+        else:
+            group["failed"].append(result["seed"])
+        group["steps"] += result["steps"]
+        group["robot_time"] += result["robot_time"]
+        if result["coverage_steps"] is not None:
+            group["covered"] += 1
+            group["coverage_steps"] += result["coverage_steps"]
+            group["coverage_time"] += result["coverage_time"]
+            group["tiles_per_move"] += result["tiles"]/result["coverage_steps"]
+        group["step_histogram"].merge(result["step_histogram"])
+    for group in groups.values():
+        solved = group["mazes"]-group["errors"]
+        group["steps"] = group["steps"]/solved if solved else None
+        group["robot_time"] = group["robot_time"]/solved if solved else None
+        covered = group.pop("covered")
+        for name in ("coverage_steps", "coverage_time", "tiles_per_move"):
+            group[name] = group[name]/covered if covered else None
+    return groups
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[8, 16, 32], help="迷路の一辺のタイル数")
+    parser.add_argument("--seeds", type=int, default=20, help="1つの組み合わせで試すシードの数(0から)")
+    parser.add_argument("--planner", choices=PLANNERS, nargs="+", default=["heap"], help="経路計算の方法")
+    parser.add_argument("--frontier", choices=FRONTIER_STRATEGIES, nargs="+", default=["lifo"], help="未探索タイルの選び方")
+    parser.add_argument("--workers", type=int, help="プロセスの数(省略するとCPUの数)")
+    parser.add_argument("--max-steps", type=int, default=100000, help="1つの迷路の最大のステップ数")
+    parser.add_argument("--export", metavar="DIR", help="探索ごとのファイル(MazeExport)を書き出すディレクトリ")
+    parser.add_argument("--camera", action="store_true", help="VictimQueueで視覚的被災者をカメラの代わりに入れる")
+    args = parser.parse_args()
+
+    jobs = make_jobs(args.sizes, args.seeds, args.frontier, args.planner)
+    time_start = time.perf_counter()
+    results = run_batch(jobs, args.workers, max_steps=args.max_steps, export=args.export, camera=args.camera)
+    elapsed = time.perf_counter()-time_start
+    print("{:>8} {:>12} {:>7} {:>9} {:>9} {:>10} {:>9} {:>9} {:>9}  {}".format(
+        "frontier", "planner", "size", "complete", "steps", "tiles/move", "robot[s]", "p50[us]", "p99[us]", "failed"))
+    for (frontier, planner, size), group in aggregate(results).items():
+        histogram = group["step_histogram"]
+        print("{:>8} {:>12} {:>7} {:>9} {:>9} {:>10} {:>9} {:>9} {:>9}  {}".format(
+            frontier, planner, "{0}x{0}".format(size), "{}/{}".format(group["complete"], group["mazes"]),
+            "-" if group["steps"] is None else "{:.1f}".format(group["steps"]),
+            "-" if group["tiles_per_move"] is None else "{:.3f}".format(group["tiles_per_move"]),
+            "-" if group["robot_time"] is None else "{:.1f}".format(group["robot_time"]/1000),
+            "-" if histogram.count == 0 else "{:.1f}".format(histogram.percentile(0.5)/1000),
+            "-" if histogram.count == 0 else "{:.1f}".format(histogram.percentile(0.99)/1000),
+            " ".join(str(seed) for seed in group["failed"])))
+    print("{} mazes in {:.1f} s with {} workers".format(len(jobs), elapsed, args.workers or os.cpu_count()))
@@ -0,0 +1,132 @@
+"""
+迷路探索で使う定数
+"""
+
+
+# 被災者の定数
+VICTIM_NONE = 0b000
+VICTIM_H = 0b001
+VICTIM_S = 0b010
+VICTIM_U = 0b011
+VICTIM_RED = 0b100
+VICTIM_YELLOW = 0b101
+VICTIM_GREEN = 0b110
+VICTIM_HEATED = 0b111
+MASK_VICTIM = 0b111
+
+# Picoに送るときシフトする量
+SHIFT_VICTIM_R = 3
+SHIFT_VICTIM_L = 0
+
+# 動作の定数
+MOVE_FORWARD = 0b00000000
+MOVE_RIGHT = 0b01000000
+MOVE_LEFT = 0b10000000
+MOVE_BACK = 0b11000000
+# ログに出力する動作の名前
+MOVE_NAMES = {MOVE_FORWARD: 'Move forward', MOVE_RIGHT: 'Move right', MOVE_LEFT: 'Move left', MOVE_BACK: 'Move back'}
+# 記録(ジャーナル・MazeSolver.trace)で、tiles_movedを受け取らなかった(Noneだった)ことを表すbyte
+# 0は最初のタイルに入る前に止まったことを表すので使えない(max_runはこれより小さくする)
+TILES_MOVED_NONE = 0xFF
+
+# bitsの桁に対応する情報
+BUMP_SLOPE = 7
+BLACK = 6
+SILVER = 5
+HEAT_R = 4
+HEAT_L = 3
+WALL_R = 2
+WALL_F = 1
+WALL_L = 0
+# from_picoの値(0~255)ごとのbits(8桁のTrue/False 毎ステップシフトして作らずに表を引く)
+FROM_PICO_BITS = tuple(tuple(bool(value >> i & 1) for i in range(8)) for value in range(256))
+
+# 同じ壁に違う被災者を見つけたときの優先度(大きい方を残す 熱 > 文字 > 色)
+VICTIM_PRIORITY = {VICTIM_H: 2, VICTIM_S: 2, VICTIM_U: 2, VICTIM_RED: 1, VICTIM_YELLOW: 1, VICTIM_GREEN: 1, VICTIM_HEATED: 3}
+# 視覚的被災者の名前(REPLで入力する名前)
+VICTIM_NAMES = {"H": VICTIM_H, "S": VICTIM_S, "U": VICTIM_U, "red": VICTIM_RED, "yellow": VICTIM_YELLOW, "green": VICTIM_GREEN}
+
+# 知らない壁・タイル
+UNKNOWN = 0
+
+# 壁の状態
+WALL_UNKNOWN = UNKNOWN
+WALL_NONE = 0b01000
+WALL_EXIST = 0b10000
+WALL_VIRTUAL = 0b11000
+MASK_WALL = 0b11000
+MASK_WALL_EXIST = 0b10000
+# センサーで見た壁は多数決で決める(MazeMapBase.vote_wall) 票は壁のセルの上位3bitに入れる
+# 今の状態(WALL_NONEかWALL_EXIST)の票が反対の票より多い数(0~MAX_WALL_VOTES 0なら同数で、先に決まった状態のまま)
+MASK_WALL_VOTES = 0b01100000
+SHIFT_WALL_VOTES = 5
+MAX_WALL_VOTES = 3
+# 機体が通った壁に加える票(それまでの票によらず壁なしになる)
+WALL_PASSED_VOTES = MAX_WALL_VOTES+1
+# 反対の状態を見たことがある(センサーの誤りか、両側のタイルから見た壁が食い違った)
+WALL_CONFLICT = 0b10000000
+
+# タイルの状態
+TILE_UNKNOWN = UNKNOWN
+TILE_UNEXPLORED = 1
+TILE_NONE = 2
+TILE_SILVER = 3
+TILE_BLACK = 4
+TILE_BUMP_SLOPE = 5
+
+# 配列の中で使わない場所
+UNUSED = 0b0000_0000
+
+# コスト(動作にかかる時間[ms])の初期値 CostModelで設定ファイルから変えられる
+COST_MOVE = 1000  # 普通のタイルに進む
+COST_SILVER = 1000  # 銀タイルに進む
+COST_BUMP = 5000  # バンプ/坂のタイルを越える
+COST_TURN = 500  # 左右に90度回転する
+COST_U_TURN = 900  # 180度回転する(MOVE_BACK)
+
+# 制限時間があるときに、スタートに戻るコストに加える余裕[ms]の初期値
+TIME_MARGIN = 10000
+
+# 開始時をNORTHとした絶対的な向き（北から反時計回りに0,1,2,3なので加算・減算で回転が表現できる 4の剰余をとれば向きが得られる）
+NORTH = 0
+WEST = 1
+SOUTH = 2
+EAST = 3
+
+# ロボットからみた向き（上と同じ定義）
+FRONT = 0
+LEFT = 1
+BACK = 2
+RIGHT = 3
+
+# 動作(to_picoの上位2bit)ごとのロボットから見た向き
+MOVE_DIRECTIONS = {MOVE_FORWARD: FRONT, MOVE_RIGHT: RIGHT, MOVE_LEFT: LEFT, MOVE_BACK: BACK}
+# ロボットから見た向きごとの動作
+DIRECTION_MOVES = {FRONT: MOVE_FORWARD, RIGHT: MOVE_RIGHT, LEFT: MOVE_LEFT, BACK: MOVE_BACK}
+
+# 行き止まりで次に向かう未探索タイルの選び方
+FRONTIER_LIFO = 0  # 最後に見つけた未探索タイル
+FRONTIER_NEAREST = 1  # 経路のコストが最小の未探索タイル
+FRONTIER_INFORMATION_GAIN = 2  # 新しくわかりそうなタイルの数/経路のコストが最大の未探索タイル
+
+# 経路計算の方法
+PLANNER_HEAP = 0  # 優先度付きキューを使うA*探索
+PLANNER_INCREMENTAL = 1  # ゴールまでのコストを使い回すIncrementalPlanner
+PLANNER_WAVEFRONT = 2  # NumPyの配列で波面を広げるWavefront
+
+# マップの持ち方
+MAP_DENSE = 0  # 1つの配列(MazeMap)
+MAP_CHUNKED = 1  # 書き込んだところだけ確保するチャンク(ChunkedMazeMap)
+
+# ログのレベル(MazeLogger)
+LOG_DEBUG = 10  # 未探索タイルの一覧やマップの描画
+LOG_INFO = 20  # センサーの情報や移動
+LOG_WARNING = 30
+LOG_ERROR = 40
+LOG_OFF = 100  # 何も出力しない
+
+# 操作量(Manipulated Value) 順にNORTH, WEST, SOUTH, EAST これをpositionに加算すると移動できる
+MV = ((-1, 0), (0, -1), (1, 0), (0, 1))
+
+# x,y軸の定数(インデックス)
+x, y = (1, 0)
@@ -0,0 +1,290 @@
+"""
+探索の結果の書き出し(1つのバイナリファイル .mzr)
+    ヘッダ(HEADER_FIELDS 固定長)、マップ(使っている範囲のuint8の配列)、未探索タイル(int32の(数, 2))、
+    ステップごとの記録(TRACE_FIELDS)、探索の状態(MazeSolver.get_stateのJSON)の順に、8byteにそろえて並べる
+    それぞれの位置と大きさはヘッダにあるので、読むときはnp.memmap(bytesならnp.frombuffer)で配列として見るだけでパースしない
+    探索の状態のJSONは、MazeSolverを作り直すとき(load_solver)と再生するとき(replay)だけ読む
+    ステップごとの記録はMazeSolverがcalc_to_picoのたびにtraceに追記しているもの(MazeLogger.TRACE_RECORD)
+    NumPyは書き出す・読むときにimportする(記録するだけなら使わない)
+
+    python MazeExport.py summary runs/*.mzr   それぞれのステップ数・探索したタイル・見積もった時間を表示する
+    python MazeExport.py replay runs/0.mzr    記録をMazeSolver.replayで再生し、同じ指示になるか確かめる
+"""
+
+
+import argparse
+import json
+import os
+
+from CostModel import CostModel
+from MazeBackend import get_map_class
+from MazeConstants import *
+from MazeLogger import TRACE_RECORD
+
+
+MAGIC = b"MZRN"
+# 2: tiles_movedがNoneのステップをTILES_MOVED_NONEで記録する(1までは0で、途中で止まったステップと区別できない)
+VERSION = 2
+# 配列の先頭をそろえるbyte数
+ALIGNMENT = 8
+
+# TRACE_RECORDと同じ並びの構造化配列のフィールド
+TRACE_FIELDS = [("from_pico", "u1"), ("tiles_moved", "u1"), ("to_pico", "u1"), ("run_tiles", "u1"), ("direction", "u1"),
+                ("padding", "V1"), ("y", "<i2"), ("x", "<i2"), ("elapsed_time", "<f4")]
+# ヘッダ(offsetとsizeはファイルの先頭からのbyte数)
+HEADER_FIELDS = [("magic", "S4"), ("version", "<u2"), ("map_type", "u1"), ("fill", "u1"),
+                 ("top_left", "<i4", (2,)), ("map_shape", "<u4", (2,)),
+                 ("position", "<i4", (2,)), ("start_position", "<i4", (2,)), ("direction", "u1"), ("padding", "V3"),
+                 ("frontier_count", "<u4"), ("trace_start", "<u4"), ("trace_count", "<u4"), ("elapsed_time", "<f8"),
+                 ("map_offset", "<u8"), ("frontier_offset", "<u8"), ("trace_offset", "<u8"),
+                 ("state_offset", "<u8"), ("state_size", "<u8")]
+
+
+def align(offset: int) -> int:
+    """offsetをALIGNMENTの倍数に切り上げる関数"""
+    return -(-offset//ALIGNMENT)*ALIGNMENT
+
+
+def save_run(path: str, solver):
+    """solverの今のマップ・姿勢・未探索タイル・ステップごとの記録を1つのファイルに書き出す関数
+
+    一時ファイルに書いてから置き換えるので、途中で止まっても壊れたファイルは残らない
+
+    Args:
+        path (str): 書き出すファイル
+        solver (MazeSolver): 書き出すMazeSolver
+    """
+    import numpy as np
+
+    header_dtype = np.dtype(HEADER_FIELDS)
+    map_array = np.ascontiguousarray(solver.map_maze.view(), dtype=np.uint8)
+    frontier = np.array([list(position) for position in solver.unknown_tiles], dtype="<i4").reshape(-1, 2)
+    trace = bytes(solver.trace)
+    state = json.dumps(solver.get_state()).encode()
+    trace_count = len(trace)//TRACE_RECORD.size
+
+    header = np.zeros((), dtype=header_dtype)
+    header["magic"] = MAGIC
+    header["version"] = VERSION
+    header["map_type"] = solver.map_type
+    header["fill"] = solver.map_maze.fill
+    header["top_left"] = solver.map_maze.top_left
+    header["map_shape"] = map_array.shape
+    header["position"] = solver.position
+    header["start_position"] = solver.start_position
+    header["direction"] = solver.direction % 4
+    header["frontier_count"] = len(frontier)
+    header["trace_start"] = solver.steps-trace_count
+    header["trace_count"] = trace_count
+    header["elapsed_time"] = solver.elapsed_time
+    header["map_offset"] = align(header_dtype.itemsize)
+    header["frontier_offset"] = align(int(header["map_offset"])+map_array.nbytes)
+    header["trace_offset"] = align(int(header["frontier_offset"])+frontier.nbytes)
+    header["state_offset"] = align(int(header["trace_offset"])+len(trace))
+    header["state_size"] = len(state)
+
+    with open(path+".tmp", "wb") as file:
+        for offset, data in ((0, header.tobytes()), (header["map_offset"], map_array.tobytes()),
+                             (header["frontier_offset"], frontier.tobytes()), (header["trace_offset"], trace),
+                             (header["state_offset"], state)):
+            file.write(bytes(int(offset)-file.tell()))
+            file.write(data)
+    os.replace(path+".tmp", path)
+
+
+def load_run(source, mode: str = "r") -> dict:
+    """save_runで書き出したファイルを配列として読む関数(パースもコピーもしない)
+
+    Args:
+        source: ファイルのパス(np.memmapでメモリマップする)か、ファイルの中身のbytes
+        mode (str, optional): メモリマップのモード("r"なら読み取り専用、"c"なら書き換えてもファイルは変わらない)
+
+    Raises:
+        ValueError: save_runで書き出したファイルではない
+
+    Returns:
+        dict: header(ヘッダの構造化配列のスカラー), map((y, x)のuint8 左上がheader["top_left"]), frontier((数, 2)のint32),
+              trace(TRACE_FIELDSの構造化配列), state(探索の状態のJSONのuint8の配列)
+    """
+    import numpy as np
+
+    header_dtype = np.dtype(HEADER_FIELDS)
+    if isinstance(source, (str, os.PathLike)):
+        data = np.memmap(source, dtype=np.uint8, mode=mode)
+    else:
+        data = np.frombuffer(source if mode == "r" else bytearray(source), dtype=np.uint8)
+    header = data[:header_dtype.itemsize].view(header_dtype)[0]
+    if header["magic"] != MAGIC or header["version"] != VERSION:
+        raise ValueError("not a maze run (version {}): {!r}".format(VERSION, bytes(header["magic"])))
+
+    def section(offset: str, size: int):
+        return data[int(header[offset]):int(header[offset])+size]
+
+    map_shape = tuple(int(size) for size in header["map_shape"])
+    frontier_count = int(header["frontier_count"])
+    trace_count = int(header["trace_count"])
+    return {
+        "header": header,
+        "map": section("map_offset", map_shape[0]*map_shape[1]).reshape(map_shape),
+        "frontier": section("frontier_offset", frontier_count*8).view("<i4").reshape(frontier_count, 2),
+        "trace": section("trace_offset", trace_count*TRACE_RECORD.size).view(np.dtype(TRACE_FIELDS)),
+        "state": section("state_offset", int(header["state_size"])),
+    }
+
+
+def load_state(run: dict) -> dict:
+    """load_runの結果から探索の状態(MazeSolver.get_stateの結果)を読む関数"""
+    return json.loads(run["state"].tobytes())
+
+
+def make_map(run: dict, map_type: int | None = None):
+    """load_runの結果のマップから、マップのクラス(MazeBackendで選ぶ)を作る関数
+
+    MAP_DENSEなら配列をコピーせずに使う(書き換えるときにMazeMapは確保し直すか、LiteMazeMapはbytearrayにコピーする)
+
+    Args:
+        run (dict): load_runの結果
+        map_type (int | None, optional): マップの持ち方(Noneなら書き出したときと同じ)
+    """
+    header = run["header"]
+    map_type = int(header["map_type"]) if map_type is None else map_type
+    top_left = [int(header["top_left"][0]), int(header["top_left"][1])]
+    shape = list(run["map"].shape)
+    map_class = get_map_class(map_type)
+    if map_type == MAP_CHUNKED:
+        import numpy as np
+
+        map_maze = map_class(fill=int(header["fill"]))
+        map_maze.top_left = top_left
+        map_maze.shape = shape
+        for position_y, position_x in zip(*np.nonzero(run["map"] != header["fill"])):
+            map_maze[int(position_y)+top_left[0], int(position_x)+top_left[1]] = run["map"][position_y, position_x]
+        return map_maze
+    # 使っている範囲がそのままバッファになるので、座標(0,0)のインデックスは-top_left
+    return map_class.from_state(run["map"], {"fill": int(header["fill"]), "origin": [-top_left[0], -top_left[1]],
+                                             "top_left": top_left, "shape": shape})
+
+
+def load_solver(source, logger=None, **kwargs):
+    """save_runで書き出したファイルから、書き出したときの状態のMazeSolverを作る関数
+
+    Args:
+        source: ファイルのパスかbytes(load_runと同じ)
+        logger (MazeLogger | None, optional): ログの出力先
+        **kwargs: MazeSolverのそのほかの引数(profiler, speculativeなど 状態はファイルのものを使う)
+
+    Returns:
+        MazeSolver: 作ったMazeSolver
+    """
+    from MazeSolver import MazeSolver
+
+    # 続けて探索するとマップを書き換えるので、コピーオンライトで読む
+    run = load_run(source, mode="c")
+    state = load_state(run)
+    solver = MazeSolver(logger=logger, **kwargs)
+    solver.set_state(state, make_map(run))
+    return solver
+
+
+def get_frames(run: dict) -> tuple[bytes, bytes]:
+    """load_runの結果から、(from_pico, tiles_moved)と(to_pico, run_tiles)を並べたbyte列を返す関数(MazeSolver.replayのframe_size=2)"""
+    trace = run["trace"]
+    reports = bytearray(len(trace)*2)
+    reports[0::2], reports[1::2] = trace["from_pico"].tobytes(), trace["tiles_moved"].tobytes()
+    recorded = bytearray(len(trace)*2)
+    recorded[0::2], recorded[1::2] = trace["to_pico"].tobytes(), trace["run_tiles"].tobytes()
+    return bytes(reports), bytes(recorded)
+
+
+def compare(source, logger=None, **kwargs) -> int | None:
+    """記録したfrom_picoとtiles_movedを、同じ設定の新しいMazeSolverのreplayで再生し、最初に指示が違ったステップを返す関数
+
+    kwargsで設定を変える(planner=PLANNER_WAVEFRONTなど)と、経路計算などを変えたときに記録と同じ指示になるかを確かめられる
+    違ったステップより後は、記録した入力が実際の動きと合わないので比べない
+    カメラで見つけた被災者(VictimQueue)は記録にないので、記録したto_picoの被災者のbitをそのまま報告し(replayのexpected)、
+    移動とrun_tilesだけを比べる(カメラを使っていた走行も同じ指示になる)
+
+    Args:
+        source: ファイルのパスかbytes(load_runと同じ)
+        logger (MazeLogger | None, optional): ログの出力先(NoneならLOG_OFF)
+        **kwargs: 記録した状態の代わりに使うMazeSolverの引数(frontier_strategy, planner, cost_model, max_run,
+                  map_type, time_budget, time_margin)
+
+    Raises:
+        ValueError: 記録が最初のステップからではない(Checkpointから再開した走行)
+
+    Returns:
+        int | None: 最初に指示が違ったステップ(すべて同じならNone)
+    """
+    from MazeLogger import MazeLogger
+    from MazeSolver import MazeSolver
+
+    run = load_run(source)
+    if run["header"]["trace_start"] != 0:
+        raise ValueError("trace starts at step {}".format(int(run["header"]["trace_start"])))
+    state = load_state(run)
+    options = {"frontier_strategy": state["frontier_strategy"], "planner": state["planner"],
+               "cost_model": CostModel.from_dict(state["cost_model"]), "max_run": state["max_run"],
+               "map_type": state["map_type"], "time_budget": state["time_budget"], "time_margin": state["time_margin"]}
+    options.update(kwargs)
+    solver = MazeSolver(logger=MazeLogger(LOG_OFF) if logger is None else logger, **options)
+    reports, recorded = get_frames(run)
+    replies = solver.replay(reports, frame_size=2, expected=recorded)[0]
+    if replies == recorded:
+        return None
+    return next(index for index in range(0, len(recorded), 2) if replies[index:index+2] != recorded[index:index+2])//2
+
+
+def replay(source, logger=None) -> int:
+    """記録を同じ設定で再生し(compare)、すべて同じ指示になるか確かめる関数
+
+    Raises:
+        ValueError: 記録が最初のステップからではない(Checkpointから再開した走行)
+        RuntimeError: 再生した指示が記録と違う
+
+    Returns:
+        int: 再生したステップ数
+    """
+    step = compare(source, logger)
+    if step is not None:
+        raise RuntimeError("step {} replayed to a different command".format(step))
+    return int(load_run(source)["header"]["trace_count"])
+
+
+def summarize(run: dict) -> dict:
+    """load_runの結果を集計する関数(状態のJSONは読まない)
+
+    Returns:
+        dict: steps(記録したステップ数), explored(マップで探索済みのタイルの数),
+              frontier(未探索タイルの数), elapsed_time(見積もった経過時間[ms]), returned(スタートで終わったか)
+    """
+    import numpy as np
+
+    header = run["header"]
+    # 座標が奇数のセルがタイル(top_leftの偶奇で配列の中の位置が変わる)
+    tiles = run["map"][int(header["top_left"][0]) % 2 == 0::2, int(header["top_left"][1]) % 2 == 0::2]
+    return {
+        "steps": len(run["trace"]),
+        "explored": int(np.count_nonzero((tiles != TILE_UNKNOWN) & (tiles != TILE_UNEXPLORED))),
+        "frontier": int(header["frontier_count"]),
+        "elapsed_time": float(header["elapsed_time"]),
+        "returned": bool((header["position"] == header["start_position"]).all()),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("summary", "replay"), help="summary: 集計を表示する replay: 再生して確かめる")
+    parser.add_argument("paths", nargs="+", help="save_runで書き出したファイル")
+    args = parser.parse_args()
+
+    if args.command == "summary":
+        print("{:>8} {:>9} {:>9} {:>9} {:>9}  {}".format("steps", "explored", "frontier", "time[s]", "returned", "path"))
+        for path in args.paths:
+            summary = summarize(load_run(path))
+            print("{:8d} {:9d} {:9d} {:9.1f} {:>9}  {}".format(
+                summary["steps"], summary["explored"], summary["frontier"],
+                summary["elapsed_time"]/1000, str(summary["returned"]), path))
+    else:
+        for path in args.paths:
+            print("{}: replayed {} steps".format(path, replay(path)))
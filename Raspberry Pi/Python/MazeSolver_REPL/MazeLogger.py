@@ -0,0 +1,128 @@
+"""
+探索のロガー
+    ログの文字列は出力するレベルのときだけ作る(引数を渡しておき、出力するときにformatする)
+    ステップごとの記録(from_pico, to_pico, 位置, 向き, 時刻)は文字列にせず、リングバッファに最近のものだけ残す
+    エラーのときはdumpでリングバッファを出力できる
+    record_pathを渡すと、ステップごとの記録を固定長のバイナリでファイルにも追記する
+"""
+
+
+import collections
+import contextlib
+import struct
+import sys
+import time
+
+from MazeConstants import *
+
+
+# ステップごとの記録のバイナリ(ステップ数, from_pico, to_pico, y, x, 向き, 時刻[s])
+STEP_RECORD = struct.Struct("<IBBhhBd")
+# MazeSolver.traceの1ステップの記録(from_pico, tiles_moved, to_pico, run_tiles, 向き, 移動した後のy, x, 見積もった経過時間[ms])
+# 時刻を含まないので、同じ入力なら同じ記録になる(MazeExportで書き出す) tiles_movedがNoneならTILES_MOVED_NONE
+TRACE_RECORD = struct.Struct("<BBBBBxhhf")
+
+
+class MazeLogger():
+    """レベルつきのログとステップごとの記録のクラス
+    """
+
+    def __init__(self, level: int = LOG_INFO, stream=None, ring_size: int = 256, record_path: str | None = None):
+        """
+        Args:
+            level (int, optional): 出力する最低のレベル(LOG_*)
+            stream (optional): 出力先(writeがあるもの Noneなら標準出力)
+            ring_size (int, optional): リングバッファに残すステップの数
+            record_path (str | None, optional): ステップごとの記録を追記するファイル(Noneなら書かない)
+        """
+        self.level = level
+        self.stream = stream
+        # 最近のステップの(ステップ数, from_pico, to_pico, y, x, 向き, 時刻[s])
+        self.ring = collections.deque(maxlen=ring_size)
+        self.steps = 0
+        self.record_file = None if record_path is None else open(record_path, "ab")
+
+    def is_enabled(self, level: int) -> bool:
+        """levelのログが出力されるか"""
+        return level >= self.level
+
+    def log(self, level: int, message, *args):
+        """ログを出力する関数
+
+        Args:
+            level (int): ログのレベル(LOG_*)
+            message: 文字列(argsでformatする)か、文字列を返す関数(出力するときだけ呼ぶ)
+            *args: messageのformatに渡す引数
+        """
+        if level < self.level:
+            return
+        if callable(message):
+            message = message()
+        elif args:
+            message = message.format(*args)
+        (sys.stdout if self.stream is None else self.stream).write(message+"\n")
+
+    def debug(self, message, *args):
+        self.log(LOG_DEBUG, message, *args)
+
+    def info(self, message, *args):
+        self.log(LOG_INFO, message, *args)
+
+    def warning(self, message, *args):
+        self.log(LOG_WARNING, message, *args)
+
+    def error(self, message, *args):
+        self.log(LOG_ERROR, message, *args)
+
+    def step(self, from_pico: int, to_pico: int, position: tuple[int, int], direction: int):
+        """1ステップを記録する関数(文字列にはしない 時刻はtime.monotonic())
+
+        Args:
+            from_pico (int): picoから送られてきたデータ
+            to_pico (int): picoに送るデータ
+            position (tuple[int, int]): 移動した後の位置
+            direction (int): 移動した後の向き
+        """
+        record = (self.steps, from_pico, to_pico, position[y], position[x], direction % 4, time.monotonic())
+        self.ring.append(record)
+        if self.record_file is not None:
+            self.record_file.write(STEP_RECORD.pack(*record))
+        self.steps += 1
+
+    def dump(self, stream=None):
+        """リングバッファに残っている最近のステップを出力する関数(レベルに関係なく出力する)
+
+        Args:
+            stream (optional): 出力先(Noneならstderr)
+        """
+        stream = sys.stderr if stream is None else stream
+        for step, from_pico, to_pico, position_y, position_x, direction, time_step in self.ring:
+            stream.write("step {:6d} time:{:.3f} from_pico:{:08b} to_pico:{:08b} position:[{}, {}] direction:{}\n".format(
+                step, time_step, from_pico, to_pico, position_y, position_x, direction))
+
+    @contextlib.contextmanager
+    def muted(self):
+        """withの中だけログを出力しないようにする(ステップは記録する)"""
+        level = self.level
+        self.level = LOG_OFF
+        try:
+            yield self
+        finally:
+            self.level = level
+
+    def close(self):
+        """記録のファイルを閉じる関数"""
+        if self.record_file is not None:
+            self.record_file.close()
+            self.record_file = None
+
+
+def read_records(path: str) -> list[tuple]:
+    """record_pathに書いたステップごとの記録を読む関数
+
+    Returns:
+        list[tuple]: (ステップ数, from_pico, to_pico, y, x, 向き, 時刻[s])のリスト
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    return list(STEP_RECORD.iter_unpack(data[:len(data)//STEP_RECORD.size*STEP_RECORD.size]))
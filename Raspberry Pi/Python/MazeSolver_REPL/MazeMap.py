@@ -0,0 +1,126 @@
+"""
+迷路のマップのクラス
+    使っている範囲より大きい配列(バッファ)を確保しておき、原点のオフセットで座標を変換する
+    マップを伸ばすときは範囲を広げるだけなので、データのコピーや座標の書き換えが起きない
+    バッファが足りなくなったときだけ倍の大きさで確保し直す(償却O(1))
+    1つのセルはuint8(壁の食い違い1bit+票2bit+壁の状態2bit+被災者3bit、またはタイルの状態)で持つ
+    NumPyを使わないLiteMazeMapもある(どちらを使うかはMazeBackend)
+"""
+
+
+import numpy as np
+
+from MazeConstants import *
+from MazeMapBase import MazeMapBase
+
+
+class MazeMap(MazeMapBase):
+    """四方向に伸ばせるマップのクラス(NumPyの配列)
+
+    座標(y,x)はマップを伸ばしても変わらない(北や西に伸ばすと負の座標も使う)
+    壁のセルのビット(MASK_WALL, MASK_WALL_VOTES, WALL_CONFLICT, MASK_VICTIM)はMazeMapBaseの関数で読み書きする
+    """
+
+    def __init__(self, map_maze, fill: int = 0, copy: bool = True):
+        """
+        Args:
+            map_maze: 最初のマップ(2次元配列) 左上が座標(0,0)になる
+            fill (int, optional): 伸ばしたところに入れる値
+            copy (bool, optional): map_mazeをコピーするか(Falseならuint8の配列やnp.memmapをそのままbufferにする)
+        """
+        # 実際にデータを持つ配列
+        self.buffer = np.array(map_maze, dtype=np.uint8) if copy else np.asarray(map_maze, dtype=np.uint8)
+        # 伸ばしたところに入れる値
+        self.fill = fill
+        # 座標(0,0)のbufferの中でのインデックス(y,x)
+        self.origin = [0, 0]
+        # 使っている範囲の左上の座標(y,x)
+        self.top_left = [0, 0]
+        # 使っている範囲の大きさ(y,x)
+        self.shape = list(self.buffer.shape)
+
+    def __getitem__(self, position: tuple[int, int]) -> int:
+        return self.buffer[position[0]+self.origin[0], position[1]+self.origin[1]]
+
+    def __setitem__(self, position: tuple[int, int], value: int):
+        self.buffer[position[0]+self.origin[0], position[1]+self.origin[1]] = value
+
+    def reader(self):
+        """座標(y, x)を受け取ってセルの値を返す関数を返す関数(経路計算のループで使う マップを伸ばしたら作り直す)"""
+        buffer = self.buffer
+        origin_y, origin_x = self.origin
+
+        def read(position_y: int, position_x: int) -> int:
+            return buffer[position_y+origin_y, position_x+origin_x]
+        return read
+
+    def reserve(self, north: int = 0, south: int = 0, west: int = 0, east: int = 0):
+        """各方向に指定したセルの数だけ伸ばせるようにbufferを確保する関数
+
+        足りないときは倍の大きさのbufferを確保し直し、使っている範囲を真ん中にコピーする
+
+        Args:
+            north (int, optional): 北(上)に必要なセルの数
+            south (int, optional): 南(下)に必要なセルの数
+            west (int, optional): 西(左)に必要なセルの数
+            east (int, optional): 東(右)に必要なセルの数
+        """
+        top = self.top_left[0]+self.origin[0]
+        left = self.top_left[1]+self.origin[1]
+        bottom = top+self.shape[0]
+        right = left+self.shape[1]
+        if (top >= north and left >= west
+                and bottom+south <= self.buffer.shape[0] and right+east <= self.buffer.shape[1]):
+            return
+        # 倍の大きさで確保し、余りを上下(左右)に半分ずつ分ける
+        height = max(self.buffer.shape[0]*2, self.shape[0]+north+south)
+        width = max(self.buffer.shape[1]*2, self.shape[1]+west+east)
+        top_new = north+(height-self.shape[0]-north-south)//2
+        left_new = west+(width-self.shape[1]-west-east)//2
+        buffer = np.full((height, width), self.fill, dtype=self.buffer.dtype)
+        buffer[top_new:top_new+self.shape[0], left_new:left_new+self.shape[1]] = self.buffer[top:bottom, left:right]
+        self.buffer = buffer
+        self.origin = [top_new-self.top_left[0], left_new-self.top_left[1]]
+
+    def get_state(self) -> dict:
+        """bufferの外側の情報(座標の変換と使っている範囲)をdictで返す関数"""
+        return {"fill": int(self.fill), "origin": list(self.origin), "top_left": list(self.top_left), "shape": list(self.shape)}
+
+    @classmethod
+    def from_state(cls, buffer: np.ndarray, state: dict) -> "MazeMap":
+        """get_stateの結果とbufferからMazeMapを作る関数(bufferはコピーしない)
+
+        Args:
+            buffer (np.ndarray): bufferの配列(np.loadでメモリマップしたものなど)
+            state (dict): get_stateの結果
+
+        Returns:
+            MazeMap: 作ったMazeMap
+        """
+        map_maze = cls(buffer, state["fill"], copy=False)
+        map_maze.origin = list(state["origin"])
+        map_maze.top_left = list(state["top_left"])
+        map_maze.shape = list(state["shape"])
+        return map_maze
+
+    def copy(self) -> "MazeMap":
+        """bufferごとコピーしたMazeMapを返す関数(コピーを書き換えても元のマップは変わらない)"""
+        return MazeMap.from_state(self.buffer.copy(), self.get_state())
+
+    def view(self) -> np.ndarray:
+        """使っている範囲の配列を返す関数(コピーしないので書き換えるとマップも変わる)
+
+        Returns:
+            np.ndarray: 左上が座標top_leftに対応する配列
+        """
+        top = self.top_left[0]+self.origin[0]
+        left = self.top_left[1]+self.origin[1]
+        return self.buffer[top:top+self.shape[0], left:left+self.shape[1]]
+
+    def iter_blocks(self):
+        """使っている範囲のうちデータがある部分を(左上の座標(y,x), 配列)で順に返す関数(MazeMapは範囲全体の1つだけ)"""
+        yield (self.top_left[0], self.top_left[1]), self.view()
+
+    def nbytes(self) -> int:
+        """bufferのbyte数"""
+        return self.buffer.nbytes
@@ -0,0 +1,133 @@
+"""
+マップのクラスに共通の読み書きの関数
+    セルの読み書き([y, x])と範囲の管理(top_left, shape, reserve)はMazeMap・LiteMazeMap・ChunkedMazeMapがそれぞれ持ち、
+    壁・タイル・被災者のビットの扱いはここにまとめる(NumPyをimportしない)
+"""
+
+
+from MazeConstants import *
+
+
+class MazeMapBase():
+    """マップのクラスの基底クラス
+
+    座標(y,x)はマップを伸ばしても変わらない(北や西に伸ばすと負の座標も使う)
+    壁のセルのビット(MASK_WALL, MASK_WALL_VOTES, WALL_CONFLICT, MASK_VICTIM)は
+    get_wall・add_wall・vote_wall・get_victim・set_victimで読み書きする
+    """
+
+    def get_tile(self, position: tuple[int, int]) -> int:
+        """タイルの状態(TILE_*)をgetする関数"""
+        return self[position]
+
+    def set_tile(self, position: tuple[int, int], tile: int) -> bool:
+        """タイルの状態(TILE_*)をsetする関数
+
+        Returns:
+            bool: 値が変わったか
+        """
+        if self[position] == tile:
+            return False
+        self[position] = tile
+        return True
+
+    def get_wall(self, position: tuple[int, int]) -> int:
+        """壁の状態(WALL_UNKNOWN, WALL_NONE, WALL_EXIST, WALL_VIRTUAL)をgetする関数"""
+        return self[position] & MASK_WALL
+
+    def is_wall(self, position: tuple[int, int]) -> bool:
+        """壁がある(WALL_EXISTかWALL_VIRTUAL)か"""
+        return self[position] & MASK_WALL_EXIST == WALL_EXIST
+
+    def add_wall(self, position: tuple[int, int], wall: int) -> bool:
+        """壁の状態を今の状態に重ねる関数(WALL_NONEとWALL_EXISTの両方を重ねるとWALL_VIRTUALになる)
+
+        黒タイルの手前などの決めた壁(WALL_VIRTUAL)を書くときに使い、センサーで見た壁はvote_wallで書く
+
+        Returns:
+            bool: 値が変わったか
+        """
+        value = self[position]
+        if value | wall == value:
+            return False
+        self[position] = value | wall
+        return True
+
+    def vote_wall(self, position: tuple[int, int], wall: int, weight: int = 1) -> bool:
+        """センサーで見た壁(WALL_NONEかWALL_EXIST)を票として加え、多数決で壁の状態を決める関数
+
+        反対の票が今の状態の票より多くなったときだけ状態が変わる(同数なら先に決まった状態のまま)
+        票の差はMAX_WALL_VOTESまでしか数えないので、何度も見た壁でも反対の票がそれだけ続けば変わる
+        反対の状態を一度でも見たらWALL_CONFLICTを立てる(WallCheckで数える)
+        WALL_VIRTUALの壁は票で変えない
+
+        Args:
+            position (tuple[int, int]): 壁のセルの座標
+            wall (int): 見た壁(WALL_NONEかWALL_EXIST)
+            weight (int, optional): 票の数(機体が通った壁はWALL_PASSED_VOTES)
+
+        Returns:
+            bool: 壁の状態(MASK_WALL)が変わったか(票の数だけが変わったときはFalse)
+        """
+        value = int(self[position])
+        state = value & MASK_WALL
+        if state == WALL_VIRTUAL:
+            return False
+        votes = (value & MASK_WALL_VOTES) >> SHIFT_WALL_VOTES
+        flags = value & (WALL_CONFLICT | MASK_VICTIM)
+        if state == WALL_UNKNOWN:
+            state_new, votes = wall, weight
+        elif state == wall:
+            state_new, votes = state, votes+weight
+        elif votes >= weight:
+            state_new, votes, flags = state, votes-weight, flags | WALL_CONFLICT
+        else:
+            state_new, votes, flags = wall, weight-votes, flags | WALL_CONFLICT
+        self[position] = flags | min(votes, MAX_WALL_VOTES) << SHIFT_WALL_VOTES | state_new
+        return state_new != state
+
+    def get_victim(self, position: tuple[int, int]) -> int:
+        """壁にある被災者(VICTIM_*)をgetする関数"""
+        return self[position] & MASK_VICTIM
+
+    def set_victim(self, position: tuple[int, int], victim: int) -> bool:
+        """壁にある被災者(VICTIM_*)をsetする関数
+
+        Returns:
+            bool: 値が変わったか
+        """
+        value = self[position]
+        if value & MASK_VICTIM == victim:
+            return False
+        self[position] = value & (MASK_WALL | MASK_WALL_VOTES | WALL_CONFLICT) | victim
+        return True
+
+    def extend(self, north: int = 0, south: int = 0, west: int = 0, east: int = 0):
+        """マップを各方向に指定したセルの数だけ伸ばす関数
+
+        Args:
+            north (int, optional): 北(上)に伸ばすセルの数
+            south (int, optional): 南(下)に伸ばすセルの数
+            west (int, optional): 西(左)に伸ばすセルの数
+            east (int, optional): 東(右)に伸ばすセルの数
+        """
+        self.reserve(north, south, west, east)
+        self.top_left[0] -= north
+        self.top_left[1] -= west
+        self.shape[0] += north+south
+        self.shape[1] += west+east
+
+    def reserve(self, north: int = 0, south: int = 0, west: int = 0, east: int = 0):
+        """各方向に指定したセルの数だけ伸ばせるように確保する関数(確保の仕方はクラスごと)"""
+
+    def contains(self, position: tuple[int, int]) -> bool:
+        """positionが使っている範囲の中にあるか
+
+        Args:
+            position (tuple[int, int]): 座標
+
+        Returns:
+            bool: 範囲の中にあるか
+        """
+        return (0 <= position[0]-self.top_left[0] < self.shape[0]
+                and 0 <= position[1]-self.top_left[1] < self.shape[1])
@@ -0,0 +1,140 @@
+"""
+calc_to_picoのフェーズごとの時間やカウンタを集計するプロファイラ
+    値は2の累乗ごとのバケツのヒストグラムに入れるので、ステップ数が増えてもメモリは増えない
+    時間はtime.perf_counter_ns()の差(ナノ秒)
+    MazeSolverはprofilerがNoneのとき何も測らない(if 1つ分のコストだけ)
+
+    フェーズ(phase/*)
+        decode: from_picoのビットの取り出し
+        map_update: バンプ・黒タイル・壁・被災者をマップに書く
+        decide: 未探索タイルの追加と次の動作を決める(経路計算は含まない)
+        planning: calc_path・calc_path_to_nearest
+        log: ログの出力とマップの描画
+        move: 位置の更新(マップの拡張を含む)
+        step: calc_to_pico全体
+    そのほか
+        extend_map: マップの拡張1回の時間
+        nodes_expanded: 経路計算1回で取り出した状態の数(PLANNER_HEAPとPLANNER_INCREMENTAL)
+        frontier_size: ステップの終わりの未探索タイルの数
+"""
+
+
+import csv
+import json
+import time
+
+
+class Histogram():
+    """値を2の累乗のバケツで数えるヒストグラム
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        # バケツ(値のbit_length)ごとの個数 バケツbには2^(b-1)以上2^b未満の値が入る
+        self.buckets = {}
+
+    def add(self, value: int):
+        """値を1つ加える関数"""
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        bucket = int(value).bit_length()
+        self.buckets[bucket] = self.buckets.get(bucket, 0)+1
+
+    def percentile(self, ratio: float) -> int:
+        """ratio(0~1)のパーセンタイルの上限(バケツの上限とmaxの小さい方)を返す関数"""
+        rank = ratio*self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min((1 << bucket)-1, self.max)
+        return self.max
+
+    def merge(self, other: "Histogram"):
+        """otherの値をすべて加える関数"""
+        if other.count == 0:
+            return
+        self.count += other.count
+        self.total += other.total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0)+count
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.total/self.count if self.count else None,
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+            "buckets": {str((1 << bucket)-1): count for bucket, count in sorted(self.buckets.items())},
+        }
+
+
+class MazeProfiler():
+    """名前ごとのヒストグラムを持つプロファイラ
+    """
+
+    def __init__(self):
+        # 名前ごとのHistogram
+        self.histograms = {}
+
+    def add(self, name: str, value: int):
+        """nameのヒストグラムに値を加える関数"""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.add(value)
+
+    def now(self) -> int:
+        """今の時刻[ns]を返す関数"""
+        return time.perf_counter_ns()
+
+    def lap(self, name: str, time_start: int) -> int:
+        """time_startからの時間をnameに加え、今の時刻を返す関数(次のフェーズのtime_startにする)"""
+        time_now = time.perf_counter_ns()
+        self.add(name, time_now-time_start)
+        return time_now
+
+    def merge(self, other: "MazeProfiler"):
+        """別のプロファイラ(別の探索や別のプロセス)の集計を加える関数"""
+        for name, histogram in other.histograms.items():
+            if name not in self.histograms:
+                self.histograms[name] = Histogram()
+            self.histograms[name].merge(histogram)
+
+    def to_dict(self) -> dict:
+        """すべてのヒストグラムをdictにする関数"""
+        return {name: histogram.to_dict() for name, histogram in sorted(self.histograms.items())}
+
+    def to_json(self, path: str):
+        """ヒストグラムをJSONで書き出す関数"""
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+    def to_csv(self, path: str):
+        """ヒストグラムの要約(バケツ以外)をCSVで書き出す関数"""
+        fields = ("name", "count", "total", "min", "max", "mean", "p50", "p90", "p99")
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(fields)
+            for name, summary in self.to_dict().items():
+                writer.writerow([name]+[summary[field] for field in fields[1:]])
+
+    def export(self, path: str):
+        """拡張子(.csvかそれ以外)に合わせて書き出す関数"""
+        if path.endswith(".csv"):
+            self.to_csv(path)
+        else:
+            self.to_json(path)
@@ -0,0 +1,190 @@
+"""
+マップを文字列に描画するクラス
+    セルの種類(角・横の壁・縦の壁・タイル)とセルの値から3文字の表示への表を作っておき、
+    マップの配列全体を表で一度に引いて(Pythonのループはセルごとではなく行ごとにもならない)1つの文字列にする
+    マップはiter_blocksで読むので、ChunkedMazeMapでは確保したチャンクだけを引き、残りはfillの表示で埋める
+    前のフレームと比べて変わった行だけをANSIエスケープシーケンスのカーソル移動で書き直す差分も出力できる
+
+    python MazeRenderer.py --size 16 --seed 0   シミュレーターで探索しながら差分を描画し、描画にかかった時間を表示する
+"""
+
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from MazeConstants import *
+
+
+# セルの種類(行が奇数なら+2、列が奇数なら+1)
+CELL_CORNER = 0
+CELL_WALL_HORIZONTAL = 1
+CELL_WALL_VERTICAL = 2
+CELL_TILE = 3
+
+# 1つのセルの表示の文字数
+CELL_WIDTH = 3
+
+# 壁にある被災者の表示
+VICTIM_CHARS = {VICTIM_H: "H", VICTIM_S: "S", VICTIM_U: "U", VICTIM_RED: "r", VICTIM_YELLOW: "y",
+                VICTIM_GREEN: "g", VICTIM_HEATED: "*"}
+# タイルの表示
+TILE_GLYPHS = {TILE_UNEXPLORED: " ? ", TILE_SILVER: " ○ ", TILE_BLACK: "███", TILE_BUMP_SLOPE: " ^ "}
+# ロボットの向き(NORTH, WEST, SOUTH, EAST)ごとの表示
+ROBOT_GLYPHS = (" ↑ ", " ← ", " ↓ ", " → ")
+
+
+def to_codes(text: str) -> np.ndarray:
+    """文字列を1文字ずつのコードポイントの配列にする関数"""
+    return np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+
+
+def make_glyph_table() -> np.ndarray:
+    """[セルの種類, セルの値]の表示(3文字のコードポイント)の表を作る関数
+
+    Returns:
+        np.ndarray: (4, 256, CELL_WIDTH)の配列
+    """
+    table = np.zeros((4, 256, CELL_WIDTH), dtype=np.uint32)
+    table[:] = to_codes("   ")
+    for value in range(256):
+        wall = value & MASK_WALL
+        victim = VICTIM_CHARS.get(value & MASK_VICTIM)
+        if wall == WALL_EXIST:
+            table[CELL_WALL_HORIZONTAL, value] = to_codes("━━━" if victim is None else "━"+victim+"━")
+            table[CELL_WALL_VERTICAL, value] = to_codes(" ┃ " if victim is None else " "+victim+" ")
+        elif wall == WALL_VIRTUAL:
+            table[CELL_WALL_HORIZONTAL, value] = to_codes("───")
+            table[CELL_WALL_VERTICAL, value] = to_codes(" │ ")
+        if value in TILE_GLYPHS:
+            table[CELL_TILE, value] = to_codes(TILE_GLYPHS[value])
+    return table
+
+
+GLYPH_TABLE = make_glyph_table()
+ROBOT_CODES = [to_codes(glyph) for glyph in ROBOT_GLYPHS]
+NEWLINE_CODE = to_codes("\n")[0]
+
+
+def format_label(number: int) -> str:
+    """座標の見出しを3文字にする関数"""
+    return "{:2d} ".format(number) if -10 < number < 100 else "{:3d}".format(number)[-CELL_WIDTH:]
+
+
+class MazeRenderer():
+    """MazeMapを描画するクラス
+
+    差分を出力するために前のフレームを持つので、描画する画面ごとに1つ作る
+    """
+
+    def __init__(self):
+        # 前のフレーム(行, 文字)のコードポイントと左上の座標
+        self.previous = None
+        self.previous_top_left = None
+
+    def render_codes(self, map_maze, position=None, direction: int = NORTH) -> np.ndarray:
+        """見出しつきのフレームを(行, 文字)のコードポイントの配列で返す関数(行の最後は改行)
+
+        Args:
+            map_maze (MazeMap): 描画するマップ
+            position (optional): ロボットの位置(y,x) Noneなら描かない
+            direction (int, optional): ロボットの向き
+
+        Returns:
+            np.ndarray: (行, 文字)の配列
+        """
+        top, left = map_maze.top_left
+        height, width = map_maze.shape
+        # セルの種類は座標の偶奇で決まる
+        kinds = ((np.arange(top, top+height) % 2)[:, np.newaxis]*2+(np.arange(left, left+width) % 2)).astype(np.intp)
+        blocks = list(map_maze.iter_blocks())
+        if len(blocks) == 1 and blocks[0][1].shape == (height, width):
+            cells = GLYPH_TABLE[kinds, blocks[0][1]]
+        else:
+            cells = GLYPH_TABLE[kinds, map_maze.fill]
+            for (block_top, block_left), block in blocks:
+                block_top -= top
+                block_left -= left
+                block_bottom = block_top+block.shape[0]
+                block_right = block_left+block.shape[1]
+                cells[block_top:block_bottom, block_left:block_right] = \
+                    GLYPH_TABLE[kinds[block_top:block_bottom, block_left:block_right], block]
+        if position is not None and map_maze.contains(position):
+            cells[position[y]-top, position[x]-left] = ROBOT_CODES[direction % 4]
+        frame = np.empty((height+1, (width+1)*CELL_WIDTH+1), dtype=np.uint32)
+        frame[0, :CELL_WIDTH] = to_codes("   ")
+        frame[0, CELL_WIDTH:-1] = to_codes("".join(format_label(j) for j in range(left, left+width)))
+        frame[1:, :CELL_WIDTH] = to_codes("".join(format_label(i) for i in range(top, top+height))).reshape(height, CELL_WIDTH)
+        frame[1:, CELL_WIDTH:-1] = cells.reshape(height, width*CELL_WIDTH)
+        frame[:, -1] = NEWLINE_CODE
+        return frame
+
+    def render(self, map_maze, position=None, direction: int = NORTH) -> str:
+        """フレーム全体を文字列で返す関数(ロガーに渡す用 引数はrender_codesと同じ)
+
+        Returns:
+            str: 描画したマップ(行ごとに改行 最後の改行はない)
+        """
+        return self.render_codes(map_maze, position, direction).tobytes().decode("utf-32-le")[:-1]
+
+    def render_diff(self, map_maze, position=None, direction: int = NORTH, row: int = 1) -> str:
+        """前のフレームから変わった行だけを書き直すANSIエスケープシーケンスの文字列を返す関数
+
+        マップが伸びたとき(大きさか左上の座標が変わったとき)と最初の1回は画面を消して全体を描く
+
+        Args:
+            map_maze (MazeMap): 描画するマップ
+            position (optional): ロボットの位置(y,x)
+            direction (int, optional): ロボットの向き
+            row (int, optional): フレームの1行目を描く画面の行(1から)
+
+        Returns:
+            str: 端末に出力する文字列
+        """
+        frame = self.render_codes(map_maze, position, direction)
+        top_left = tuple(map_maze.top_left)
+        if self.previous is None or self.previous.shape != frame.shape or self.previous_top_left != top_left:
+            changed_rows = np.arange(frame.shape[0])
+            output = ["\x1b[{};1H\x1b[J".format(row)]
+        else:
+            changed_rows = np.flatnonzero(np.any(frame != self.previous, axis=1))
+            output = []
+        self.previous = frame
+        self.previous_top_left = top_left
+        for index in changed_rows:
+            output.append("\x1b[{};1H".format(row+index))
+            output.append(frame[index, :-1].tobytes().decode("utf-32-le"))
+        # カーソルをフレームの下に置く
+        output.append("\x1b[{};1H".format(row+frame.shape[0]))
+        return "".join(output)
+
+
+if __name__ == "__main__":
+    from MazeLogger import MazeLogger
+    from MazeSimulator import MazeSimulator
+    from MazeSolver import MazeSolver
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=16, help="迷路の一辺のタイル数")
+    parser.add_argument("--seed", type=int, default=0, help="迷路のシード")
+    args = parser.parse_args()
+
+    simulator = MazeSimulator.generate(args.size, args.size, args.seed, loop_ratio=0.15, black_ratio=0.05, bump_ratio=0.05,
+                                       silver_ratio=0.05, victim_ratio=0.1)
+    solver = MazeSolver(logger=MazeLogger(LOG_OFF))
+    renderer = MazeRenderer()
+    render_times = []
+    continue_flag = True
+    while continue_flag:
+        continue_flag, to_pico = solver.calc_to_pico(simulator.calc_from_pico())
+        simulator.apply(to_pico)
+        time_start = time.perf_counter()
+        output = renderer.render_diff(solver.map_maze, solver.position, solver.direction)
+        render_times.append(time.perf_counter()-time_start)
+        sys.stdout.write(output)
+        sys.stdout.flush()
+    render_times.sort()
+    print("render_diff p50: {:.3f} ms, p99: {:.3f} ms".format(
+        render_times[len(render_times)//2]*1000, render_times[len(render_times)*99//100]*1000))
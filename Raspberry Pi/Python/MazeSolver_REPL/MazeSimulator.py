@@ -0,0 +1,385 @@
+"""
+MazeSolverをPicoなしで動かすシミュレーター
+    迷路(壁・黒タイル・バンプ/坂・銀タイル・被災者)をテキストから読み込むか、シードを決めてランダムに作り、
+    実際のPicoが送るfrom_picoを計算してcalc_to_picoに渡し、返ってきた動作で機体を動かす
+
+迷路のテキスト((2*縦+1)行x(2*横+1)文字)
+    タイル: '.' 普通, 'X' 黒, 'o' 銀, '^' バンプ/坂, '@' 開始位置
+    壁: '#' 壁あり, ' ' 壁なし, '*' 熱源の被災者, 'H' 'S' 'U' 文字の被災者, 'r' 'y' 'g' 色の被災者
+    角: 何でもよい('+'など)
+
+センサーの見間違い
+    set_phantom_wallsで、壁がないところをある確率で壁と見間違える(壁があるところは見間違えない)
+    見間違えは実際の動きには影響しない(機体は実際の壁でだけ止まる)
+"""
+
+
+import contextlib
+import random
+import time
+
+import numpy as np
+
+from CostModel import CostModel
+from MazeConstants import *
+
+
+# テキストの文字とセルの値の対応
+CHAR_TILES = {'.': TILE_NONE, 'X': TILE_BLACK, 'o': TILE_SILVER, '^': TILE_BUMP_SLOPE, '@': TILE_NONE}
+CHAR_WALLS = {' ': WALL_NONE, '#': WALL_EXIST, '*': WALL_EXIST | VICTIM_HEATED,
+              'H': WALL_EXIST | VICTIM_H, 'S': WALL_EXIST | VICTIM_S, 'U': WALL_EXIST | VICTIM_U,
+              'r': WALL_EXIST | VICTIM_RED, 'y': WALL_EXIST | VICTIM_YELLOW, 'g': WALL_EXIST | VICTIM_GREEN}
+
+
+class MazeSimulator():
+    """迷路とその中の機体の位置・向きを持ち、Picoの代わりをするクラス
+    """
+
+    def __init__(self, maze, start_position: tuple[int, int] = (1, 1), start_direction: int | None = None):
+        """
+        Args:
+            maze: (2*縦+1)x(2*横+1)の配列 タイルはTILE_*、壁はWALL_EXIST/WALL_NONEと被災者(VICTIM_*)
+            start_position (tuple[int, int], optional): 開始位置(y,x)
+            start_direction (int | None, optional): 開始時の向き(Noneなら後ろが壁で前が開いている向き)
+        """
+        self.maze = np.array(maze, dtype=np.uint8)
+        self.start_position = (start_position[y], start_position[x])
+        if start_direction is None:
+            start_direction = self.choose_start_direction()
+        self.start_direction = start_direction
+        # 機体が動くのにかかる時間(robot_timeの計算用 実機に合わせるときは置き換える)
+        self.cost_model = CostModel()
+        # 壁がないところを壁と見間違える確率と、そのための乱数(set_phantom_wallsで設定する)
+        self.phantom_wall_rate = 0.0
+        self.noise = random.Random(0)
+        self.reset()
+
+    def reset(self):
+        """機体を開始位置に戻す関数"""
+        self.position = self.start_position
+        self.direction = self.start_direction
+        # 次のfrom_picoで知らせること
+        self.passed_bump = False
+        self.found_black = False
+        # 最後の指示で実際に入ったタイルの数(黒タイル・バンプ/坂のタイルも数える まだ指示がなければNone)
+        self.tiles_moved = None
+        # 通ったタイルと、Picoに知らされた被災者の壁
+        self.visited = {self.position}
+        self.reported_victims = set()
+        # 機体が動くのにかかった時間の合計[ms]
+        self.robot_time = 0
+
+    def choose_start_direction(self) -> int:
+        """後ろが壁で、できれば前が開いている向きを選ぶ関数"""
+        candidates = [direction for direction in range(4) if self.is_wall(self.start_position, (direction+BACK) % 4)]
+        for direction in candidates:
+            if not self.is_wall(self.start_position, direction):
+                return direction
+        return candidates[0] if candidates else NORTH
+
+    @classmethod
+    def from_text(cls, text: str, start_direction: int | None = None) -> "MazeSimulator":
+        """テキストから迷路を作る関数
+
+        Args:
+            text (str): 迷路のテキスト(モジュールのdocstringの形式)
+            start_direction (int | None, optional): 開始時の向き
+
+        Returns:
+            MazeSimulator: 作ったシミュレーター
+        """
+        lines = [line for line in text.splitlines() if line.strip()]
+        width = max(len(line) for line in lines)
+        maze = np.full((len(lines), width), UNUSED, dtype=np.uint8)
+        start_position = (1, 1)
+        for i, line in enumerate(lines):
+            for j, char in enumerate(line.ljust(width)):
+                if i % 2 == 1 and j % 2 == 1:
+                    maze[i, j] = CHAR_TILES[char]
+                    if char == '@':
+                        start_position = (i, j)
+                elif (i+j) % 2 == 1:
+                    maze[i, j] = CHAR_WALLS[char]
+        return cls(maze, start_position, start_direction)
+
+    @classmethod
+    def load(cls, path: str, start_direction: int | None = None) -> "MazeSimulator":
+        """ファイルから迷路のテキストを読み込む関数"""
+        with open(path, encoding="utf-8") as file:
+            return cls.from_text(file.read(), start_direction)
+
+    def to_text(self) -> str:
+        """迷路をテキストにする関数(from_textの逆)"""
+        tiles = {value: char for char, value in CHAR_TILES.items() if char != '@'}
+        walls = {value: char for char, value in CHAR_WALLS.items()}
+        lines = []
+        for i in range(self.maze.shape[0]):
+            line = ""
+            for j in range(self.maze.shape[1]):
+                if (i, j) == self.start_position:
+                    line += '@'
+                elif i % 2 == 1 and j % 2 == 1:
+                    line += tiles[self.maze[i, j]]
+                elif (i+j) % 2 == 1:
+                    line += walls[self.maze[i, j]]
+                else:
+                    line += '+'
+            lines.append(line)
+        return "\n".join(lines)+"\n"
+
+    @classmethod
+    def generate(cls, height: int, width: int, seed: int, loop_ratio: float = 0.1, black_ratio: float = 0.0,
+                 bump_ratio: float = 0.0, silver_ratio: float = 0.0, victim_ratio: float = 0.0) -> "MazeSimulator":
+        """穴掘り法で迷路を作り、ループ・黒タイル・バンプ/坂・銀タイル・被災者を置く関数
+
+        開始位置は左上のタイル どのタイルにも開始位置から行けるように置く
+
+        Args:
+            height (int): 縦のタイル数
+            width (int): 横のタイル数
+            seed (int): 乱数のシード(同じなら同じ迷路になる)
+            loop_ratio (float, optional): 取り除く内側の壁の割合
+            black_ratio (float, optional): 黒タイルにするタイルの割合
+            bump_ratio (float, optional): バンプ/坂にする(通路になっている)タイルの割合
+            silver_ratio (float, optional): 銀タイルにするタイルの割合
+            victim_ratio (float, optional): 被災者を置く壁の割合
+
+        Returns:
+            MazeSimulator: 作ったシミュレーター
+        """
+        rng = random.Random(seed)
+        maze = np.full((height*2+1, width*2+1), WALL_EXIST, dtype=np.uint8)
+        maze[0::2, 0::2] = UNUSED
+        maze[1::2, 1::2] = TILE_NONE
+        # 穴掘り法
+        visited = np.zeros((height, width), dtype=bool)
+        visited[0, 0] = True
+        stack = [(0, 0)]
+        while stack:
+            tile_y, tile_x = stack[-1]
+            candidates = [(direction, tile_y+MV[direction][y], tile_x+MV[direction][x]) for direction in range(4)]
+            candidates = [candidate for candidate in candidates
+                          if 0 <= candidate[1] < height and 0 <= candidate[2] < width and not visited[candidate[1], candidate[2]]]
+            if not candidates:
+                stack.pop()
+                continue
+            direction, next_y, next_x = rng.choice(candidates)
+            maze[tile_y*2+1+MV[direction][y], tile_x*2+1+MV[direction][x]] = WALL_NONE
+            visited[next_y, next_x] = True
+            stack.append((next_y, next_x))
+        # ループを作る
+        for i in range(1, height*2):
+            for j in range(1, width*2):
+                if (i+j) % 2 == 1 and maze[i, j] == WALL_EXIST and rng.random() < loop_ratio:
+                    maze[i, j] = WALL_NONE
+        simulator = cls(maze)
+        tiles = [(i, j) for i in range(1, height*2, 2) for j in range(1, width*2, 2) if (i, j) != simulator.start_position]
+        # 黒タイル(ほかのタイルに行けなくなるなら置かない)
+        for position in rng.sample(tiles, int(len(tiles)*black_ratio)):
+            simulator.maze[position] = TILE_BLACK
+            if not simulator.is_connected():
+                simulator.maze[position] = TILE_NONE
+        # バンプ/坂(両側が壁で前後が開いている通路に置き、前後は普通のタイルにする)
+        for position in rng.sample(tiles, int(len(tiles)*bump_ratio)):
+            for direction in (NORTH, WEST):
+                side = (direction+LEFT) % 4
+                ends = [simulator.get_neighbor(position, direction), simulator.get_neighbor(position, (direction+BACK) % 4)]
+                if (simulator.is_wall(position, side) and simulator.is_wall(position, (side+BACK) % 4)
+                        and not simulator.is_wall(position, direction) and not simulator.is_wall(position, (direction+BACK) % 4)
+                        and all(simulator.maze[end] == TILE_NONE and end != simulator.start_position for end in ends)
+                        and simulator.maze[position] == TILE_NONE):
+                    simulator.maze[position] = TILE_BUMP_SLOPE
+        # 銀タイル
+        for position in rng.sample(tiles, int(len(tiles)*silver_ratio)):
+            if simulator.maze[position] == TILE_NONE:
+                simulator.maze[position] = TILE_SILVER
+        # 被災者(黒タイル以外に面している壁)
+        victims = (VICTIM_HEATED, VICTIM_H, VICTIM_S, VICTIM_U, VICTIM_RED, VICTIM_YELLOW, VICTIM_GREEN)
+        for i in range(height*2+1):
+            for j in range(width*2+1):
+                if (i+j) % 2 == 1 and maze[i, j] == WALL_EXIST and rng.random() < victim_ratio:
+                    faces = [(i+1, j), (i-1, j)] if i % 2 == 0 else [(i, j+1), (i, j-1)]
+                    if any(simulator.is_inside(face) and simulator.maze[face] not in (TILE_BLACK, TILE_BUMP_SLOPE) for face in faces):
+                        simulator.maze[i, j] = WALL_EXIST | rng.choice(victims)
+        return simulator
+
+    def is_inside(self, position: tuple[int, int]) -> bool:
+        """positionが迷路の中にあるか"""
+        return 0 <= position[y] < self.maze.shape[0] and 0 <= position[x] < self.maze.shape[1]
+
+    def is_wall(self, position: tuple[int, int], direction: int) -> bool:
+        """positionのタイルからdirection(絶対的な向き)の方向に壁があるか(迷路の外も壁)"""
+        wall = (position[y]+MV[direction][y], position[x]+MV[direction][x])
+        return not self.is_inside(wall) or self.maze[wall] & MASK_WALL_EXIST == WALL_EXIST
+
+    def get_victim(self, position: tuple[int, int], direction: int) -> int:
+        """positionのタイルからdirection(絶対的な向き)の方向の壁にある被災者"""
+        if self.is_wall(position, direction):
+            return self.maze[position[y]+MV[direction][y], position[x]+MV[direction][x]] & MASK_VICTIM
+        return VICTIM_NONE
+
+    def get_neighbor(self, position: tuple[int, int], direction: int) -> tuple[int, int]:
+        """positionのタイルからdirection(絶対的な向き)の方向の隣のタイル"""
+        return (position[y]+MV[direction][y]*2, position[x]+MV[direction][x]*2)
+
+    def is_connected(self) -> bool:
+        """黒タイル以外のすべてのタイルに開始位置から行けるか"""
+        reached = {self.start_position}
+        stack = [self.start_position]
+        while stack:
+            position = stack.pop()
+            for direction in range(4):
+                neighbor = self.get_neighbor(position, direction)
+                if not self.is_wall(position, direction) and neighbor not in reached and self.maze[neighbor] != TILE_BLACK:
+                    reached.add(neighbor)
+                    stack.append(neighbor)
+        return len(reached) == np.count_nonzero((self.maze[1::2, 1::2] != TILE_BLACK) & (self.maze[1::2, 1::2] != UNKNOWN))
+
+    def set_phantom_walls(self, rate: float, seed: int = 0):
+        """センサーが壁のないところを壁と見間違えるようにする関数
+
+        Args:
+            rate (float): 壁がない向きを1回見るごとに壁と見間違える確率
+            seed (int, optional): 見間違えの乱数のシード(同じなら同じところで見間違える)
+        """
+        self.phantom_wall_rate = rate
+        self.noise = random.Random(seed)
+
+    def calc_from_pico(self) -> int:
+        """今の位置・向きで実際のPicoが送るデータを計算する関数
+
+        Returns:
+            int: from_pico
+        """
+        from_pico = 0
+        if self.passed_bump:
+            from_pico |= 1 << BUMP_SLOPE
+        if self.found_black:
+            # 黒タイルから戻ったときは壁の情報を送らない
+            return from_pico | 1 << BLACK
+        if self.maze[self.position] == TILE_SILVER:
+            from_pico |= 1 << SILVER
+        for bit_wall, bit_heat, direction_from_robot in ((WALL_R, HEAT_R, RIGHT), (WALL_F, None, FRONT), (WALL_L, HEAT_L, LEFT)):
+            direction = (self.direction+direction_from_robot) % 4
+            if self.is_wall(self.position, direction):
+                from_pico |= 1 << bit_wall
+                if bit_heat is not None and self.get_victim(self.position, direction) == VICTIM_HEATED:
+                    from_pico |= 1 << bit_heat
+            elif self.phantom_wall_rate and self.noise.random() < self.phantom_wall_rate:
+                from_pico |= 1 << bit_wall
+        return from_pico
+
+    def detect_victims(self, victim_queue):
+        """カメラの代わりに、今の位置の右と左の壁にある視覚的被災者(熱以外)をvictim_queueにputする関数"""
+        for direction_from_robot in (RIGHT, LEFT):
+            victim = self.get_victim(self.position, (self.direction+direction_from_robot) % 4)
+            if victim not in (VICTIM_NONE, VICTIM_HEATED):
+                victim_queue.put(direction_from_robot, victim)
+
+    def apply(self, to_pico: int, tiles: int = 1):
+        """calc_to_picoが返したデータに従って機体を動かす関数
+
+        黒タイルに入ったら1つ前のタイルに戻り(向きはそのまま)、バンプ/坂に入ったらそのまま次のタイルまで進む
+        tilesが2以上なら、回転してからtilesタイルまっすぐ進む(黒タイル・バンプ/坂・壁があればそこで止まる)
+        実際に入ったタイルの数はtiles_movedに入れる
+        かかった時間をcost_modelでrobot_timeに足す
+
+        Args:
+            to_pico (int): picoに送るデータ
+            tiles (int, optional): 進むタイルの数(MazeSolver.run_tiles)
+        """
+        # 報告された被災者
+        for shift, direction_from_robot in ((SHIFT_VICTIM_R, RIGHT), (SHIFT_VICTIM_L, LEFT)):
+            if to_pico >> shift & MASK_VICTIM != VICTIM_NONE:
+                direction = (self.direction+direction_from_robot) % 4
+                self.reported_victims.add((self.position[y]+MV[direction][y], self.position[x]+MV[direction][x]))
+        direction_from_robot = MOVE_DIRECTIONS[to_pico & MOVE_BACK]
+        self.direction = (self.direction+direction_from_robot) % 4
+        self.robot_time += self.cost_model.turn_costs[direction_from_robot]
+        if self.is_wall(self.position, self.direction):
+            raise RuntimeError("ran into a wall at {} facing {}".format(self.position, self.direction))
+        self.passed_bump = False
+        self.found_black = False
+        self.tiles_moved = 0
+        while self.tiles_moved < tiles:
+            # 2タイル目からは前に壁があれば止まる
+            if self.tiles_moved > 0 and self.is_wall(self.position, self.direction):
+                break
+            self.move_forward()
+            if self.found_black or self.passed_bump:
+                break
+
+    def move_forward(self):
+        """向いている方向に1タイル進む関数"""
+        position = self.get_neighbor(self.position, self.direction)
+        self.tiles_moved += 1
+        self.found_black = self.maze[position] == TILE_BLACK
+        if self.found_black:
+            # 入って戻る
+            self.robot_time += self.cost_model.move*2
+            return
+        if self.maze[position] == TILE_BUMP_SLOPE:
+            self.passed_bump = True
+            self.visited.add(position)
+            self.robot_time += self.cost_model.bump_slope
+            position = self.get_neighbor(position, self.direction)
+        self.robot_time += self.cost_model.tile_costs[self.maze[position]]
+        self.position = position
+        self.visited.add(position)
+
+    def count_tiles(self) -> int:
+        """黒タイル以外のタイルの数"""
+        tiles = self.maze[1::2, 1::2]
+        return int(np.count_nonzero((tiles != TILE_BLACK) & (tiles != UNKNOWN)))
+
+    def count_victims(self) -> int:
+        """迷路にある被災者の数"""
+        is_wall = np.indices(self.maze.shape).sum(axis=0) % 2 == 1
+        return int(np.count_nonzero(self.maze[is_wall] & MASK_VICTIM))
+
+    def run(self, solver, max_steps: int = 100000, quiet: bool = True, delay: float = 0.0) -> dict:
+        """solverで迷路を探索し、終わる(calc_to_picoが継続しないと返す)まで動かす関数
+
+        Args:
+            solver (MazeSolver): 探索するMazeSolver
+            max_steps (int, optional): 最大のステップ数
+            quiet (bool, optional): solverのログを出力しないか
+            delay (float, optional): 機体が動く時間の代わりに1ステップごとに待つ時間[s](先読みの確認用)
+            solverにvictim_queueがあれば、毎ステップの前にdetect_victimsでカメラの認識の代わりをする
+
+        Returns:
+            dict: steps(ステップ数), step_times(ステップごとの時間[s]), visited(通ったタイルの数), tiles(タイルの数),
+                  returned(開始位置に戻ったか), victims(報告した被災者の数), robot_time(機体が動いた時間[ms]),
+                  coverage_steps・coverage_time(すべてのタイルを通ったときのステップ数と機体が動いた時間[ms] 通らなければNone)
+        """
+        step_times = []
+        continue_flag = True
+        tile_count = self.count_tiles()
+        coverage_steps = coverage_time = None
+        victim_queue = getattr(solver, "victim_queue", None)
+        with solver.logger.muted() if quiet else contextlib.nullcontext():
+            while continue_flag and len(step_times) < max_steps:
+                from_pico = self.calc_from_pico()
+                if victim_queue is not None:
+                    self.detect_victims(victim_queue)
+                time_start = time.perf_counter()
+                continue_flag, to_pico, tiles = solver.calc_command(from_pico, self.tiles_moved)
+                step_times.append(time.perf_counter()-time_start)
+                solver.start_speculation()
+                self.apply(to_pico, tiles)
+                if coverage_steps is None and len(self.visited) >= tile_count:
+                    coverage_steps = len(step_times)
+                    coverage_time = self.robot_time
+                if delay:
+                    time.sleep(delay)
+        return {
+            "steps": len(step_times),
+            "step_times": step_times,
+            "visited": len(self.visited),
+            "tiles": tile_count,
+            "returned": not continue_flag and self.position == self.start_position,
+            "victims": len(self.reported_victims),
+            "robot_time": self.robot_time,
+            "coverage_steps": coverage_steps,
+            "coverage_time": coverage_time,
+        }
@@ -1,152 +1,290 @@
 """
-Todo
-    - 坂とかのコスト計算
-    - ロガー機能
-    - 再開機能
+迷路探索のクラス
+    picoから送られてきたセンサーの情報でマップを作り、次の動作を決めてpicoに送る
+
+    max_runを2以上にすると、経路をたどるときにまっすぐ続く既知のタイルを1つの指示(回転 + run_tilesタイル前進)にまとめる
+    このときpicoは指示ごとにセンサーの情報と実際に入ったタイルの数(tiles_moved)を返し、
+    黒タイルや予想外の壁で途中で止まったら、止まったタイルから経路を計算し直す
+
+    speculativeにすると、機体が動いている間に次の行き止まりからの経路をSpeculativePlannerで先読みする
+    (picoに送った後にstart_speculationを呼ぶ)
+
+    map_typeをMAP_CHUNKEDにすると、マップを書き込んだところだけ確保するChunkedMazeMapで持つ
+    (とても広い迷路や、坂の先の離れたエリアがあるときに、メモリと描画の時間が探索したところの大きさに比例する)
+
+    time_budgetを渡すと、動作のコスト(CostModel)で見積もった経過時間と、スタートを根にしたIncrementalPlannerで
+    毎ステップ求めるスタートに戻るコストから、制限時間に間に合わなくなる前に探索をやめてスタートに戻る
+    (経過時間はpicoに送った指示から見積もるので、ジャーナルを再生しても同じ時にスタートに戻る)
+
+    victim_queue(VictimQueue)を渡すと、カメラの認識を毎ステップ待たずに取り出し、キャプチャしたときの姿勢で決めた壁のセルに溜めて、
+    その壁が右か左に来たステップで報告する
+
+    ステップごとの入力・指示・姿勢はtraceに固定長で記録し、exportで終わったときのマップなどと一緒に書き出す(MazeExport)
+
+    センサーで見た壁は重ねずに票の多数決で決める(MazeMapBase.vote_wall)ので、一度の見間違いで通れなくなることはない
+    前の指示で機体が通った壁は、それまでの票によらず壁なしにする(見間違えた壁に囲まれて動けなくならない)
+    経路をたどっている間は、経路が通る壁が票で通れなくなったときだけ、今のタイルから経路を計算し直す
+    check_wallsにすると、毎ステップマップ全体の壁の食い違いをWallCheckで調べ、新しく見つかったものをログに出す
+
+    NumPyはimportしない(MAP_DENSEのマップのクラスはMazeBackendで選ぶ)
+    Wavefront・MazeRenderer・WallCheck・SpeculativePlanner(concurrent.futures)は使うときにimportするので、起動が速い
 """
 
 
-import numpy as np
-
-
-# 被災者の定数
-VICTIM_NONE = 0b000
-VICTIM_H = 0b001
-VICTIM_S = 0b010
-VICTIM_U = 0b011
-VICTIM_RED = 0b100
-VICTIM_YELLOW = 0b101
-VICTIM_GREEN = 0b110
-VICTIM_HEATED = 0b111
-MASK_VICTIM = 0b111
-
-# Picoに送るときシフトする量
-SHIFT_VICTIM_R = 3
-SHIFT_VICTIM_L = 0
-
-# 動作の定数
-MOVE_FORWARD = 0b00000000
-MOVE_RIGHT = 0b01000000
-MOVE_LEFT = 0b10000000
-MOVE_BACK = 0b11000000
-
-# bitsの桁に対応する情報
-BUMP_SLOPE = 7
-BLACK = 6
-SILVER = 5
-HEAT_R = 4
-HEAT_L = 3
-WALL_R = 2
-WALL_F = 1
-WALL_L = 0
-
-# 視覚的被災者の配列
-victim = [VICTIM_NONE, VICTIM_NONE, VICTIM_NONE, VICTIM_NONE]
-# 視覚的被災者の定数(victimのインデックス)
-CHARACTER_R = 0
-COLOR_R = 1
-CHARACTER_L = 2
-COLOR_L = 3
-
-# 知らない壁・タイル
-UNKNOWN = 0
-
-# 壁の状態
-WALL_UNKNOWN = UNKNOWN
-WALL_NONE = 0b01000
-WALL_EXIST = 0b10000
-WALL_VIRTUAL = 0b11000
-MASK_WALL = 0b11000
-MASK_WALL_EXIST = 0b10000
-
-# タイルの状態
-TILE_UNKNOWN = UNKNOWN
-TILE_UNEXPLORED = 1
-TILE_NONE = 2
-TILE_SILVER = 3
-TILE_BLACK = 4
-TILE_BUMP_SLOPE = 5
-
-# 配列の中で使わない場所
-UNUSED = 0b0000_0000
-
-# コストの定数
-COST_MOVE = 1
-COST_TURN = 1
-COST_BUMP = 10000
-
-# 開始時をNORTHとした絶対的な向き（北から反時計回りに0,1,2,3なので加算・減算で回転が表現できる 4の剰余をとれば向きが得られる）
-NORTH = 0
-WEST = 1
-SOUTH = 2
-EAST = 3
-
-# ロボットからみた向き（上と同じ定義）
-FRONT = 0
-LEFT = 1
-BACK = 2
-RIGHT = 3
-
-# 操作量(Manipulated Value) 順にNORTH, WEST, SOUTH, EAST これをpositionに加算すると移動できる
-MV = ((-1, 0), (0, -1), (1, 0), (0, 1))
-
-# x,y軸の定数(インデックス)
-x, y = (1, 0)
+import heapq
+
+from Checkpoint import Checkpoint
+from CostModel import CostModel
+from ExplorationStrategy import make_strategy
+from Frontier import Frontier
+from IncrementalPlanner import IncrementalPlanner
+from MazeConstants import *
+from MazeBackend import get_map_class
+from MazeLogger import TRACE_RECORD, MazeLogger
+from MazeMapBase import MazeMapBase
+from MazeProfiler import MazeProfiler
 
 
 class MazeSolver():
     """迷路探索のクラス
+
+    状態はすべてインスタンスごとに持つので、1つのプロセスでいくつ作ってもよい
     """
 
-    # 迷路のマップ
-    map_maze = np.array([
-        [UNUSED, UNKNOWN, UNUSED],
-        [UNKNOWN, UNKNOWN, UNKNOWN],
-        [UNUSED, UNKNOWN, UNUSED]
-    ])
-    # マップのサイズ(y,x)
-    map_size = [1, 1]
-    # ロボットの位置(y,x)
-    position = [1, 1]
-    # 開始位置
-    start_position = [1, 1]
-
-    # 現在のロボットの向き
-    direction = NORTH
-
-    # 未探索タイルのリスト
-    unknown_tiles = []
-    # 経路
-    path = []
-    # 経路をたどっているか
-    is_routing = False
-    # 探索の初回か
-    is_first = True
-
-    def __init__(self):
+    def __init__(self, frontier_strategy: int = FRONTIER_LIFO, planner: int = PLANNER_HEAP, logger: MazeLogger | None = None,
+                 profiler: MazeProfiler | None = None, cost_model: CostModel | None = None, max_run: int = 1,
+                 speculative: bool = False, map_type: int = MAP_DENSE, time_budget: int | None = None,
+                 time_margin: int = TIME_MARGIN, victim_queue=None, check_walls: bool = False):
+        """
+        Args:
+            frontier_strategy (int, optional): 探索の方針(FRONTIER_LIFO, FRONTIER_NEAREST, FRONTIER_INFORMATION_GAIN ExplorationStrategy)
+            planner (int, optional): 経路計算の方法(PLANNER_HEAP, PLANNER_INCREMENTAL, PLANNER_WAVEFRONT)
+            logger (MazeLogger | None, optional): ログの出力先(NoneならLOG_INFO以上を標準出力に出す)
+            profiler (MazeProfiler | None, optional): フェーズごとの時間などを集計するプロファイラ(Noneなら測らない)
+            cost_model (CostModel | None, optional): 経路計算で使う動作のコスト(Noneなら初期値)
+            max_run (int, optional): 1つの指示で進む最大のタイル数(1なら1タイルずつ 最大254)
+            speculative (bool, optional): 行き止まりからの経路を別のスレッドで先読みするか(集計はspeculator.stats())
+            map_type (int, optional): マップの持ち方(MAP_DENSE, MAP_CHUNKED)
+            time_budget (int | None, optional): 競技の制限時間[ms](Noneなら時間を気にせずすべて探索する)
+            time_margin (int, optional): 残り時間がスタートに戻るコスト+time_marginより短くなったら戻る[ms]
+            victim_queue (VictimQueue | None, optional): カメラで見つけた被災者を受け取るキュー(Noneなら熱だけ)
+            check_walls (bool, optional): 毎ステップ壁の食い違いを調べるか(最後の結果はwall_issues NumPyを使う)
+        """
+        self.frontier_strategy = frontier_strategy
+        # 次に向かう未探索タイルを選ぶ方針(ExplorationStrategy)
+        self.strategy = make_strategy(frontier_strategy)
+        self.max_run = min(max(max_run, 1), TILES_MOVED_NONE-1)
+        self.planner = planner
+        self.cost_model = CostModel() if cost_model is None else cost_model
+        self.logger = MazeLogger() if logger is None else logger
+        self.profiler = profiler
+        # マップを描画するMazeRenderer(最初に描画するときに作る)
+        self.renderer = None
+        self.speculator = None
+        if speculative:
+            from SpeculativePlanner import SpeculativePlanner
+            self.speculator = SpeculativePlanner()
+        # ゴールの位置(y,x)ごとのIncrementalPlanner
+        self.incremental_planners = {}
+        # 迷路のマップ(マップを伸ばしても座標が変わらないMazeMap・LiteMazeMap・ChunkedMazeMap)
+        self.map_type = map_type
+        self.map_maze = get_map_class(map_type)([
+            [UNUSED, UNKNOWN, UNUSED],
+            [UNKNOWN, UNKNOWN, UNKNOWN],
+            [UNUSED, UNKNOWN, UNUSED]
+        ], UNKNOWN)
+        # マップのサイズ(y,x)
+        self.map_size = [1, 1]
+        # ロボットの位置(y,x)
+        self.position = [1, 1]
+        # 開始位置
+        self.start_position = [1, 1]
+        # 現在のロボットの向き
+        self.direction = NORTH
+        # 経路
+        self.path = []
+        # 経路をたどっているか
+        self.is_routing = False
+        # 探索の初回か
+        self.is_first = True
+        # まだ報告していない視覚的被災者(壁のセルの座標(y,x)から被災者)
+        self.victim_walls = {}
+        # 最後の指示で進むタイルの数
+        self.run_tiles = 1
+        # 最後の指示の前の位置と進むタイルの位置(途中で止まったときに戻す用)
+        self.run_path = []
+        # 未探索タイルの集合
+        self.unknown_tiles = Frontier()
+        # 制限時間と余裕[ms]
+        self.time_budget = time_budget
+        self.time_margin = time_margin
+        # 動作のコストで見積もった経過時間[ms]
+        self.elapsed_time = 0
+        # 時間が足りなくなってスタートに戻っているか
+        self.is_returning = False
+        # 最後に計算したスタートに戻るコストとそのときのelapsed_time(次のステップからの上限の見積もり用)
+        self.return_estimate = None
+        # カメラで見つけた被災者を受け取るキュー
+        self.victim_queue = victim_queue
+        # calc_to_picoを呼んだ回数と、ステップごとの記録(TRACE_RECORDを並べたもの exportで書き出す)
+        self.steps = 0
+        self.trace = bytearray()
+        # 壁の食い違いを調べるかと、最後に調べた結果(WallCheck.check_walls)
+        self.check_walls = check_walls
+        self.wall_issues = None
+        # 経路が通る壁が塞がって経路を計算し直した回数
+        self.wall_replans = 0
+        # replayで再生しているステップの記録したpicoに送るデータ(報告する被災者は記録のものを使う 再生中でなければNone)
+        self.recorded_to_pico = None
         # 最初に各方向に1つずつマップを拡張
         for i in range(4):
             self.extend_map(i)
 
-    def set_map(self, status: int, direction_from_robot: int | None = None, is_tile: bool = False):
+    def get_state(self) -> dict:
+        """マップ以外の探索の状態をJSONにできるdictで返す関数(マップはmap_maze.bufferとmap_maze.get_state())
+
+        Returns:
+            dict: 探索の状態
+        """
+        return {
+            "frontier_strategy": self.frontier_strategy,
+            "planner": self.planner,
+            "map_type": self.map_type,
+            "cost_model": self.cost_model.to_dict(),
+            "map_size": list(self.map_size),
+            "position": list(self.position),
+            "start_position": list(self.start_position),
+            "direction": self.direction,
+            "path": [list(position) for position in self.path],
+            "is_routing": self.is_routing,
+            "is_first": self.is_first,
+            "unknown_tiles": list(self.unknown_tiles),
+            "victim_walls": [[wall_position[y], wall_position[x], victim] for wall_position, victim in self.victim_walls.items()],
+            "max_run": self.max_run,
+            "run_tiles": self.run_tiles,
+            "run_path": [list(position) for position in self.run_path],
+            "time_budget": self.time_budget,
+            "time_margin": self.time_margin,
+            "elapsed_time": self.elapsed_time,
+            "is_returning": self.is_returning,
+            "steps": self.steps,
+        }
+
+    def set_state(self, state: dict, map_maze: MazeMapBase):
+        """get_stateの結果とマップから探索の状態を戻す関数
+
+        Args:
+            state (dict): get_stateの結果
+            map_maze (MazeMapBase): マップ(map_typeがMAP_CHUNKEDならChunkedMazeMap)
+        """
+        self.frontier_strategy = state["frontier_strategy"]
+        self.strategy = make_strategy(self.frontier_strategy)
+        self.planner = state["planner"]
+        self.map_type = state.get("map_type", MAP_DENSE)
+        self.cost_model = CostModel.from_dict(state["cost_model"])
+        self.map_maze = map_maze
+        self.map_size = list(state["map_size"])
+        self.position = list(state["position"])
+        self.start_position = list(state["start_position"])
+        self.direction = state["direction"]
+        self.path = [list(position) for position in state["path"]]
+        self.is_routing = state["is_routing"]
+        self.is_first = state["is_first"]
+        self.unknown_tiles = Frontier(state["unknown_tiles"])
+        self.victim_walls = {(wall_y, wall_x): victim for wall_y, wall_x, victim in state.get("victim_walls", [])}
+        self.max_run = state.get("max_run", 1)
+        self.run_tiles = state.get("run_tiles", 1)
+        self.run_path = [list(position) for position in state.get("run_path", [])]
+        self.time_budget = state.get("time_budget")
+        self.time_margin = state.get("time_margin", TIME_MARGIN)
+        self.elapsed_time = state.get("elapsed_time", 0)
+        self.is_returning = state.get("is_returning", False)
+        self.steps = state.get("steps", 0)
+        # ステップごとの記録はスナップショットに入れないので、ここからのステップだけになる
+        self.trace = bytearray()
+        self.return_estimate = None
+        # IncrementalPlannerは次に使うときに作り直す
+        self.incremental_planners = {}
+
+    @classmethod
+    def restore(cls, directory: str, logger: MazeLogger | None = None, **kwargs) -> tuple["MazeSolver", int | None]:
+        """Checkpointのディレクトリから探索を再開するMazeSolverを作る関数
+
+        最新のスナップショットを読み込み(マップはメモリマップ)、その後のジャーナルだけをcalc_to_picoで再生する
+
+        Args:
+            directory (str): Checkpointのディレクトリ
+            logger (MazeLogger | None, optional): ログの出力先
+            **kwargs: 止まる前と同じMazeSolverの引数(スナップショットがあればその状態を使う)
+
+        Returns:
+            tuple[MazeSolver, int | None]: 再開するMazeSolver, 最後にpicoに送ったデータ(ジャーナルが空ならNone)
+        """
+        solver = cls(logger=logger, **kwargs)
+        last_to_pico = Checkpoint(directory).restore(solver)
+        return solver, last_to_pico
+
+    def export(self, path: str):
+        """マップ・姿勢・未探索タイル・ステップごとの記録を1つのバイナリファイルに書き出す関数(MazeExport.save_run)"""
+        from MazeExport import save_run
+        save_run(path, self)
+
+    @classmethod
+    def load(cls, path: str, logger: MazeLogger | None = None, **kwargs) -> "MazeSolver":
+        """exportで書き出したファイルから、書き出したときの状態のMazeSolverを作る関数(マップはメモリマップ)
+
+        Args:
+            path (str): exportで書き出したファイル
+            logger (MazeLogger | None, optional): ログの出力先
+            **kwargs: MazeSolverのそのほかの引数(状態はファイルのものを使う)
+        """
+        from MazeExport import load_solver
+        return load_solver(path, logger, **kwargs)
+
+    def set_map(self, status: int, direction_from_robot: int | None = None, is_tile: bool = False) -> bool:
         """マップにデータをsetする関数
 
+        壁のWALL_NONEとWALL_EXISTはセンサーで見たものとして票を加え(vote_wall)、WALL_VIRTUALはそのまま重ねる(add_wall)
+
         Args:
-            status (int): マップにsetするデータ
+            status (int): マップにsetするデータ(タイルならTILE_*、壁ならWALL_*かVICTIM_*)
             direction_from_robot (int | None, optional): setする壁のロボットから見た向き(ロボットがいるタイルにsetする場合(デフォルト)はNone).
             is_tile: ロボットの隣のタイルをsetするか デフォルトはfalse(壁をsetする)
+
+        Returns:
+            bool: タイル・壁・被災者の状態が変わったか(壁の票の数だけが変わったときはFalse)
         """
-        # ロボットがいるタイルにset
-        if direction_from_robot == None:
-            self.map_maze[self.position[y]][self.position[x]] = status
-        # ロボットの隣のタイルにset
-        elif is_tile:
-            self.map_maze[self.position[y]+(MV[(self.direction+direction_from_robot) % 4][y])*2
-                          ][self.position[x] + (MV[(self.direction+direction_from_robot) % 4][x])*2] = status
-        # 壁にset
+        position = self.get_map_position(self.position, self.direction, direction_from_robot, is_tile)
+        # タイルにset
+        if direction_from_robot == None or is_tile:
+            changed = self.map_maze.set_tile(position, status)
+        # 壁に被災者をset
+        elif status & MASK_VICTIM:
+            changed = self.map_maze.set_victim(position, status)
+        # 決めた壁(黒タイルの手前など)をset
+        elif status == WALL_VIRTUAL:
+            changed = self.map_maze.add_wall(position, status)
+        # センサーで見た壁を多数決でset
         else:
-            self.map_maze[self.position[y]+MV[(self.direction+direction_from_robot) % 4][y]
-                          ][self.position[x] + MV[(self.direction+direction_from_robot) % 4][x]] |= status
+            changed = self.map_maze.vote_wall(position, status)
+        if changed:
+            self.notify_change(position)
+        return changed
+
+    def notify_change(self, position: tuple[int, int]):
+        """positionのセルが変わったことをIncrementalPlannerに知らせる関数"""
+        for planner in self.incremental_planners.values():
+            planner.notify(position)
+
+    def pass_walls(self, start_position: tuple[int, int], end_position: tuple[int, int]):
+        """機体がstart_positionからまっすぐend_positionまで進んで通った壁を、壁なしにする関数(WALL_PASSED_VOTESの票を加える)"""
+        step_y = (end_position[y] > start_position[y])-(end_position[y] < start_position[y])
+        step_x = (end_position[x] > start_position[x])-(end_position[x] < start_position[x])
+        for i in range((abs(end_position[y]-start_position[y])+abs(end_position[x]-start_position[x]))//2):
+            wall = (start_position[y]+step_y*(i*2+1), start_position[x]+step_x*(i*2+1))
+            if self.map_maze.vote_wall(wall, WALL_NONE, WALL_PASSED_VOTES):
+                self.logger.info("Passed through a wall at {}", wall)
+                self.notify_change(wall)
 
     def get_map(self, position: tuple[int, int], direction: int, direction_from_robot: int | None = None, is_tile: bool = False) -> int:
         """マップの情報をgetする関数
@@ -160,14 +298,48 @@ class MazeSolver():
         Returns:
             int: getした値
         """
+        return self.map_maze[self.get_map_position(position, direction, direction_from_robot, is_tile)]
+
+    def get_map_position(self, position: tuple[int, int], direction: int, direction_from_robot: int | None = None, is_tile: bool = False) -> tuple[int, int]:
+        """get_map・set_mapで読み書きするセルの座標を計算する関数(引数はget_mapと同じ)
+
+        Returns:
+            tuple[int,int]: セルの座標(y,x)
+        """
         if direction_from_robot == None:
-            return self.map_maze[position[y]][position[x]]
+            return (position[y], position[x])
         elif is_tile:
-            return self.map_maze[position[y]+(MV[(direction+direction_from_robot) % 4][y])*2
-                                 ][position[x] + (MV[(direction+direction_from_robot) % 4][x])*2]
+            return (position[y]+(MV[(direction+direction_from_robot) % 4][y])*2,
+                    position[x]+(MV[(direction+direction_from_robot) % 4][x])*2)
         else:
-            return self.map_maze[position[y]+MV[(direction+direction_from_robot) % 4][y]
-                                 ][position[x] + MV[(direction+direction_from_robot) % 4][x]]
+            return (position[y]+MV[(direction+direction_from_robot) % 4][y],
+                    position[x]+MV[(direction+direction_from_robot) % 4][x])
+
+    def is_wall(self, position: tuple[int, int], direction: int, direction_from_robot: int) -> bool:
+        """positionからdirection_from_robotの方向に壁(WALL_EXISTかWALL_VIRTUAL)があるか
+
+        Args:
+            position(tuple[int,int]): position
+            direction(int): 機体の絶対的な向き
+            direction_from_robot (int): 壁のロボットから見た向き
+
+        Returns:
+            bool: 壁があるか
+        """
+        return self.map_maze.is_wall(self.get_map_position(position, direction, direction_from_robot))
+
+    def get_victim(self, position: tuple[int, int], direction: int, direction_from_robot: int) -> int:
+        """positionからdirection_from_robotの方向の壁にある被災者をgetする関数
+
+        Args:
+            position(tuple[int,int]): position
+            direction(int): 機体の絶対的な向き
+            direction_from_robot (int): 壁のロボットから見た向き
+
+        Returns:
+            int: 被災者(VICTIM_*)
+        """
+        return self.map_maze.get_victim(self.get_map_position(position, direction, direction_from_robot))
 
     def change_position(self, move: int):
         """moveの値に従ってpositionとdirectionを変える関数
@@ -187,13 +359,15 @@ class MazeSolver():
         elif move == MOVE_BACK:
             self.direction += 2
             self.change_position(MOVE_FORWARD)
-        if self.position[x] <= 1:
+        # マップの端のタイルにいたら拡張
+        top_left = self.map_maze.top_left
+        if self.position[x] <= top_left[x]+1:
             self.extend_map(WEST)
-        elif self.position[x] >= (self.map_size[x]-1)*2:
+        elif self.position[x] >= top_left[x]+(self.map_size[x]-1)*2:
             self.extend_map(EAST)
-        elif self.position[y] <= 1:
+        elif self.position[y] <= top_left[y]+1:
             self.extend_map(NORTH)
-        elif self.position[y] >= (self.map_size[y]-1)*2:
+        elif self.position[y] >= top_left[y]+(self.map_size[y]-1)*2:
             self.extend_map(SOUTH)
 
     def get_position(self, position: tuple[int, int], direction: int, direction_from_robot: int) -> list[int, int]:
@@ -210,329 +384,543 @@ class MazeSolver():
         return [position[y]+(MV[(direction+direction_from_robot) % 4][y])*2,
                 position[x]+(MV[(direction+direction_from_robot) % 4][x])*2]
 
-    def calc_path(self, start_position: tuple[int, int], goal_position: tuple[int, int]) -> list:
+    def calc_path(self, start_position: tuple[int, int], goal_position: tuple[int, int], start_direction: int | None = None) -> list:
         """start_positionからgoal_positionまでの最短経路を計算する関数
 
+        (タイル, 向き)を状態とするA*探索で、優先度付きキューと親へのポインタを使って経路を求める
+        plannerがPLANNER_INCREMENTALならゴールごとのIncrementalPlannerを使い、前回の計算結果を使い回す
+        PLANNER_WAVEFRONTならWavefrontで配列を使って一斉に計算する
+
         Args:
             start_position (tuple[int, int]): 開始位置
             goal_position (tuple[int, int]): 終了位置
+            start_direction (int | None, optional): 開始時の機体の向き(Noneなら今の向き)
 
         Returns:
-            list: 最短経路(通るタイルのpositionのリスト)
+            list: 最短経路(通るタイルのpositionのリスト 開始位置は含まずgoal_positionは含む 到達できなければ空)
         """
-        # ゴールから逆算していく
-        position = goal_position
-        # コストのマップを∞で初期化
-        cost_map = np.full(self.map_size, np.inf)
-        # 探索中の向き
-        direction = NORTH
-        # 探索中の経路
-        paths = []
-        # 継続フラグ
-        continue_flag = True
-        # start_positionまで到達できた経路
-        answer_paths = []
-        # 初回だけ例外処理(direction)
-        if position[y] > 1:
-            # 北に壁がないかつ北のタイルが探索済みか
-            if (self.get_map(position, direction, FRONT) & MASK_WALL_EXIST != WALL_EXIST
-                    and self.get_map(position, direction, FRONT, True) != TILE_UNKNOWN
-                    and self.get_map(position, direction, FRONT, True) != TILE_UNEXPLORED):
-                position_temp = self.get_position(position, direction, FRONT)
-                # スタートに到達した
-                if position_temp == start_position:
-                    continue_flag = False
-                    answer_paths.append([[position], (1, NORTH)])
-                # まだ到達していない
-                else:
-                    cost_map[position_temp[y]//2][position_temp[x]//2] = 1
-                    paths.append([[position_temp, goal_position], (1, NORTH)])
-        if position[x] < self.map_size[x]*2-1:
-            # 東に壁がないかつ東のタイルが探索済みか
-            if (self.get_map(position, direction, RIGHT) & MASK_WALL_EXIST != WALL_EXIST
-                    and self.get_map(position, direction, RIGHT, True) != TILE_UNKNOWN
-                    and self.get_map(position, direction, RIGHT, True) != TILE_UNEXPLORED):
-                position_temp = self.get_position(position, direction, RIGHT)
-                # スタートに到達した
-                if position_temp == start_position:
-                    continue_flag = False
-                    answer_paths.append([[position], (1, EAST)])
-                # まだ到達していない
-                else:
-                    cost_map[position_temp[y]//2][position_temp[x]//2] = 1
-                    paths.append([[position_temp, goal_position], (1, EAST)])
-        if position[x] > 1:
-            # 西に壁がないかつ西のタイルが探索済みか
-            if (self.get_map(position, direction, LEFT) & MASK_WALL_EXIST != WALL_EXIST
-                    and self.get_map(position, direction, LEFT, True) != TILE_UNKNOWN
-                    and self.get_map(position, direction, LEFT, True) != TILE_UNEXPLORED):
-                position_temp = self.get_position(position, direction, LEFT)
-                # スタートに到達した
-                if position_temp == start_position:
-                    continue_flag = False
-                    answer_paths.append([[position], (1, WEST)])
-                # まだ到達していない
-                else:
-                    cost_map[position_temp[y]//2][position_temp[x]//2] = 1
-                    paths.append([[position_temp, goal_position], (1, WEST)])
-        if position[y] < self.map_size[y]*2-1:
-            # 南に壁がないかつ南のタイルが探索済みか
-            if (self.get_map(position, direction, BACK) & MASK_WALL_EXIST != WALL_EXIST
-                    and self.get_map(position, direction, BACK, True) != TILE_UNKNOWN
-                    and self.get_map(position, direction, BACK, True) != TILE_UNEXPLORED):
-                position_temp = self.get_position(position, direction, BACK)
-                # スタートに到達した
-                if position_temp == start_position:
-                    continue_flag = False
-                    answer_paths.append(paths[[position], (1, SOUTH)])
-                # まだ到達していない
-                else:
-                    cost_map[position_temp[y]//2][position_temp[x]//2] = 1
-                    paths.append([[position_temp, goal_position], (1, SOUTH)])
-
-        # 経路を求めていく
-        while continue_flag:
-            # コストが最小のpathを取得し、その次に進めるタイルを求める
-            paths.sort(key=lambda x: x[1][0])
-            cost = paths[0][1][0]
-            min_paths = [i for i in paths if i[1][0] == cost]
-            paths = [i for i in paths if i[1][0] > cost]
-            for path in min_paths:
-                position = path[0][0]
-                direction = path[1][1]
-                # 前に壁がないかつ前のタイルが探索済みか
-                if (self.get_map(position, direction, FRONT) & MASK_WALL_EXIST != WALL_EXIST
-                        and self.get_map(position, direction, FRONT, True) != TILE_UNKNOWN
-                        and self.get_map(position, direction, FRONT, True) != TILE_UNEXPLORED):
-                    position_temp = self.get_position(position, direction, FRONT)
-                    # スタートに到達した
-                    if position_temp == start_position:
-                        continue_flag = False
-                        answer_paths.append(path)
-                    # 前のタイルがバンプか坂
-                    elif self.get_map(position, direction, FRONT) == TILE_BUMP_SLOPE:
-                        # 今のコスト+COST_BUMPが移動先のタイルのコストより小さい
-                        if cost+COST_BUMP < cost_map[position_temp[y]//2][position_temp[x]//2]:
-                            cost_map[position_temp[y]//2][position_temp[x]//2] = cost+COST_BUMP
-                            paths.append([[position_temp]+path[0], (cost+COST_BUMP, direction)])
-                    # 前のタイルが普通のタイル
-                    else:
-                        # 今のコスト+COST_MOVEが移動先のタイルのコストより小さい
-                        if cost+COST_MOVE < cost_map[position_temp[y]//2][position_temp[x]//2]:
-                            cost_map[position_temp[y]//2][position_temp[x]//2] = cost+COST_MOVE
-                            paths.append([[position_temp]+path[0], (cost+COST_MOVE, direction)])
-                # 右に壁がないかつ右のタイルが探索済みか
-                if (self.get_map(position, direction, RIGHT) & MASK_WALL_EXIST != WALL_EXIST
-                        and self.get_map(position, direction, RIGHT, True) != TILE_UNKNOWN
-                        and self.get_map(position, direction, RIGHT, True) != TILE_UNEXPLORED):
-                    position_temp = self.get_position(position, direction, RIGHT)
-                    # スタートに到達した
-                    if position_temp == start_position:
-                        continue_flag = False
-                        answer_paths.append(path)
-                    # 右のタイルがバンプか坂
-                    elif self.get_map(position, direction, RIGHT) == TILE_BUMP_SLOPE:
-                        # 今のコスト+COST_BUMPが移動先のタイルのコストより小さい
-                        if cost+COST_BUMP < cost_map[position_temp[y]//2][position_temp[x]//2]:
-                            cost_map[position_temp[y]//2][position_temp[x]//2] = cost+COST_BUMP
-                            paths.append([[position_temp]+path[0], (cost+COST_BUMP, direction)])
-                    # 右のタイルが普通のタイル
-                    else:
-                        # 今のコスト+COST_MOVE+COST_TURNが移動先のタイルのコストより小さい
-                        if cost+COST_MOVE+COST_TURN < cost_map[position_temp[y]//2][position_temp[x]//2]:
-                            cost_map[position_temp[y]//2][position_temp[x]//2] = cost+COST_MOVE+COST_TURN
-                            paths.append([[position_temp]+path[0], (cost+COST_MOVE+COST_TURN, direction)])
-                # 左に壁がないかつ左のタイルが探索済みか
-                if (self.get_map(position, direction, LEFT) & MASK_WALL_EXIST != WALL_EXIST
-                        and self.get_map(position, direction, LEFT, True) != TILE_UNKNOWN
-                        and self.get_map(position, direction, LEFT, True) != TILE_UNEXPLORED):
-                    position_temp = self.get_position(position, direction, LEFT)
-                    # スタートに到達した
-                    if position_temp == start_position:
-                        continue_flag = False
-                        answer_paths.append(path)
-                    # 左のタイルがバンプか坂
-                    elif self.get_map(position, direction, LEFT) == TILE_BUMP_SLOPE:
-                        # 今のコスト+COST_BUMPが移動先のタイルのコストより小さい
-                        if cost+COST_BUMP < cost_map[position_temp[y]//2][position_temp[x]//2]:
-                            cost_map[position_temp[y]//2][position_temp[x]//2] = cost+COST_BUMP
-                            paths.append([[position_temp]+path[0], (cost+COST_BUMP, direction)])
-                    # 左のタイルが普通のタイル
-                    else:
-                        # 今のコスト+COST_MOVE+COST_TURNが移動先のタイルのコストより小さい
-                        if cost+COST_MOVE+COST_TURN < cost_map[position_temp[y]//2][position_temp[x]//2]:
-                            cost_map[position_temp[y]//2][position_temp[x]//2] = cost+COST_MOVE+COST_TURN
-                            paths.append([[position_temp]+path[0], (cost+COST_MOVE+COST_TURN, direction)])
-        min_cost = float('inf')
-        answer_path = []
-        # コストが最小の経路を求める
-        for path in answer_paths:
-            if path[1][0] < min_cost:
-                min_cost = path[1][0]
-                answer_path = path
-        return answer_path[0]
+        goal = (goal_position[y], goal_position[x])
+        if start_direction is None:
+            start_direction = self.direction
+        if self.planner == PLANNER_WAVEFRONT:
+            from Wavefront import Wavefront
+            return Wavefront(self.map_maze, self.cost_model).calc_path(start_position, goal, start_direction)
+        if self.planner == PLANNER_INCREMENTAL:
+            if goal not in self.incremental_planners:
+                # スタート以外のゴールのIncrementalPlannerは最新の1つだけ残す
+                start = (self.start_position[y], self.start_position[x])
+                self.incremental_planners = {key: planner for key, planner in self.incremental_planners.items() if key == start}
+                self.incremental_planners[goal] = IncrementalPlanner(self.map_maze, goal, self.cost_model)
+            planner = self.incremental_planners[goal]
+            expanded = planner.expanded
+            path = planner.calc_path(start_position, start_direction)
+            if self.profiler is not None:
+                self.profiler.add("nodes_expanded", planner.expanded-expanded)
+            return path
+        return self.search_path(start_position, {goal}, start_direction,
+                                lambda position: self.calc_heuristic(position, goal))
+
+    def calc_path_to_nearest(self, start_position: tuple[int, int], goal_positions, start_direction: int | None = None) -> list:
+        """start_positionからgoal_positionsのうちコストが最小のタイルまでの経路を計算する関数
+
+        一度の探索で最初に確定したゴールで止めるので、ゴールごとにcalc_pathを呼ぶ必要はない
+        plannerがPLANNER_WAVEFRONTならWavefront、それ以外はsearch_pathで計算する
+
+        Args:
+            start_position (tuple[int, int]): 開始位置
+            goal_positions: 終了位置の候補(座標(y,x)のtupleで`in`が使えるもの Frontierなど)
+            start_direction (int | None, optional): 開始時の機体の向き(Noneなら今の向き)
+
+        Returns:
+            list: 最短経路(通るタイルのpositionのリスト 最後がたどり着くゴール 到達できなければ空)
+        """
+        if self.planner == PLANNER_WAVEFRONT:
+            from Wavefront import Wavefront
+            return Wavefront(self.map_maze, self.cost_model).calc_path_to_nearest(start_position, goal_positions,
+                                                                 self.direction if start_direction is None else start_direction)
+        return self.search_path(start_position, goal_positions, start_direction)
+
+    def search_path(self, start_position: tuple[int, int], goal_positions, start_direction: int | None = None, heuristic=None) -> list:
+        """start_positionからgoal_positionsのどれかまでの最短経路を探索する関数
+
+        (タイル, 向き)を状態とし、優先度付きキューと親へのポインタを使って経路を求める
+        heuristicを渡せばA*探索、渡さなければダイクストラ法になる
+
+        Args:
+            start_position (tuple[int, int]): 開始位置
+            goal_positions: 終了位置の候補(座標(y,x)のtupleで`in`が使えるもの)
+            start_direction (int | None, optional): 開始時の機体の向き(Noneなら今の向き)
+            heuristic (optional): 座標(y,x)のtupleを受け取ってゴールまでの推定コストを返す関数
+
+        Returns:
+            list: 最短経路(通るタイルのpositionのリスト 開始位置は含まずゴールは含む 到達できなければ空)
+        """
+        if start_direction is None:
+            start_direction = self.direction
+        if heuristic is None:
+            heuristic = lambda position: 0
+        start = (start_position[y], start_position[x])
+        if start in goal_positions:
+            return []
+        # 座標(y, x)のセルの値を読む関数(マップの持ち方によらない)
+        read = self.map_maze.reader()
+        # タイルが取りうる座標の範囲
+        top, left = self.map_maze.top_left[y], self.map_maze.top_left[x]
+        bottom, right = top+self.map_size[y]*2, left+self.map_size[x]*2
+        # ロボットから見た向きごとの回転のコストと、タイルの値ごとの入るコスト
+        turn_costs = self.cost_model.turn_costs
+        tile_costs = self.cost_model.tile_costs
+        # 状態(y, x, 向き)ごとの最小コストと親の状態
+        start_state = (start[0], start[1], start_direction % 4)
+        costs = {start_state: 0}
+        parents = {start_state: None}
+        # (推定コスト, -コスト, y, x, 向き)の優先度付きキュー(推定コストが同じならゴールに近い方を先に取り出す)
+        queue = [(heuristic(start), 0, *start_state)]
+        # 取り出した状態の数
+        expanded = 0
+        while queue:
+            _, cost, position_y, position_x, direction = heapq.heappop(queue)
+            cost = -cost
+            state = (position_y, position_x, direction)
+            # すでにより小さいコストで訪れている
+            if cost > costs[state]:
+                continue
+            expanded += 1
+            # ゴールに到達したら親をたどって経路を作る
+            if (position_y, position_x) in goal_positions:
+                path = []
+                while parents[state] is not None:
+                    path.append([state[0], state[1]])
+                    state = parents[state]
+                path.reverse()
+                if self.profiler is not None:
+                    self.profiler.add("nodes_expanded", expanded)
+                return path
+            for direction_from_robot in (FRONT, RIGHT, LEFT, BACK):
+                direction_next = (direction+direction_from_robot) % 4
+                # 壁があるか
+                if read(position_y+MV[direction_next][y], position_x+MV[direction_next][x]) & MASK_WALL_EXIST == WALL_EXIST:
+                    continue
+                next_y = position_y+MV[direction_next][y]*2
+                next_x = position_x+MV[direction_next][x]*2
+                if not (top < next_y < bottom and left < next_x < right):
+                    continue
+                tile = read(next_y, next_x)
+                # ゴール以外は探索済みで黒タイルでないタイルだけ通れる
+                if tile in (TILE_UNKNOWN, TILE_UNEXPLORED, TILE_BLACK) and (next_y, next_x) not in goal_positions:
+                    continue
+                cost_next = cost+turn_costs[direction_from_robot]+tile_costs[tile]
+                state_next = (next_y, next_x, direction_next)
+                if cost_next < costs.get(state_next, float('inf')):
+                    costs[state_next] = cost_next
+                    parents[state_next] = state
+                    heapq.heappush(queue, (cost_next+heuristic((next_y, next_x)),
+                                           -cost_next, *state_next))
+        if self.profiler is not None:
+            self.profiler.add("nodes_expanded", expanded)
+        return []
+
+    def calc_heuristic(self, position: tuple[int, int], goal_position: tuple[int, int]) -> int:
+        """A*探索で使うpositionからgoal_positionまでの推定コスト(マンハッタン距離x1タイル進む最小のコスト)を計算する関数
+
+        Args:
+            position (tuple[int, int]): position
+            goal_position (tuple[int, int]): 終了位置
+
+        Returns:
+            int: 推定コスト
+        """
+        return (abs(position[y]-goal_position[y])+abs(position[x]-goal_position[x]))//2*self.cost_model.min_move
 
     def extend_map(self, direction: int):
         """マップをdirectionの方向に拡張する関数
 
+        座標は変わらないので、position・start_position・unknown_tilesを書き換える必要はない
+
         Args:
             direction (int): 拡張する方向
         """
+        if self.profiler is not None:
+            time_start = self.profiler.now()
         if direction == NORTH:
-            temp = [[UNKNOWN for i in range(self.map_size[x]*2+1)]for j in range(2)]
-            self.map_maze = np.vstack((temp, self.map_maze))
-            temp = [0 for i in range(self.map_size[x])]
+            self.map_maze.extend(north=2)
             self.map_size[y] += 1
-            self.position[y] += 2
-            self.start_position[y] += 2
-            for tile in self.unknown_tiles:
-                tile[y] += 2
         elif direction == SOUTH:
-            temp = [[UNKNOWN for i in range(self.map_size[x]*2+1)]for j in range(2)]
-            self.map_maze = np.vstack((self.map_maze, temp))
-            temp = [0 for i in range(self.map_size[x])]
+            self.map_maze.extend(south=2)
             self.map_size[y] += 1
         elif direction == WEST:
-            temp = [[UNKNOWN, UNKNOWN]for i in range(self.map_size[y]*2+1)]
-            self.map_maze = np.hstack((temp, self.map_maze))
-            temp = [[0] for i in range(self.map_size[y])]
+            self.map_maze.extend(west=2)
             self.map_size[x] += 1
-            self.position[x] += 2
-            self.start_position[x] += 2
-            for tile in self.unknown_tiles:
-                tile[x] += 2
         elif direction == EAST:
-            temp = [[UNKNOWN, UNKNOWN]for i in range(self.map_size[y]*2+1)]
-            self.map_maze = np.hstack((self.map_maze, temp))
-            temp = [[0] for i in range(self.map_size[y])]
+            self.map_maze.extend(east=2)
             self.map_size[x] += 1
+        if self.profiler is not None:
+            self.profiler.lap("extend_map", time_start)
 
     def draw_map(self):
-        """標準出力にマップを描画する関数
+        """ロガー(LOG_DEBUG)にマップを描画する関数(出力しないレベルなら描画もしない)
+        """
+        self.logger.debug(self.render_map)
+
+    def render_map(self) -> str:
+        """マップを描画した文字列を返す関数
+
+        Returns:
+            str: 描画したマップ(行ごとに改行)
+        """
+        if self.renderer is None:
+            from MazeRenderer import MazeRenderer
+            self.renderer = MazeRenderer()
+        return self.renderer.render(self.map_maze, self.position, self.direction)
+
+    def is_path_blocked(self, walls: list) -> bool:
+        """wallsのうち通れなくなった壁のセルを、今の位置からpathをたどるときに通るか
+
+        Args:
+            walls (list): 状態が変わった壁のセルの座標(y,x)のリスト
+
+        Returns:
+            bool: 通る壁が塞がったか(通れなくなった壁がなければ経路を見ずにFalse)
+        """
+        walls = [wall for wall in walls if self.map_maze.is_wall(wall)]
+        if not walls or not self.path:
+            return False
+        positions = [self.position]+self.path
+        path_walls = {((position[y]+position_next[y])//2, (position[x]+position_next[x])//2)
+                      for position, position_next in zip(positions, positions[1:])}
+        return any(wall in path_walls for wall in walls)
+
+    def update_wall_issues(self):
+        """マップ全体の壁の食い違いを調べ(WallCheck.check_walls)、前のステップになかったものをログに出す関数"""
+        from WallCheck import check_walls
+        issues = check_walls(self.map_maze)
+        previous = {} if self.wall_issues is None else self.wall_issues
+        for kind, positions in issues.items():
+            for position in sorted(set(positions)-set(previous.get(kind, ()))):
+                self.logger.warning("Wall check: {} at {}", kind, position)
+        self.wall_issues = issues
+
+    def merge_victims(self, victims):
+        """カメラで見つけた被災者をvictim_wallsに溜める関数
+
+        同じ壁のセルはdictで1つにまとめ、違う被災者ならVICTIM_PRIORITYが大きい方を残す
+        すでに報告した壁と、壁がないとわかっているセルのものは捨てる
+
+        Args:
+            victims: (壁のセルの座標(y,x), 被災者)のリスト(VictimQueue.drainの結果)
+        """
+        for wall_position, victim in victims:
+            if (not self.map_maze.contains(wall_position) or self.map_maze.get_victim(wall_position) != VICTIM_NONE
+                    or self.map_maze.get_wall(wall_position) == WALL_NONE):
+                continue
+            victim_old = self.victim_walls.get(wall_position)
+            if victim_old is None or VICTIM_PRIORITY[victim] > VICTIM_PRIORITY[victim_old]:
+                self.victim_walls[wall_position] = victim
+
+    def plan_route(self) -> tuple[list, bool]:
+        """行き止まりで次に向かう経路を計算する関数
+
+        SpeculativePlannerのコピーから別のスレッドでも呼ぶので、状態は書き換えない
+        行ける未探索タイルがなかったときは、呼んだ側が元のMazeSolverでabandon_frontierを呼ぶ
+
+        Returns:
+            tuple[list, bool]: 経路, 行ける未探索タイルがなくスタートに戻る経路にしたか
+        """
+        # 未探索タイルがないか時間が足りなければスタートに戻る
+        if self.is_returning or len(self.unknown_tiles) == 0 and not self.is_first:
+            return self.calc_path(self.position, self.start_position), False
+        # 次に向かう未探索タイルは方針で選ぶ
+        path = self.strategy.choose_route(self)
+        if not path:
+            # 壁の見間違いなどで選んだタイルに行けなければ、行けるうちで最も近いタイルに向かう
+            path = self.calc_path_to_nearest(self.position, self.unknown_tiles)
+        if not path:
+            return self.calc_path(self.position, self.start_position), True
+        return path, False
+
+    def abandon_frontier(self):
+        """行ける未探索タイルがないとき(plan_routeの結果)に、未探索タイルを捨てて探索を終えることにする関数"""
+        self.logger.warning("No reachable unknown tiles, returning to start")
+        self.unknown_tiles = Frontier()
+
+    def calc_return_cost(self) -> float:
+        """今の位置と向きからスタートに戻るコスト[ms]を返す関数
+
+        スタートを根にしたIncrementalPlannerをincremental_plannersに残しておき、マップが変わったところだけ直すので、
+        毎ステップ呼んでも探索全体で計算し直すことはない
+
+        Returns:
+            float: コスト(戻れなければinf)
+        """
+        start = (self.start_position[y], self.start_position[x])
+        planner = self.incremental_planners.get(start)
+        if planner is None:
+            planner = self.incremental_planners[start] = IncrementalPlanner(self.map_maze, start, self.cost_model)
+        expanded = planner.expanded
+        cost = planner.calc_cost(self.position, self.direction)
+        if self.profiler is not None:
+            self.profiler.add("return_nodes_expanded", planner.expanded-expanded)
+        return cost
+
+    def check_time(self) -> bool:
+        """制限時間に間に合うようにスタートに戻り始めるか判定し、戻るなら経路をスタートへの経路にする関数
+
+        残り時間(time_budget-elapsed_time)からスタートに戻るコストを引いたものがtime_marginより短くなったら戻る
+        スタートにいるときと、スタートに戻れないときは戻らない
+        前に計算したコストに、その後に進んだ時間(来た道を戻る時間)と回転などの余分を足したものは今のコストの上限なので、
+        残り時間がその上限より長いうちはcalc_return_costを呼ばない(戻るかどうかの判定は毎ステップ計算したときと同じ)
+
+        Returns:
+            bool: 今戻り始めたか
+        """
+        if self.time_budget is None or self.is_returning or self.position == self.start_position:
+            return False
+        remaining = self.time_budget-self.elapsed_time-self.time_margin
+        if self.return_estimate is not None:
+            return_cost, elapsed_time = self.return_estimate
+            slack = self.cost_model.u_turn*2+max(self.cost_model.tile_costs)
+            if remaining >= return_cost+self.elapsed_time-elapsed_time+slack:
+                return False
+        return_cost = self.calc_return_cost()
+        if return_cost == float('inf'):
+            return False
+        self.return_estimate = (return_cost, self.elapsed_time)
+        if remaining >= return_cost:
+            return False
+        self.logger.info("Time is running out (elapsed {} ms, return {} ms), returning to start",
+                         self.elapsed_time, return_cost)
+        self.is_returning = True
+        self.is_routing = True
+        self.path = self.calc_path(self.position, self.start_position)
+        if self.speculator is not None:
+            self.speculator.cancel()
+        return True
+
+    def extend_run(self, direction: int, keep: int = 0) -> int:
+        """pathの先頭からdirectionにまっすぐ続くタイルを、今の指示に加える関数(max_runまで)
+
+        バンプ/坂のタイル(越えたところでpicoが止まって報告する)と未探索タイルの後には続けない
+
+        Args:
+            direction (int): 進む絶対的な向き
+            keep (int, optional): pathに残すタイルの数
+
+        Returns:
+            int: 指示で進むタイルの数
         """
-        print("   ", end="")
-        for i in range(self.map_size[x]*2+1):
-            print("{:2d} ".format(i), end="")
-        print()
-        for i in range(self.map_size[y]*2+1):
-            print("{:2d}".format(i), end=" ")
-            for j in range(self.map_size[x]*2+1):
-                if self.map_maze[i][j] & MASK_WALL == WALL_EXIST:
-                    if i % 2 == 0:
-                        print("━━━", end="")
-                    else:
-                        print(" ┃ ", end="")
-                elif self.map_maze[i][j] & MASK_WALL == WALL_VIRTUAL:
-                    if i % 2 == 0:
-                        print("───", end="")
-                    else:
-                        print(" │ ", end="")
-                elif [i, j] == self.position:
-                    if self.direction % 4 == NORTH:
-                        print(" ↑ ", end="")
-                    elif self.direction % 4 == WEST:
-                        print(" ← ", end="")
-                    elif self.direction % 4 == SOUTH:
-                        print(" ↓ ", end="")
-                    elif self.direction % 4 == EAST:
-                        print(" → ", end="")
+        run_tiles = 1
+        position = self.run_path[-1]
+        while run_tiles < self.max_run and len(self.path) > keep:
+            if self.map_maze.get_tile(position) in (TILE_BUMP_SLOPE, TILE_UNEXPLORED):
+                break
+            if self.get_position(position, direction, FRONT) != self.path[0] or self.is_wall(position, direction, FRONT):
+                break
+            position = self.path.pop(0)
+            self.run_path.append(position)
+            run_tiles += 1
+        return run_tiles
+
+    def interrupt_run(self, tiles_moved: int):
+        """指示の途中で止まったとき、止まったタイルまで位置を戻す関数
+
+        進まなかったタイルは経路に戻す(経路はcalc_to_picoで計算し直す)
+
+        Args:
+            tiles_moved (int): picoが実際に入ったタイルの数(黒タイル・バンプ/坂のタイルも数える)
+        """
+        self.logger.info("Stopped after {} of {} tiles", tiles_moved, self.run_tiles)
+        self.position = list(self.run_path[tiles_moved])
+        self.path = [list(position) for position in self.run_path[tiles_moved+1:]]+self.path
+        self.is_routing = len(self.path) > 0
+
+    def calc_command(self, from_pico: int, tiles_moved: int | None = None) -> tuple[bool, int, int]:
+        """calc_to_picoと同じで、指示で進むタイルの数(run_tiles)も返す関数(max_runが2以上のときの通信用)
+
+        Returns:
+            tuple[bool, int, int]: 迷路探索継続フラグ, picoに送るデータ, 進むタイルの数
+        """
+        continue_flag, to_pico = self.calc_to_pico(from_pico, tiles_moved)
+        return continue_flag, to_pico, self.run_tiles
+
+    def replay(self, reports, frame_size: int | None = None, expected=None) -> tuple[bytes, bool]:
+        """記録したpicoからのデータ(PicoLinkが受け取るbyte列)を続けてcalc_commandに通す関数
+
+        ログと描画はしない(loggerをmutedにする)ので、記録した走行の再生や経路計算を変えたときの比較に使う
+        探索が終わった(継続フラグがFalseになった)ら、残りのデータは使わない
+        expectedを渡すと、記録した指示と違う指示になったステップで止める(その後の記録した入力は実際の動きと合わない)
+        カメラで見つけた被災者(victim_queue)は記録にないので、expectedを渡したときは記録した被災者のbitをそのまま報告してマップに書き、
+        比べるのは動作(上位2bit)と進むタイルの数だけにする
+
+        Args:
+            reports: bytes・bytearray・memoryviewなど(frame_sizeが1ならfrom_pico、2なら(from_pico, tiles_moved)を並べたもの
+                     tiles_movedがTILES_MOVED_NONEのステップはNoneとして渡す)
+            frame_size (int | None, optional): 1ステップのbyte数(Noneならmax_runが1なら1、そうでなければ2 PicoLinkと同じ)
+            expected (optional): 記録したpicoに送るデータ(戻り値と同じ並び Noneなら比べない)
+
+        Returns:
+            tuple[bytes, bool]: picoに送るデータを並べたもの(frame_sizeが2なら(to_pico, run_tiles)ずつ), 探索継続フラグ
+                                (最後の状態はこのMazeSolverに残る)
+        """
+        data = memoryview(reports).cast("B")
+        if frame_size is None:
+            frame_size = 1 if self.max_run == 1 else 2
+        calc_command = self.calc_command
+        replies = bytearray()
+        continue_flag = True
+        with self.logger.muted():
+            try:
+                if frame_size == 1:
+                    for index, from_pico in enumerate(data):
+                        if expected is not None:
+                            self.recorded_to_pico = expected[index]
+                        continue_flag, to_pico, _ = calc_command(from_pico)
+                        replies.append(to_pico)
+                        if not continue_flag or expected is not None and (expected[index] ^ to_pico) & MOVE_BACK:
+                            break
                 else:
-                    print("   ", end="")
-            print("")
+                    for index, (from_pico, tiles_moved) in enumerate(zip(data[0::2], data[1::2])):
+                        if expected is not None:
+                            self.recorded_to_pico = expected[index*2]
+                        continue_flag, to_pico, run_tiles = calc_command(
+                            from_pico, None if tiles_moved == TILES_MOVED_NONE else tiles_moved)
+                        replies.append(to_pico)
+                        replies.append(run_tiles)
+                        if not continue_flag or expected is not None and ((expected[index*2] ^ to_pico) & MOVE_BACK
+                                                                          or expected[index*2+1] != run_tiles):
+                            break
+            finally:
+                self.recorded_to_pico = None
+        return bytes(replies), continue_flag
 
-    def calc_to_pico(self, from_pico: int) -> tuple[bool, int]:
+    def calc_to_pico(self, from_pico: int, tiles_moved: int | None = None) -> tuple[bool, int]:
         """picoから送られてきたデータからpicoに送るデータを計算する関数
 
         Args:
             from_pico(int): picoから送られてきたデータ
+            tiles_moved (int | None, optional): 前の指示でpicoが実際に入ったタイルの数(Noneならrun_tilesすべて
+                                                0なら回転した後、最初のタイルに入る前に止まった 前の指示がなければ使わない)
 
         Returns:
             tuple[bool, int]: 迷路探索継続フラグ, picoに送るデータ
         """
+        profiler = self.profiler
+        if profiler is not None:
+            time_step = time_phase = profiler.now()
 
         start_flag = True
-        # ビットマスク
-        bits = []
-        for i in range(8):
-            bits.append(True if 1 & from_pico >> i else False)
+        # ビットマスク(表を引く)
+        bits = FROM_PICO_BITS[from_pico]
+        if profiler is not None:
+            time_phase = profiler.lap("phase/decode", time_phase)
+
+        # 指示の途中で止まった(最初のステップは前の指示がないので、picoが送ってくる0は使わない)
+        interrupted = tiles_moved is not None and len(self.run_path) > 0 and tiles_moved < self.run_tiles
+        if interrupted:
+            self.interrupt_run(tiles_moved)
+        # 前の指示で通った壁は壁がない(黒タイルに入ったときも、入るときに通っている)
+        if self.run_path:
+            self.pass_walls(self.run_path[0], self.position)
 
         # 7bit バンプ・坂道・階段通過
         if bits[BUMP_SLOPE]:
-            print("Passed bump/stairs/slope")
+            self.logger.info("Passed bump/stairs/slope")
+            # バンプ/坂を越えた時間(知っていたバンプ/坂なら少し多めの見積もりになる)
+            self.elapsed_time += self.cost_model.bump_slope
             self.set_map(TILE_BUMP_SLOPE)
-            self.set_map(WALL_EXIST, RIGHT)
-            self.set_map(WALL_EXIST, LEFT)
+            # バンプ/坂には横から入らない(隣のタイルから壁がないと見ても変わらないようにWALL_VIRTUALにする)
+            self.set_map(WALL_VIRTUAL, RIGHT)
+            self.set_map(WALL_VIRTUAL, LEFT)
+            self.unknown_tiles.discard(self.position)
+            bump_position = list(self.position)
             self.change_position(MOVE_FORWARD)
+            self.pass_walls(bump_position, self.position)
+            # 経路をたどっている途中なら、バンプ/坂の先のタイルまで進んだことにする
+            if self.is_routing and self.path and self.path[0] == self.position:
+                self.path.pop(0)
+                if len(self.path) == 0:
+                    self.is_routing = False
 
         # 6bit 黒タイル戻り
         if bits[BLACK]:
-            print("Found black")
+            self.logger.info("Found black")
+            # 黒タイルから戻った時間
+            self.elapsed_time += self.cost_model.move
             self.set_map(TILE_BLACK)
-            if self.position in self.unknown_tiles:
-                self.unknown_tiles.remove(self.position)
+            self.unknown_tiles.discard(self.position)
             self.change_position(MOVE_BACK)
             self.direction += 2
             self.set_map(WALL_VIRTUAL, FRONT)
 
-        if not (bits[BUMP_SLOPE] | bits[BLACK]):
+        if not bits[BLACK]:
             self.set_map(TILE_NONE)
 
         # 壁の情報出力
-        print("Wall R:{}, F:{}, L:{}".format(bits[WALL_R], bits[WALL_F], bits[WALL_L]))
+        self.logger.info("Wall R:{}, F:{}, L:{}", bits[WALL_R], bits[WALL_F], bits[WALL_L])
 
-        # 壁の情報をset
+        # 壁の情報をset(状態が変わった壁のセルの座標を残す)
+        changed_walls = []
         if not bits[BLACK]:
-            self.set_map(WALL_EXIST if bits[WALL_R] else WALL_NONE, RIGHT)
-            self.set_map(WALL_EXIST if bits[WALL_F] else WALL_NONE, FRONT)
-            self.set_map(WALL_EXIST if bits[WALL_L] else WALL_NONE, LEFT)
-
-        """ if bits[WALL_R]:
-            print("Character victim on right:", end="")
-            victim[CHARACTER_R] = int(input())
-            print("Color victim on right:", end="")
-            victim[COLOR_R] = int(input())
-        if bits[WALL_L]:
-            print("Character victim on left:", end="")
-            victim[CHARACTER_L] = int(input())
-            print("Color victim on left:", end="")
-            victim[COLOR_L] = int(input()) """
+            for bit, direction_from_robot in ((WALL_R, RIGHT), (WALL_F, FRONT), (WALL_L, LEFT)):
+                if self.set_map(WALL_EXIST if bits[bit] else WALL_NONE, direction_from_robot):
+                    changed_walls.append(self.get_map_position(self.position, self.direction, direction_from_robot))
 
         # picoに送るデータ
         to_pico = 0
 
-        # 被災者の計算
-        if bits[HEAT_R]:
-            if(self.get_map(self.position, self.direction, RIGHT) & MASK_VICTIM == VICTIM_NONE):
-                self.set_map(VICTIM_HEATED, RIGHT)
-                to_pico |= VICTIM_HEATED << SHIFT_VICTIM_R
-        elif victim[CHARACTER_R] != VICTIM_NONE:
-            if(self.get_map(self.position, self.direction, RIGHT) & MASK_VICTIM == VICTIM_NONE):
-                self.set_map(victim[CHARACTER_R], RIGHT)
-                to_pico |= victim[CHARACTER_R] << SHIFT_VICTIM_R
-        elif victim[COLOR_R] != VICTIM_NONE:
-            self.set_map(victim[COLOR_R], RIGHT)
-            if(self.get_map(self.position, self.direction, RIGHT) & MASK_VICTIM == VICTIM_NONE):
-                self.set_map(victim[COLOR_R], RIGHT)
-                to_pico |= victim[COLOR_R] << SHIFT_VICTIM_R
-        if bits[HEAT_L]:
-            if(self.get_map(self.position, self.direction, LEFT) & MASK_VICTIM == VICTIM_NONE):
-                self.set_map(VICTIM_HEATED, LEFT)
-                to_pico |= VICTIM_HEATED << SHIFT_VICTIM_L
-        elif victim[CHARACTER_L] != VICTIM_NONE:
-            if(self.get_map(self.position, self.direction, LEFT) & MASK_VICTIM == VICTIM_NONE):
-                self.set_map(victim[CHARACTER_L], LEFT)
-                to_pico |= victim[CHARACTER_L] << SHIFT_VICTIM_L
-        elif victim[COLOR_L] != VICTIM_NONE:
-            if(self.get_map(self.position, self.direction, LEFT) & MASK_VICTIM == VICTIM_NONE):
-                self.set_map(victim[COLOR_L], LEFT)
-                to_pico |= victim[COLOR_L] << SHIFT_VICTIM_L
+        # 被災者の計算(熱は今のセンサー、視覚はvictim_queueから取り出して壁のセルごとに溜めたもの)
+        # replayで再生しているときは、記録した指示の被災者をそのまま使う(カメラの認識は記録にない)
+        recorded_to_pico = self.recorded_to_pico
+        if self.victim_queue is not None and recorded_to_pico is None:
+            self.victim_queue.update_pose(self.position, self.direction)
+            self.merge_victims(self.victim_queue.drain())
+        for heat, shift, direction_from_robot in ((bits[HEAT_R], SHIFT_VICTIM_R, RIGHT), (bits[HEAT_L], SHIFT_VICTIM_L, LEFT)):
+            wall_position = self.get_map_position(self.position, self.direction, direction_from_robot)
+            victim = self.victim_walls.pop(wall_position, VICTIM_NONE)
+            if recorded_to_pico is not None:
+                victim = recorded_to_pico >> shift & MASK_VICTIM
+                if victim != VICTIM_NONE:
+                    self.set_map(victim, direction_from_robot)
+                    to_pico |= victim << shift
+                continue
+            # 見つけた被災者の壁に壁がなかったら誤認識
+            if victim != VICTIM_NONE and self.map_maze.get_wall(wall_position) == WALL_NONE:
+                victim = VICTIM_NONE
+            if heat:
+                victim = VICTIM_HEATED
+            if victim != VICTIM_NONE and self.map_maze.get_victim(wall_position) == VICTIM_NONE:
+                self.set_map(victim, direction_from_robot)
+                to_pico |= victim << shift
+
+        if profiler is not None:
+            time_phase = profiler.lap("phase/map_update", time_phase)
+
+        if self.check_walls:
+            self.update_wall_issues()
+            if profiler is not None:
+                time_phase = profiler.lap("phase/check_walls", time_phase)
 
         # 移動方向(MOVE_FORWARD, MOVE_BACK, MOVE_LEFT, MOVE_RIGHT)
         move = 0
 
-        # 今のタイルが未探索リストにあったなら削除する
-        if self.position in self.unknown_tiles:
-            self.unknown_tiles.remove(self.position)
+        # 今のタイルが未探索タイルにあったなら削除する
+        self.unknown_tiles.discard(self.position)
+
+        # 途中で止まったか経路が通る壁が塞がったら、今のタイルから経路のゴールまで計算し直す
+        replan = interrupted
+        if self.is_routing and not interrupted and self.is_path_blocked(changed_walls):
+            self.logger.info("Wall on the path is blocked, replanning")
+            self.wall_replans += 1
+            replan = True
+        if replan and self.is_routing:
+            if profiler is not None:
+                time_planning = profiler.now()
+            self.path = self.calc_path(self.position, self.path[-1])
+            self.is_routing = len(self.path) > 0
+            if profiler is not None:
+                time_phase += profiler.lap("phase/planning", time_planning)-time_planning
+
+        # 制限時間に間に合わなくなりそうならスタートに戻る
+        self.check_time()
 
         # 経路をたどっていない
         if not self.is_routing:
@@ -541,56 +929,53 @@ class MazeSolver():
                 self.set_map(WALL_EXIST, BACK)
                 self.is_first = False
             # 右に壁がないか
-            if self.get_map(self.position, self.direction, RIGHT) & MASK_WALL_EXIST != WALL_EXIST:
+            if not self.is_wall(self.position, self.direction, RIGHT):
                 right_position = self.get_position(self.position, self.direction, RIGHT)
                 # 右のタイルが未知か
                 if self.get_map(self.position, self.direction, RIGHT, True) == TILE_UNKNOWN:
-                    self.unknown_tiles.append(right_position)
+                    self.unknown_tiles.add(right_position)
                     self.set_map(TILE_UNEXPLORED, RIGHT, True)
             # 前に壁がないか
-            if self.get_map(self.position, self.direction, FRONT) & MASK_WALL_EXIST != WALL_EXIST:
+            if not self.is_wall(self.position, self.direction, FRONT):
                 front_position = self.get_position(self.position, self.direction, FRONT)
                 # 前のタイルが未知か
                 if self.get_map(self.position, self.direction, FRONT, True) == TILE_UNKNOWN:
-                    self.unknown_tiles.append(front_position)
+                    self.unknown_tiles.add(front_position)
                     self.set_map(TILE_UNEXPLORED, FRONT, True)
             # 左に壁がないか
-            if self.get_map(self.position, self.direction, LEFT) & MASK_WALL_EXIST != WALL_EXIST:
+            if not self.is_wall(self.position, self.direction, LEFT):
                 left_position = self.get_position(self.position, self.direction, LEFT)
                 # 左のタイルが未知か
                 if self.get_map(self.position, self.direction, LEFT, True) == TILE_UNKNOWN:
-                    self.unknown_tiles.append(left_position)
+                    self.unknown_tiles.add(left_position)
                     self.set_map(TILE_UNEXPLORED, LEFT, True)
-            # 右に壁がないかつ右のタイルが既知かつ未探索か
-            if self.get_map(self.position, self.direction, RIGHT) & MASK_WALL_EXIST != WALL_EXIST and self.get_map(self.position, self.direction, RIGHT, True) == TILE_UNEXPLORED:
-                move = MOVE_RIGHT
-            # 前に壁がないかつ前のタイルが既知かつ未探索か
-            elif self.get_map(self.position, self.direction, FRONT) & MASK_WALL_EXIST != WALL_EXIST and self.get_map(self.position, self.direction, FRONT, True) == TILE_UNEXPLORED:
-                move = MOVE_FORWARD
-            # 左に壁がないかつ左のタイルが既知かつ未探索か
-            elif self.get_map(self.position, self.direction, LEFT) & MASK_WALL_EXIST != WALL_EXIST and self.get_map(self.position, self.direction, LEFT, True) == TILE_UNEXPLORED:
-                move = MOVE_LEFT
+            # 隣の未探索タイルに進む向きを方針で選ぶ
+            direction_from_robot = self.strategy.choose_move(self)
+            if direction_from_robot is not None:
+                move = DIRECTION_MOVES[direction_from_robot]
             # それ以外 = 行き止まり
             else:
                 self.is_routing = True
-                # 未探索タイルがなければスタートに戻る
-                if len(self.unknown_tiles) == 0 and not self.is_first:
-                    self.path = self.calc_path(self.position, self.start_position)
-                # unknown_tilesの末尾のタイルに移動
-                else:
-                    self.path = self.calc_path(self.position, self.unknown_tiles[-1])
+                if profiler is not None:
+                    time_planning = profiler.now()
+                # 先読みした経路が使えなければ計算する(先読みの結果はtakeでabandon_frontierまで済ませる)
+                path = None if self.speculator is None else self.speculator.take(self)
+                if path is None:
+                    path, exhausted = self.plan_route()
+                    if exhausted:
+                        self.abandon_frontier()
+                self.path = path
+                if profiler is not None:
+                    # 経路計算の時間はdecideに含めない
+                    time_phase += profiler.lap("phase/planning", time_planning)-time_planning
 
+        self.run_tiles = 1
+        self.run_path = [list(self.position)]
         # 経路をたどっている
         if self.is_routing:
-            print('routing')
+            self.logger.info('routing')
             # pathの先頭のpositionに移動する
             position_next = self.path.pop(0)
-            # pathの最後
-            if len(self.path) == 0:
-                self.is_routing = False
-                # 未探索タイルがなくなった
-                if len(self.unknown_tiles) == 0:
-                    start_flag = False
             # position_nextに移動するmoveを決める
             if self.get_position(self.position, self.direction, FRONT) == position_next:
                 move = MOVE_FORWARD
@@ -600,19 +985,56 @@ class MazeSolver():
                 move = MOVE_LEFT
             elif self.get_position(self.position, self.direction, BACK) == position_next:
                 move = MOVE_BACK
-        # コンソールに出力
-        if move == MOVE_FORWARD:
-            print('Move forward')
-        elif move == MOVE_RIGHT:
-            print('Move right')
-        elif move == MOVE_LEFT:
-            print('Move left')
-        elif move == MOVE_BACK:
-            print('Move back')
-        print('Unknown tiles:', self.unknown_tiles)
+            self.run_path.append(position_next)
+            # まっすぐ続くタイルをまとめる
+            # スタートに戻る最後の指示の後は報告を受け取らないので、最後のタイルは1タイルの指示にする
+            if self.max_run > 1:
+                self.run_tiles = self.extend_run((self.direction+MOVE_DIRECTIONS[move]) % 4,
+                                                 1 if self.is_returning or len(self.unknown_tiles) == 0 else 0)
+            # pathの最後
+            if len(self.path) == 0:
+                self.is_routing = False
+                # 未探索タイルがなくなったか、時間が足りなくてスタートに戻った
+                if self.is_returning or len(self.unknown_tiles) == 0:
+                    start_flag = False
+        if profiler is not None:
+            time_phase = profiler.lap("phase/decide", time_phase)
+        # ログに出力
+        if self.run_tiles > 1:
+            self.logger.info("{} {} tiles", MOVE_NAMES[move], self.run_tiles)
+        else:
+            self.logger.info(MOVE_NAMES[move])
+        self.logger.debug('Unknown tiles: {}', self.unknown_tiles)
         self.draw_map()
+        if profiler is not None:
+            time_phase = profiler.lap("phase/log", time_phase)
+        # 指示にかかる時間を見積もる(未探索タイルは普通のタイルとする 探索中はrun_pathに進むタイルが入っていない)
+        self.elapsed_time += self.cost_model.turn_costs[MOVE_DIRECTIONS[move]]
+        for position in self.run_path[1:] or [self.get_position(self.position, self.direction, MOVE_DIRECTIONS[move])]:
+            self.elapsed_time += self.cost_model.tile_costs[self.map_maze.get_tile(position)]
         # 移動
         self.change_position(move)
+        for _ in range(self.run_tiles-1):
+            self.change_position(MOVE_FORWARD)
         # to_picoにmoveを入れて返す
         to_pico |= move
+        self.trace += TRACE_RECORD.pack(from_pico, TILES_MOVED_NONE if tiles_moved is None else tiles_moved, to_pico, self.run_tiles, self.direction % 4,
+                                        self.position[y], self.position[x], self.elapsed_time)
+        self.steps += 1
+        # 次のステップまでのカメラの認識は、移動した後の姿勢で壁のセルを決める
+        if self.victim_queue is not None and self.recorded_to_pico is None:
+            self.victim_queue.record_pose(self.position, self.direction)
+        self.logger.step(from_pico, to_pico, self.position, self.direction)
+        if profiler is not None:
+            profiler.lap("phase/move", time_phase)
+            profiler.lap("phase/step", time_step)
+            profiler.add("frontier_size", len(self.unknown_tiles))
+        # 機体が動いている間に、次のタイルが行き止まりだったときの経路を先読みする(計算はstart_speculationで始める)
+        if self.speculator is not None and start_flag and not self.is_routing:
+            self.speculator.prepare(self)
         return start_flag, to_pico
+
+    def start_speculation(self):
+        """picoに送った後に呼び、先読みの経路計算を始める関数(speculativeでなければ何もしない)"""
+        if self.speculator is not None:
+            self.speculator.start()
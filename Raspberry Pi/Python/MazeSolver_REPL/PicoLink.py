@@ -0,0 +1,306 @@
+"""
+Picoとのシリアル通信(asyncio)
+    テキストの1行ではなく、1byteをそのままやり取りする
+        Pico → Raspberry Pi: from_pico(センサーの情報) 1byte
+        Raspberry Pi → Pico: to_pico(動作の指示) 1byte
+    多タイル移動(MazeSolverのmax_runが2以上)のときは2byteずつ
+        Pico → Raspberry Pi: from_pico, tiles_moved(前の指示で実際に入ったタイルの数 最初は0
+                             0は回転した後、最初のタイルに入る前に止まったこと 1byteのときはtiles_movedがないのでNone)
+        Raspberry Pi → Pico: to_pico, run_tiles(回転してから前進するタイルの数)
+    受信のタイムアウト、タイムアウトしたときの最後の指示の再送、送信のバックプレッシャー(drain)がある
+    シリアルポートは標準ライブラリ(termios)でrawモードにするので、pyserialはいらない
+
+    python PicoLink.py /dev/ttyACM0          実際のPicoとつないで探索する
+    python PicoLink.py --simulate maze.txt   疑似端末(pty)の向こうでMazeSimulatorをPicoの代わりに動かす
+    python PicoLink.py --simulate --max-run 8   多タイル移動で動かす
+"""
+
+
+import argparse
+import asyncio
+import contextlib
+import os
+import pty
+import termios
+import time
+import tty
+
+
+def open_serial(path: str, baudrate: int = 115200) -> int:
+    """シリアルポートをrawモード・指定したボーレートで開く関数
+
+    Args:
+        path (str): デバイスのパス(/dev/ttyACM0など)
+        baudrate (int, optional): ボーレート
+
+    Returns:
+        int: ファイルディスクリプタ
+    """
+    fd = os.open(path, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+    tty.setraw(fd)
+    attributes = termios.tcgetattr(fd)
+    speed = getattr(termios, "B{}".format(baudrate))
+    attributes[4] = attributes[5] = speed
+    termios.tcsetattr(fd, termios.TCSANOW, attributes)
+    return fd
+
+
+def open_pty() -> tuple[int, int]:
+    """Picoの代わりに使う疑似端末のペアを開く関数
+
+    Returns:
+        tuple[int, int]: (Pico側のファイルディスクリプタ, Raspberry Pi側のファイルディスクリプタ)
+    """
+    master, slave = pty.openpty()
+    # 改行の変換やエコーをしないようにする
+    tty.setraw(slave)
+    return master, slave
+
+
+class PicoLink():
+    """1byte(frame_sizeが2以上ならframe_size byte)を受け取ってhandlerで返すことを繰り返す通信のクラス
+
+    frame_sizeが1ならデータはint、2以上ならintのtuple
+    """
+
+    def __init__(self, fd: int, handler=None, timeout: float | None = 1.0, resend: bool = False, max_resend: int = 3,
+                 frame_size: int = 1, on_sent=None):
+        """
+        Args:
+            fd (int): シリアルポート(またはpty)のファイルディスクリプタ
+            handler (optional): 受け取ったデータから(継続フラグ, 返すデータ)を返す関数(MazeSolver.calc_to_picoなど)
+            timeout (float | None, optional): 1つのデータを待つ時間[s](Noneなら待ち続ける)
+            resend (bool, optional): タイムアウトしたときに最後に送ったデータを送り直すか
+            max_resend (int, optional): 続けて送り直す最大の回数(超えたらTimeoutError)
+            frame_size (int, optional): 1つのデータのbyte数
+            on_sent (optional): handlerの結果を送った後に呼ぶ関数(MazeSolver.start_speculationなど)
+        """
+        self.fd = fd
+        self.handler = handler
+        self.timeout = timeout
+        self.resend = resend
+        self.max_resend = max_resend
+        self.frame_size = frame_size
+        self.on_sent = on_sent
+        # 最後に送ったデータ(再送用)
+        self.last_sent = None
+        # 受け取ってから送るまでの時間[s]
+        self.handle_times = []
+        self.reader = None
+        self.writer = None
+
+    async def open(self):
+        """fdをasyncioのStreamReader/StreamWriterにする関数"""
+        loop = asyncio.get_running_loop()
+        self.reader = asyncio.StreamReader()
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(self.reader),
+                                     os.fdopen(self.fd, "rb", buffering=0, closefd=False))
+        # 読み込みと書き込みで別のfdにして、片方を閉じてももう片方が使えるようにする
+        transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin,
+                                                            os.fdopen(os.dup(self.fd), "wb", buffering=0))
+        self.writer = asyncio.StreamWriter(transport, protocol, self.reader, loop)
+
+    def close(self):
+        """送信を閉じる関数(受信側のfdは呼び出した側が閉じる)"""
+        if self.writer is not None:
+            self.writer.close()
+
+    async def send(self, data):
+        """1つのデータ(frame_sizeが1ならint、そうでなければintのtuple)を送る関数(送信バッファがいっぱいなら空くまで待つ)
+
+        Raises:
+            EOFError: 相手が閉じた
+        """
+        self.last_sent = data
+        try:
+            self.writer.write(bytes((data,) if self.frame_size == 1 else data))
+            await self.writer.drain()
+        except OSError:
+            # drainは受信側のエラー(ptyは相手が閉じるとEIO)も投げる
+            raise EOFError("link closed")
+
+    async def receive(self):
+        """1つのデータを受け取る関数
+
+        タイムアウトしたとき、resendなら最後に送ったデータを送り直して待ち直す
+
+        Raises:
+            TimeoutError: タイムアウトした(送り直してもmax_resend回返事がなかった)
+            EOFError: 相手が閉じた
+
+        Returns:
+            int | tuple[int, ...]: 受け取ったデータ(frame_sizeが1ならint)
+        """
+        resend_count = 0
+        while True:
+            try:
+                data = await asyncio.wait_for(self.reader.readexactly(self.frame_size), self.timeout)
+            except asyncio.TimeoutError:
+                if not self.resend or self.last_sent is None or resend_count >= self.max_resend:
+                    raise TimeoutError("no frame received in {} s".format(self.timeout))
+                resend_count += 1
+                await self.send(self.last_sent)
+                continue
+            except (asyncio.IncompleteReadError, OSError):
+                # ptyは相手が閉じるとEIOになる
+                raise EOFError("link closed")
+            return data[0] if self.frame_size == 1 else tuple(data)
+
+    async def run(self, first=None):
+        """handlerが継続フラグをFalseにするまで、受け取ったデータにhandlerの結果を返し続ける関数
+
+        Args:
+            first (optional): 最初に受け取る前に送るデータ(Picoの代わりをするときのfrom_pico)
+        """
+        if first is not None:
+            await self.send(first)
+        continue_flag = True
+        while continue_flag:
+            data = await self.receive()
+            time_start = time.perf_counter()
+            continue_flag, data = self.handler(data)
+            self.handle_times.append(time.perf_counter()-time_start)
+            await self.send(data)
+            if self.on_sent is not None:
+                self.on_sent()
+
+
+async def run_solver(fd: int, solver, quiet: bool = False, checkpoint=None, last_sent: int | None = None,
+                     **kwargs) -> PicoLink:
+    """solver(MazeSolver)をhandlerにして探索が終わるまで通信する関数(max_runが2以上なら2byteずつ)
+
+    Args:
+        fd (int): シリアルポート(またはpty)のファイルディスクリプタ
+        solver (MazeSolver): 探索するMazeSolver
+        quiet (bool, optional): solverのログを出力しないか
+        checkpoint (Checkpoint, optional): 1ステップごとに記録するCheckpoint
+        last_sent (int | None, optional): 再開したときに最後にpicoに送ったデータ(resendで送り直す)
+        **kwargs: PicoLinkに渡す引数(timeout, resend, max_resend)
+
+    Returns:
+        PicoLink: 通信に使ったPicoLink(handle_timesなど)
+    """
+    def handler(from_pico: int) -> tuple[bool, int]:
+        continue_flag, to_pico = solver.calc_to_pico(from_pico)
+        if checkpoint is not None:
+            checkpoint.record(solver, from_pico, to_pico)
+        return continue_flag, to_pico
+
+    def handler_run(frame: tuple[int, int]) -> tuple[bool, tuple[int, int]]:
+        from_pico, tiles_moved = frame
+        continue_flag, to_pico, run_tiles = solver.calc_command(from_pico, tiles_moved)
+        if checkpoint is not None:
+            checkpoint.record(solver, from_pico, to_pico, tiles_moved)
+        return continue_flag, (to_pico, run_tiles)
+
+    if solver.max_run > 1:
+        link = PicoLink(fd, handler_run, frame_size=2, on_sent=solver.start_speculation, **kwargs)
+        link.last_sent = None if last_sent is None else (last_sent, solver.run_tiles)
+    else:
+        link = PicoLink(fd, handler, on_sent=solver.start_speculation, **kwargs)
+        link.last_sent = last_sent
+    await link.open()
+    try:
+        with solver.logger.muted() if quiet else contextlib.nullcontext():
+            await link.run()
+    except Exception:
+        # 止まる直前のステップを出力する
+        solver.logger.dump()
+        raise
+    finally:
+        link.close()
+    return link
+
+
+async def run_simulated_pico(fd: int, simulator, timeout: float | None = 1.0, frame_size: int = 1) -> list:
+    """simulator(MazeSimulator)をPicoの代わりに動かす関数(Raspberry Pi側が閉じるまで)
+
+    Args:
+        fd (int): pty(open_ptyのPico側)のファイルディスクリプタ
+        simulator (MazeSimulator): Picoの代わりをするMazeSimulator
+        timeout (float | None, optional): 1つのデータを待つ時間[s]
+        frame_size (int, optional): 2なら多タイル移動の2byteずつ
+
+    Returns:
+        list: from_picoを送ってからto_picoを受け取るまでの時間[s]のリスト
+    """
+    round_trip_times = []
+    time_sent = None
+
+    def handler(to_pico: int) -> tuple[bool, int]:
+        nonlocal time_sent
+        round_trip_times.append(time.perf_counter()-time_sent)
+        simulator.apply(to_pico)
+        time_sent = time.perf_counter()
+        return True, simulator.calc_from_pico()
+
+    def handler_run(frame: tuple[int, int]) -> tuple[bool, tuple[int, int]]:
+        nonlocal time_sent
+        round_trip_times.append(time.perf_counter()-time_sent)
+        simulator.apply(*frame)
+        time_sent = time.perf_counter()
+        return True, (simulator.calc_from_pico(), simulator.tiles_moved)
+
+    if frame_size == 1:
+        link = PicoLink(fd, handler, timeout)
+        first = simulator.calc_from_pico()
+    else:
+        link = PicoLink(fd, handler_run, timeout, frame_size=frame_size)
+        first = (simulator.calc_from_pico(), 0)
+    await link.open()
+    try:
+        time_sent = time.perf_counter()
+        await link.run(first)
+    except EOFError:
+        pass
+    finally:
+        link.close()
+    return round_trip_times
+
+
+async def simulate(simulator, solver, **kwargs) -> list:
+    """ptyのペアでsolverとsimulatorをつないで探索する関数
+
+    Returns:
+        list: 往復の時間[s]のリスト
+    """
+    pico_fd, solver_fd = open_pty()
+    pico = asyncio.create_task(run_simulated_pico(pico_fd, simulator, frame_size=2 if solver.max_run > 1 else 1))
+    try:
+        await run_solver(solver_fd, solver, quiet=True, **kwargs)
+    finally:
+        os.close(solver_fd)
+    round_trip_times = await pico
+    os.close(pico_fd)
+    return round_trip_times
+
+
+if __name__ == "__main__":
+    from MazeSimulator import MazeSimulator
+    from MazeSolver import MazeSolver
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("device", nargs="?", default="/dev/ttyACM0", help="Picoのシリアルポート")
+    parser.add_argument("--baudrate", type=int, default=115200, help="ボーレート")
+    parser.add_argument("--timeout", type=float, default=1.0, help="1byteを待つ時間[s]")
+    parser.add_argument("--resend", action="store_true", help="タイムアウトしたら最後の指示を送り直す")
+    parser.add_argument("--max-run", type=int, default=1, help="1つの指示で進む最大のタイル数(2以上で多タイル移動)")
+    parser.add_argument("--simulate", metavar="MAZE", nargs="?", const="",
+                        help="ptyの向こうでMazeSimulatorを動かす(迷路のテキストファイル 省略するとランダム)")
+    args = parser.parse_args()
+
+    solver = MazeSolver(max_run=args.max_run)
+    if args.simulate is None:
+        fd = open_serial(args.device, args.baudrate)
+        try:
+            asyncio.run(run_solver(fd, solver, timeout=args.timeout, resend=args.resend))
+        finally:
+            os.close(fd)
+    else:
+        simulator = MazeSimulator.load(args.simulate) if args.simulate else MazeSimulator.generate(8, 8, 0)
+        round_trip_times = sorted(asyncio.run(simulate(simulator, solver, timeout=args.timeout, resend=args.resend)))
+        print("steps: {}, visited: {}/{}, returned: {}".format(
+            len(round_trip_times), len(simulator.visited), simulator.count_tiles(),
+            simulator.position == simulator.start_position))
+        print("round trip p50: {:.3f} ms, p99: {:.3f} ms".format(
+            round_trip_times[len(round_trip_times)//2]*1000, round_trip_times[len(round_trip_times)*99//100]*1000))
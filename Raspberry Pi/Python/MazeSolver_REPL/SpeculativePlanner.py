@@ -0,0 +1,181 @@
+"""
+経路の先読み(投機的な経路計算)
+    picoに動作を送った後、機体が動いている間に、次のタイルが行き止まりだったときの経路を別のスレッドで計算しておく
+        calc_to_picoの最後にprepareし、picoに送った後にstartでマップなどをコピーして計算を始める
+        (送る前に始めると、計算のスレッドがGILを持っていて送るのが遅れる)
+    次のタイルについては「行き止まりになる」と仮定する
+        タイルはTILE_NONE、わかっている壁はそのまま
+        右・前・左のわからない壁は、未知・未探索のタイルとの間にはある(ないなら未探索タイルに進むので行き止まりにならない)、
+        通ったことのあるタイルとの間にはない
+    次のステップで行き止まりになったとき、位置・向き・そのタイルと周りの壁が仮定と同じなら、計算しておいた経路を使う
+    仮定が同じならマップと未探索タイルも同じなので、その場で計算したときと同じ経路になる(ジャーナルの再生とも一致する)
+    PLANNER_INCREMENTALは前回の計算結果を使い回していて、別のスレッドで同じ結果を作れないので先読みしない
+    コピーはロガー(出力しない)・方針・コストのモデル・書き換えるリストなどを自分のものにして、元のsolverと共有しない
+    plan_routeは状態を書き換えないので、行ける未探索タイルがなかったことはtakeで元のsolverに反映する(abandon_frontier)
+"""
+
+
+import copy
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from CostModel import CostModel
+from ExplorationStrategy import make_strategy
+from Frontier import Frontier
+from MazeConstants import *
+from MazeLogger import MazeLogger
+
+
+def get_cells(map_maze, position: tuple[int, int]) -> tuple[int, ...]:
+    """経路計算が読むpositionのタイルと4方向の壁の値を返す関数(被災者のビットは含まない)"""
+    return (map_maze[position],)+tuple(map_maze[(position[y]+MV[direction][y], position[x]+MV[direction][x])] & MASK_WALL
+                                       for direction in (NORTH, WEST, SOUTH, EAST))
+
+
+class SpeculativePlanner():
+    """MazeSolverの経路を別のスレッドで先読みするクラス
+    """
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="SpeculativePlanner")
+        # prepareしてまだstartしていないMazeSolver
+        self.pending = None
+        # 先読みしている(仮定, Future)
+        self.speculation = None
+        # 先読みした回数・使った回数・仮定が外れた回数・行き止まりにならず使わなかった回数
+        self.submitted = 0
+        self.hits = 0
+        self.misses = 0
+        self.unused = 0
+        # 使った先読みの経路計算の時間の合計と、そのうち結果を待った時間の合計[ns]
+        self.planning_time = 0
+        self.wait_time = 0
+
+    def make_key(self, solver) -> tuple:
+        """先読みの仮定(位置, 向き, タイルと周りの壁)を返す関数"""
+        position = (solver.position[y], solver.position[x])
+        return position, solver.direction, get_cells(solver.map_maze, position)
+
+    def prepare(self, solver):
+        """calc_to_picoの最後に呼び、次にstartで先読みするsolverを覚えておく関数
+
+        Args:
+            solver (MazeSolver): 移動した後(calc_to_picoの最後)のMazeSolver
+        """
+        self.cancel()
+        if solver.planner != PLANNER_INCREMENTAL:
+            self.pending = solver
+
+    def start(self):
+        """picoに送った後に呼び、行き止まりの仮定を書き込んだコピーで経路の計算を別のスレッドで始める関数
+
+        次のcalc_to_picoまでにsolverは変わらないので、コピーもここで作る(calc_to_picoの時間に含めない)
+        """
+        if self.pending is None:
+            return
+        solver = self.pending
+        self.pending = None
+        shadow = copy.copy(solver)
+        # インスタンスで上書きされた関数(時間を測るラッパーなど)は元のsolverのものを呼ぶので外す
+        for name in [name for name, value in vars(shadow).items() if callable(value) and hasattr(type(solver), name)]:
+            delattr(shadow, name)
+        # 元のsolverと共有すると、計算している間に書き換わったり、元のsolverに書き込んだりする
+        shadow.logger = MazeLogger(LOG_OFF)
+        shadow.strategy = make_strategy(solver.frontier_strategy)
+        shadow.cost_model = CostModel.from_dict(solver.cost_model.to_dict())
+        shadow.map_maze = solver.map_maze.copy()
+        shadow.map_size = list(solver.map_size)
+        shadow.position = list(solver.position)
+        shadow.start_position = list(solver.start_position)
+        shadow.path = [list(position) for position in solver.path]
+        shadow.run_path = [list(position) for position in solver.run_path]
+        shadow.unknown_tiles = Frontier(solver.unknown_tiles.tiles)
+        shadow.unknown_tiles.discard(shadow.position)
+        shadow.victim_walls = dict(solver.victim_walls)
+        shadow.victim_queue = None
+        shadow.trace = bytearray()
+        shadow.wall_issues = None
+        shadow.incremental_planners = {}
+        shadow.profiler = None
+        shadow.renderer = None
+        shadow.speculator = None
+        shadow.set_map(TILE_NONE)
+        for direction_from_robot in (RIGHT, FRONT, LEFT):
+            if shadow.get_map(shadow.position, shadow.direction, direction_from_robot) & MASK_WALL == WALL_UNKNOWN:
+                tile = shadow.get_map(shadow.position, shadow.direction, direction_from_robot, True)
+                shadow.set_map(WALL_EXIST if tile in (TILE_UNKNOWN, TILE_UNEXPLORED) else WALL_NONE, direction_from_robot)
+        self.speculation = (self.make_key(shadow), self.executor.submit(self.plan, shadow))
+        self.submitted += 1
+
+    @staticmethod
+    def plan(shadow) -> tuple[list, bool, int]:
+        """別のスレッドで経路を計算する関数
+
+        Returns:
+            tuple[list, bool, int]: 経路, 行ける未探索タイルがなかったか(plan_route), 計算にかかった時間[ns]
+        """
+        time_start = time.perf_counter_ns()
+        path, exhausted = shadow.plan_route()
+        return path, exhausted, time.perf_counter_ns()-time_start
+
+    def take(self, solver) -> list | None:
+        """行き止まりで経路が必要になったときに呼び、仮定が合っていれば先読みした経路を返す関数
+
+        行ける未探索タイルがなかった経路なら、その場で計算したときと同じようにsolverのabandon_frontierも呼ぶ
+
+        Args:
+            solver (MazeSolver): 行き止まりになったMazeSolver
+
+        Returns:
+            list | None: 先読みした経路(仮定が外れたか先読みしていなければNone)
+        """
+        if self.speculation is None:
+            self.cancel()
+            return None
+        key, future = self.speculation
+        self.speculation = None
+        if key != self.make_key(solver):
+            future.cancel()
+            self.misses += 1
+            return None
+        time_start = time.perf_counter_ns()
+        path, exhausted, planning_time = future.result()
+        self.wait_time += time.perf_counter_ns()-time_start
+        self.planning_time += planning_time
+        self.hits += 1
+        if exhausted:
+            solver.abandon_frontier()
+        return [list(position) for position in path]
+
+    def cancel(self):
+        """使わなかった先読みを捨てる関数"""
+        if self.pending is not None or self.speculation is not None:
+            self.unused += 1
+        self.pending = None
+        if self.speculation is not None:
+            self.speculation[1].cancel()
+            self.speculation = None
+
+    def stats(self) -> dict:
+        """先読みの集計を返す関数
+
+        Returns:
+            dict: submitted(startした回数), hits, misses, unused(回数), hit_rate(経路が必要になったときに使えた割合),
+                  planning_time, wait_time, saved_time(先読みで減った経路計算の待ち時間)[ns]
+        """
+        needed = self.hits+self.misses
+        return {
+            "submitted": self.submitted,
+            "hits": self.hits,
+            "misses": self.misses,
+            "unused": self.unused,
+            "hit_rate": self.hits/needed if needed else None,
+            "planning_time": self.planning_time,
+            "wait_time": self.wait_time,
+            "saved_time": self.planning_time-self.wait_time,
+        }
+
+    def close(self):
+        """スレッドを止める関数"""
+        self.cancel()
+        self.executor.shutdown(wait=True)
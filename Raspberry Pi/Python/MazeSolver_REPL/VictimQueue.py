@@ -0,0 +1,122 @@
+"""
+視覚的被災者(カメラで見つけた被災者)の受け渡し
+    カメラの認識は別のスレッド(やプロセスから読むスレッド)でput(キャプチャした時刻, ロボットから見た向き, VICTIM_*)し、
+    MazeSolver.calc_to_picoは毎ステップdrainで溜まっている分だけを取り出す(待たないので、動作の計算が認識で止まらない)
+    キューは長さに上限があり、いっぱいのときは古いものから捨てる(ロックは使わない dequeのappendとpopleftはスレッドセーフ)
+
+    キャプチャした時刻の姿勢(位置と向き)で、どの壁のセルの被災者かを決める
+        calc_to_picoの最後に「指示を送った後の位置と向き」をrecord_poseで記録し、
+        次のcalc_to_picoの最初に実際の位置(黒タイルや多タイル移動の途中で止まったとき)にupdate_poseで直す
+        ある時刻に記録した姿勢は、次の姿勢を記録するまで(移動中とそのタイルに着いてから)のキャプチャに使う
+    時刻はclock(省略するとtime.monotonic)で、putする側とMazeSolverで同じものを使う
+    認識の結果はジャーナルに入らないので、Checkpointから再開するときは、ジャーナルに記録した指示で報告した被災者をそのまま使って再生する
+    (MazeSolver.replay まだ報告していない被災者はスナップショットの分だけ残る)
+
+    camera = VictimQueue()
+    camera.start(detect)   # detect()は(キャプチャした時刻, RIGHTかLEFT, VICTIM_*)かNoneを返す(ブロックしてよい)
+    solver.victim_queue = camera
+"""
+
+
+import threading
+import time
+from collections import deque
+
+from MazeConstants import *
+
+
+class VictimQueue():
+    """カメラの認識結果を溜めておき、姿勢と合わせて壁のセルごとの被災者にするクラス
+    """
+
+    def __init__(self, capacity: int = 64, pose_capacity: int = 64, clock=time.monotonic):
+        """
+        Args:
+            capacity (int, optional): 溜めておく認識結果の最大の数(超えたら古いものから捨てる)
+            pose_capacity (int, optional): 覚えておく姿勢の数(これより古い認識結果は捨てる)
+            clock (optional): 時刻を返す関数(putする側と同じもの)
+        """
+        self.clock = clock
+        # (キャプチャした時刻, ロボットから見た向き, 被災者)
+        self.detections = deque(maxlen=capacity)
+        # (記録した時刻, 位置(y,x), 向き)
+        self.poses = deque(maxlen=pose_capacity)
+        # 受け取った数・キューがいっぱいで捨てた数・合う姿勢がなく捨てた数
+        self.received = 0
+        self.dropped = 0
+        self.stale = 0
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    def put(self, side: int, victim: int, timestamp: float | None = None):
+        """認識結果を入れる関数(どのスレッドから呼んでもよく、待たない)
+
+        Args:
+            side (int): 被災者がいる壁のロボットから見た向き(RIGHT, LEFT, FRONT)
+            victim (int): 被災者(VICTIM_H, VICTIM_S, VICTIM_U, VICTIM_RED, VICTIM_YELLOW, VICTIM_GREEN)
+            timestamp (float | None, optional): キャプチャした時刻(Noneなら今の時刻)
+        """
+        if len(self.detections) == self.detections.maxlen:
+            self.dropped += 1
+        self.detections.append((self.clock() if timestamp is None else timestamp, side, victim))
+        self.received += 1
+
+    def record_pose(self, position: tuple[int, int], direction: int):
+        """今の時刻からの姿勢を記録する関数(calc_to_picoの最後に、指示を送った後の姿勢で呼ぶ)"""
+        self.poses.append((self.clock(), (position[y], position[x]), direction % 4))
+
+    def update_pose(self, position: tuple[int, int], direction: int):
+        """最後に記録した姿勢を実際の姿勢に直す関数(時刻はそのまま まだ記録していなければ最初からの姿勢として記録する)"""
+        timestamp = self.poses.pop()[0] if self.poses else float("-inf")
+        self.poses.append((timestamp, (position[y], position[x]), direction % 4))
+
+    def find_pose(self, timestamp: float) -> tuple[tuple[int, int], int] | None:
+        """timestampのときの姿勢(位置, 向き)を返す関数(覚えている姿勢より古ければNone)"""
+        for pose_time, position, direction in reversed(self.poses):
+            if pose_time <= timestamp:
+                return position, direction
+        return None
+
+    def drain(self) -> list[tuple[tuple[int, int], int]]:
+        """溜まっている認識結果をすべて取り出し、(壁のセルの座標(y,x), 被災者)のリストにする関数(待たない)"""
+        victims = []
+        while True:
+            try:
+                timestamp, side, victim = self.detections.popleft()
+            except IndexError:
+                break
+            pose = self.find_pose(timestamp)
+            if pose is None:
+                self.stale += 1
+                continue
+            position, direction = pose
+            victims.append(((position[y]+MV[(direction+side) % 4][y], position[x]+MV[(direction+side) % 4][x]), victim))
+        return victims
+
+    def start(self, detect):
+        """detectを繰り返し呼んで結果をputするスレッドを始める関数
+
+        Args:
+            detect: 認識が終わるまでブロックし、(キャプチャした時刻, ロボットから見た向き, 被災者)を返す関数
+                    (被災者がいなければNone 例外を投げるとスレッドは止まる)
+        """
+        def run():
+            while not self.stop_event.is_set():
+                detection = detect()
+                if detection is not None:
+                    timestamp, side, victim = detection
+                    self.put(side, victim, timestamp)
+        self.thread = threading.Thread(target=run, name="VictimQueue", daemon=True)
+        self.thread.start()
+
+    def stats(self) -> dict:
+        """集計を返す関数
+
+        Returns:
+            dict: received(putした数), dropped(キューがいっぱいで捨てた数), stale(姿勢が古すぎて捨てた数), pending(溜まっている数)
+        """
+        return {"received": self.received, "dropped": self.dropped, "stale": self.stale, "pending": len(self.detections)}
+
+    def close(self):
+        """スレッドを止める関数(detectが返ったところで止まる 待たない)"""
+        self.stop_event.set()
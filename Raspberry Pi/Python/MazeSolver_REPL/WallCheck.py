@@ -0,0 +1,58 @@
+"""
+マップ全体の壁の食い違いをNumPyの配列で一度に調べる関数
+    センサーで見た壁は票の多数決で決める(MazeMapBase.vote_wall)ので、一度の見間違いで通れなくなることはないが、
+    見間違えた壁や、両側のタイルから見て食い違った壁はWALL_CONFLICTで残っているので、ここでまとめて数える
+    Pythonのループはセルごとではなく、見つかった座標をリストにするところだけになる
+    ChunkedMazeMapでもview()で使っている範囲全体の配列にしてから調べる(Wavefrontと同じ)
+
+    conflicts: 反対の状態を見たことがある壁(多数決で決めた状態になっている)
+    ties: conflictsのうち、両方の票が同数の壁(先に見た状態のままなので、もう一度見ないとどちらか決まらない)
+    enclosed: 通ったタイルなのに四方が壁になっているタイル(まわりの壁のどれかを見間違えている)
+"""
+
+
+import numpy as np
+
+from MazeConstants import *
+
+
+# 通ったタイル(四方が壁なら食い違い)
+VISITED_TILES = (TILE_NONE, TILE_SILVER, TILE_BUMP_SLOPE)
+
+
+def to_positions(mask: np.ndarray, top_left: tuple[int, int], step: int = 1, offset: int = 0) -> list[tuple[int, int]]:
+    """boolの配列でTrueのところを、マップの座標(y,x)のリストにする関数
+
+    Args:
+        mask (np.ndarray): 調べた結果の配列
+        top_left (tuple[int, int]): 配列の[0, 0]のマップの座標(stepでずらす前)
+        step (int, optional): 配列の1つがマップの何セルか(タイルの配列なら2)
+        offset (int, optional): 配列の[0, 0]がtop_leftから何セルずれているか(タイルの配列なら1)
+    """
+    return [(int(index_y)*step+offset+top_left[y], int(index_x)*step+offset+top_left[x])
+            for index_y, index_x in zip(*np.nonzero(mask))]
+
+
+def check_walls(map_maze) -> dict:
+    """マップの壁の食い違いを調べる関数
+
+    Args:
+        map_maze: MazeMap・LiteMazeMap・ChunkedMazeMap(top_leftが偶数のMazeSolverのマップ)
+
+    Returns:
+        dict: conflicts, ties, enclosed(モジュールのdocstring)ごとの座標(y,x)のリスト
+    """
+    view = map_maze.view()
+    top_left = (map_maze.top_left[y], map_maze.top_left[x])
+    # タイル以外のセルにはWALL_CONFLICTのビットが立たない(タイルの状態と角のUNUSEDは小さい値)
+    conflicts = view & WALL_CONFLICT != 0
+    ties = conflicts & (view & MASK_WALL_VOTES == 0)
+    tiles = view[1::2, 1::2]
+    walls = (view[0:-1:2, 1::2], view[1::2, 0:-1:2], view[2::2, 1::2], view[1::2, 2::2])
+    is_closed = np.logical_and.reduce([wall & MASK_WALL_EXIST == WALL_EXIST for wall in walls])
+    enclosed = np.isin(tiles, VISITED_TILES) & is_closed
+    return {
+        "conflicts": to_positions(conflicts, top_left),
+        "ties": to_positions(ties, top_left),
+        "enclosed": to_positions(enclosed, top_left, 2, 1),
+    }
@@ -0,0 +1,179 @@
+"""
+NumPyの配列で波面(wavefront)を広げて距離を求める経路計算のクラス
+    map_mazeから方向ごとの「壁がないか」とタイルごとの「入れるか」「移動のコスト」のbool/int配列を作り、
+    (向き, タイルy, タイルx)の距離の配列を配列のずらしで一斉に更新する
+    Pythonのループは1つのセルごとではなく、波面が1タイル広がるごとに1回になる
+    配列のずらしで計算するので、ChunkedMazeMapでもview()で使っている範囲全体の配列にしてから計算する
+"""
+
+
+import numpy as np
+
+from CostModel import CostModel
+from MazeConstants import *
+
+
+def shift(array: np.ndarray, direction: int, fill=np.inf) -> np.ndarray:
+    """タイルの配列をdirectionの方向に1タイルずらす関数(はみ出したところはfill)
+
+    Args:
+        array (np.ndarray): (タイルy, タイルx)の配列
+        direction (int): ずらす絶対的な向き
+        fill (optional): 空いたところに入れる値
+
+    Returns:
+        np.ndarray: result[タイル+MV[direction]] = array[タイル]になる配列
+    """
+    result = np.full_like(array, fill)
+    move_y, move_x = MV[direction]
+    height, width = array.shape
+    result[max(move_y, 0):height+min(move_y, 0), max(move_x, 0):width+min(move_x, 0)] = \
+        array[max(-move_y, 0):height+min(-move_y, 0), max(-move_x, 0):width+min(-move_x, 0)]
+    return result
+
+
+class Wavefront():
+    """マップ全体の距離を配列で一斉に計算するクラス
+
+    マップを作り直したとき(壁やタイルが変わったとき)は新しく作る
+    """
+
+    def __init__(self, map_maze, cost_model: CostModel | None = None):
+        """
+        Args:
+            map_maze (MazeMap): 経路を計算するマップ
+            cost_model (CostModel | None, optional): 動作のコスト(Noneなら初期値)
+        """
+        cost_model = CostModel() if cost_model is None else cost_model
+        # ロボットから見た向き(FRONT, LEFT, BACK, RIGHT)ごとの回転のコスト
+        self.turn_costs = np.array(cost_model.turn_costs)
+        # [回転後の向き, 回転前の向き]の回転のコスト
+        self.turn_matrix = self.turn_costs[(np.arange(4)[:, np.newaxis]-np.arange(4)) % 4]
+        view = map_maze.view()
+        # タイル(0,0)の座標
+        self.top_left = (map_maze.top_left[y]+1, map_maze.top_left[x]+1)
+        self.tiles = view[1::2, 1::2]
+        walls = (view[0:-1:2, 1::2], view[1::2, 0:-1:2], view[2::2, 1::2], view[1::2, 2::2])
+        # 方向(NORTH, WEST, SOUTH, EAST)ごとの、タイルからその方向に壁がないか
+        self.is_open = np.stack([wall & MASK_WALL_EXIST != WALL_EXIST for wall in walls])
+        # 探索済みで黒タイルでない(ロボットがいられる)タイルか
+        self.is_standable = ~np.isin(self.tiles, (TILE_UNKNOWN, TILE_UNEXPLORED, TILE_BLACK))
+        # タイルに入るコスト
+        self.cost_move = cost_model.tile_cost_array[self.tiles]
+
+    def to_tile(self, position: tuple[int, int]) -> tuple[int, int]:
+        """座標(y,x)を配列のインデックス(タイルy, タイルx)にする関数"""
+        return ((position[y]-self.top_left[0])//2, (position[x]-self.top_left[1])//2)
+
+    def to_position(self, tile: tuple[int, int]) -> list[int, int]:
+        """配列のインデックス(タイルy, タイルx)を座標[y,x]にする関数"""
+        return [tile[0]*2+self.top_left[0], tile[1]*2+self.top_left[1]]
+
+    def calc_distance(self, start_position: tuple[int, int], start_direction: int, goal_positions=()) -> np.ndarray:
+        """start_positionからの(向き, タイル)ごとの最小コストを求める関数
+
+        ゴールには未探索でも入れるが、ゴールからは先に進まない
+        ゴールを渡したときは、ゴールのコストがそれ以上小さくならないとわかった時点で止める
+
+        Args:
+            start_position (tuple[int, int]): 開始位置
+            start_direction (int): 開始時の機体の向き
+            goal_positions (optional): 終了位置の候補(座標(y,x)のリスト)
+
+        Returns:
+            np.ndarray: (入ったときの向き, タイルy, タイルx)のコスト(到達できなければinf)
+        """
+        goals = np.zeros(self.tiles.shape, dtype=bool)
+        for position in goal_positions:
+            tile = self.to_tile(position)
+            if 0 <= tile[0] < goals.shape[0] and 0 <= tile[1] < goals.shape[1]:
+                goals[tile] = True
+        start = self.to_tile(start_position)
+        # 出られるタイルと入れるタイル
+        is_standable = self.is_standable & ~goals
+        is_standable[start] = True
+        is_enterable = self.is_standable | goals
+        # 方向ごとに、隣のタイルから入れるか(隣のタイルから出られて、壁がなく、入れるタイル)
+        can_move = np.stack([shift(self.is_open[direction] & is_standable, direction, False) & is_enterable
+                             for direction in range(4)])
+        cost_move = np.where(can_move, self.cost_move, np.inf)
+
+        distance = np.full((4,)+self.tiles.shape, np.inf)
+        distance[start_direction % 4][start] = 0
+        while True:
+            # 向きごとに、回転のコストを足して一番小さいもの
+            turned = np.min(distance[np.newaxis]+self.turn_matrix[:, :, np.newaxis, np.newaxis], axis=1)
+            # 1タイル進める
+            moved = np.stack([shift(turned[direction], direction) for direction in range(4)])+cost_move
+            improved = moved < distance
+            if not improved.any():
+                break
+            distance = np.where(improved, moved, distance)
+            # これ以上ゴールのコストが小さくなることはない
+            if goals.any() and distance[:, goals].min() <= moved[improved].min():
+                break
+        return distance
+
+    def trace_path(self, distance: np.ndarray, goal_tile: tuple[int, int]) -> list:
+        """calc_distanceの結果からgoal_tileまでの経路をさかのぼって求める関数
+
+        Args:
+            distance (np.ndarray): calc_distanceの結果
+            goal_tile (tuple[int, int]): ゴールの配列のインデックス
+
+        Returns:
+            list: 経路(通るタイルのpositionのリスト 開始位置は含まずゴールは含む 到達できなければ空)
+        """
+        direction = int(np.argmin(distance[:, goal_tile[0], goal_tile[1]]))
+        if distance[direction][goal_tile] == np.inf:
+            return []
+        tile = goal_tile
+        path = []
+        while distance[direction][tile] > 0:
+            path.append(self.to_position(tile))
+            cost = distance[direction][tile]-self.cost_move[tile]
+            previous = (tile[0]-MV[direction][y], tile[1]-MV[direction][x])
+            # 回転のコストを足してcostになる前のタイルでの向き
+            for direction_previous in range(4):
+                if distance[direction_previous][previous]+self.turn_costs[(direction-direction_previous) % 4] == cost:
+                    break
+            tile = previous
+            direction = direction_previous
+        path.reverse()
+        return path
+
+    def calc_path(self, start_position: tuple[int, int], goal_position: tuple[int, int], start_direction: int) -> list:
+        """start_positionからgoal_positionまでの最短経路を計算する関数
+
+        Args:
+            start_position (tuple[int, int]): 開始位置
+            goal_position (tuple[int, int]): 終了位置
+            start_direction (int): 開始時の機体の向き
+
+        Returns:
+            list: 最短経路(通るタイルのpositionのリスト 開始位置は含まずgoal_positionは含む 到達できなければ空)
+        """
+        if tuple(start_position) == tuple(goal_position):
+            return []
+        distance = self.calc_distance(start_position, start_direction, [goal_position])
+        return self.trace_path(distance, self.to_tile(goal_position))
+
+    def calc_path_to_nearest(self, start_position: tuple[int, int], goal_positions, start_direction: int) -> list:
+        """start_positionからgoal_positionsのうちコストが最小のタイルまでの経路を計算する関数
+
+        Args:
+            start_position (tuple[int, int]): 開始位置
+            goal_positions: 終了位置の候補(座標(y,x)を順に取り出せるもの Frontierなど)
+            start_direction (int): 開始時の機体の向き
+
+        Returns:
+            list: 最短経路(通るタイルのpositionのリスト 最後がたどり着くゴール 到達できなければ空)
+        """
+        goal_tiles = [self.to_tile(position) for position in goal_positions]
+        goal_tiles = [tile for tile in goal_tiles if 0 <= tile[0] < self.tiles.shape[0] and 0 <= tile[1] < self.tiles.shape[1]]
+        if not goal_tiles or self.to_tile(start_position) in goal_tiles:
+            return []
+        distance = self.calc_distance(start_position, start_direction, [self.to_position(tile) for tile in goal_tiles])
+        # コストが最小のゴールは、途中で止めていても確定している
+        goal_tile = min(goal_tiles, key=lambda tile: distance[:, tile[0], tile[1]].min())
+        return self.trace_path(distance, goal_tile)
@@ -0,0 +1,137 @@
+"""
+calc_pathのベンチマーク
+    旧実装(pathsを毎回ソートする探索)と優先度付きキューを使う今の実装を
+    探索済みの10x10, 50x50, 200x200のマップで比較する
+    壁のないマップの角から角までなので乱数は使わない(--repeatで測る回数を変える)
+
+    python benchmark_calc_path.py --sizes 10 50 200 --repeat 5
+"""
+
+
+import argparse
+import time
+
+import numpy as np
+
+from MazeMap import MazeMap
+from MazeSolver import *
+
+
+def legacy_calc_path(solver: MazeSolver, start_position: tuple[int, int], goal_position: tuple[int, int]) -> list:
+    """旧実装のcalc_path(比較用)
+
+    Args:
+        solver (MazeSolver): マップを持つMazeSolver
+        start_position (tuple[int, int]): 開始位置
+        goal_position (tuple[int, int]): 終了位置
+
+    Returns:
+        list: 最短経路(通るタイルのpositionのリスト)
+    """
+    # ゴールから逆算していく
+    position = goal_position
+    # コストのマップを∞で初期化
+    cost_map = np.full(solver.map_size, np.inf)
+    # 探索中の向き
+    direction = NORTH
+    # 探索中の経路
+    paths = []
+    # 継続フラグ
+    continue_flag = True
+    # start_positionまで到達できた経路
+    answer_paths = []
+    # 初回だけ例外処理(direction)
+    for direction_from_robot, direction_abs in ((FRONT, NORTH), (RIGHT, EAST), (LEFT, WEST), (BACK, SOUTH)):
+        if (solver.get_map(position, direction, direction_from_robot) & MASK_WALL_EXIST != WALL_EXIST
+                and solver.get_map(position, direction, direction_from_robot, True) != TILE_UNKNOWN
+                and solver.get_map(position, direction, direction_from_robot, True) != TILE_UNEXPLORED):
+            position_temp = solver.get_position(position, direction, direction_from_robot)
+            if position_temp == start_position:
+                continue_flag = False
+                answer_paths.append([[position], (1, direction_abs)])
+            else:
+                cost_map[position_temp[y]//2][position_temp[x]//2] = 1
+                paths.append([[position_temp, goal_position], (1, direction_abs)])
+
+    # 経路を求めていく
+    while continue_flag:
+        # コストが最小のpathを取得し、その次に進めるタイルを求める
+        paths.sort(key=lambda x: x[1][0])
+        cost = paths[0][1][0]
+        min_paths = [i for i in paths if i[1][0] == cost]
+        paths = [i for i in paths if i[1][0] > cost]
+        for path in min_paths:
+            position = path[0][0]
+            direction = path[1][1]
+            for direction_from_robot, cost_turn in ((FRONT, 0), (RIGHT, COST_TURN), (LEFT, COST_TURN)):
+                if (solver.get_map(position, direction, direction_from_robot) & MASK_WALL_EXIST != WALL_EXIST
+                        and solver.get_map(position, direction, direction_from_robot, True) != TILE_UNKNOWN
+                        and solver.get_map(position, direction, direction_from_robot, True) != TILE_UNEXPLORED):
+                    position_temp = solver.get_position(position, direction, direction_from_robot)
+                    # スタートに到達した
+                    if position_temp == start_position:
+                        continue_flag = False
+                        answer_paths.append(path)
+                    # 隣のタイルがバンプか坂
+                    elif solver.get_map(position, direction, direction_from_robot) == TILE_BUMP_SLOPE:
+                        if cost+COST_BUMP < cost_map[position_temp[y]//2][position_temp[x]//2]:
+                            cost_map[position_temp[y]//2][position_temp[x]//2] = cost+COST_BUMP
+                            paths.append([[position_temp]+path[0], (cost+COST_BUMP, direction)])
+                    # 隣のタイルが普通のタイル
+                    else:
+                        if cost+COST_MOVE+cost_turn < cost_map[position_temp[y]//2][position_temp[x]//2]:
+                            cost_map[position_temp[y]//2][position_temp[x]//2] = cost+COST_MOVE+cost_turn
+                            paths.append([[position_temp]+path[0], (cost+COST_MOVE+cost_turn, direction)])
+    min_cost = float('inf')
+    answer_path = []
+    # コストが最小の経路を求める
+    for path in answer_paths:
+        if path[1][0] < min_cost:
+            min_cost = path[1][0]
+            answer_path = path
+    return answer_path[0]
+
+
+def make_open_map(solver: MazeSolver, size: int):
+    """solverのマップを内側に壁のない探索済みのsize x sizeのマップにする関数
+
+    Args:
+        solver (MazeSolver): マップを書き換えるMazeSolver
+        size (int): マップの一辺のタイル数
+    """
+    map_maze = np.full((size*2+1, size*2+1), WALL_NONE)
+    map_maze[1::2, 1::2] = TILE_NONE
+    map_maze[0, :] = map_maze[-1, :] = map_maze[:, 0] = map_maze[:, -1] = WALL_EXIST
+    map_maze[0::2, 0::2] = UNUSED
+    solver.map_maze = MazeMap(map_maze, UNKNOWN)
+    solver.map_size = [size, size]
+
+
+def measure(function, *args, repeat: int = 3) -> tuple[float, list]:
+    """functionをrepeat回実行し、最短の実行時間[ms]と戻り値を返す関数
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        time_start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter()-time_start)
+    return best*1000, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200], help="マップの一辺のタイル数")
+    parser.add_argument("--repeat", type=int, default=3, help="1つの大きさで測る回数(最短の時間を表示する)")
+    args = parser.parse_args()
+
+    solver = MazeSolver()
+    print("{:>9} {:>12} {:>12} {:>8}".format("size", "legacy[ms]", "heap[ms]", "tiles"))
+    for size in args.sizes:
+        make_open_map(solver, size)
+        # 北東の角から南西の角まで(旧実装はゴールから北・東・西にしか広げられないため)
+        start_position = [1, size*2-1]
+        goal_position = [size*2-1, 1]
+        legacy_time, legacy_path = measure(legacy_calc_path, solver, start_position, goal_position, repeat=args.repeat)
+        heap_time, heap_path = measure(solver.calc_path, start_position, goal_position, WEST, repeat=args.repeat)
+        assert len(legacy_path) == len(heap_path)
+        print("{:>9} {:12.2f} {:12.2f} {:8d}".format("{0}x{0}".format(size), legacy_time, heap_time, len(heap_path)))
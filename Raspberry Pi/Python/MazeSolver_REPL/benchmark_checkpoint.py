@@ -0,0 +1,145 @@
+"""
+再開機能(Checkpoint)の確認とベンチマーク
+    MazeSimulatorで探索している途中でプロセスを強制終了し(os._exit)、元のプロセスでMazeSolver.restoreから再開して
+    最後まで探索する 止めずに探索したときと同じ移動になるかを確かめ、再開にかかった時間を表示する
+    1タイルずつの指示(max_run=1)と多タイル移動(max_run=MAX_RUN)の両方で確かめる
+    MazeSolverにはVictimQueueを付けてカメラの被災者も入れ、最後のスナップショットより後で被災者を報告したステップで止める
+    (ジャーナルから再生するステップに被災者の報告が含まれる) 移動か報告した被災者が1つでも違えば終了コード1で終わる
+
+    python benchmark_checkpoint.py --sizes 8 16 32 --seeds 2
+"""
+
+
+import argparse
+import contextlib
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from Checkpoint import Checkpoint
+from MazeSimulator import MazeSimulator
+from MazeSolver import *
+from VictimQueue import VictimQueue
+
+
+# 多タイル移動で確かめるときの1つの指示で進む最大のタイル数
+MAX_RUN = 8
+# スナップショットを保存するステップの間隔(ジャーナルから再生するステップを短くしすぎない)
+SNAPSHOT_INTERVAL = 16
+
+
+def make_simulator(size: int, seed: int) -> MazeSimulator:
+    """確認に使う迷路を作る関数"""
+    return MazeSimulator.generate(size, size, seed, loop_ratio=0.15, black_ratio=0.05, bump_ratio=0.05,
+                                  silver_ratio=0.05, victim_ratio=0.3)
+
+
+def step(solver: MazeSolver, simulator: MazeSimulator, checkpoint: Checkpoint | None = None) -> tuple[bool, tuple[int, int]]:
+    """1ステップ進める関数
+
+    Returns:
+        tuple[bool, tuple[int, int]]: 迷路探索継続フラグ, (picoに送ったデータ, 進むタイルの数)
+    """
+    from_pico = simulator.calc_from_pico()
+    simulator.detect_victims(solver.victim_queue)
+    with solver.logger.muted():
+        continue_flag, to_pico, run_tiles = solver.calc_command(from_pico, simulator.tiles_moved)
+    if checkpoint is not None:
+        checkpoint.record(solver, from_pico, to_pico, simulator.tiles_moved)
+    simulator.apply(to_pico, run_tiles)
+    return continue_flag, (to_pico, run_tiles)
+
+
+def run_uninterrupted(size: int, seed: int, max_run: int) -> tuple[list[tuple[int, int]], set]:
+    """止めずに探索したときの(to_pico, run_tiles)のリストと、報告した被災者の座標を返す関数"""
+    simulator = make_simulator(size, seed)
+    solver = MazeSolver(max_run=max_run, victim_queue=VictimQueue())
+    moves = []
+    continue_flag = True
+    while continue_flag:
+        continue_flag, to_pico = step(solver, simulator)
+        moves.append(to_pico)
+    return moves, simulator.reported_victims
+
+
+def choose_kill_step(moves: list[tuple[int, int]]) -> tuple[int, int]:
+    """2/3より後で、最後のスナップショットより後に被災者を報告したステップがある止める位置を選ぶ関数
+
+    Returns:
+        tuple[int, int]: 止めるステップ数, ジャーナルから再生するステップのうち被災者を報告したステップの数
+    """
+    reported = [(to_pico >> SHIFT_VICTIM_R | to_pico >> SHIFT_VICTIM_L) & MASK_VICTIM != VICTIM_NONE for to_pico, _ in moves]
+    for kill_step in range(len(moves)*2//3, len(moves)):
+        tail = sum(reported[kill_step//SNAPSHOT_INTERVAL*SNAPSHOT_INTERVAL:kill_step])
+        if tail > 0:
+            return kill_step, tail
+    return len(moves)*2//3, 0
+
+
+def run_until_killed(size: int, seed: int, max_run: int, directory: str, kill_step: int):
+    """kill_stepステップ進めたところでプロセスを強制終了する関数(後始末をせずに止まる)"""
+    simulator = make_simulator(size, seed)
+    solver = MazeSolver(max_run=max_run, victim_queue=VictimQueue())
+    checkpoint = Checkpoint(directory, SNAPSHOT_INTERVAL)
+    for _ in range(kill_step):
+        step(solver, simulator, checkpoint)
+    os._exit(1)
+
+
+def run_resumed(size: int, seed: int, max_run: int, directory: str) -> tuple[list[tuple[int, int]], set, float]:
+    """ジャーナルからMazeSimulatorを、restoreからMazeSolverを戻して最後まで探索する関数
+
+    Returns:
+        tuple[list[tuple[int, int]], set, float]: (to_pico, run_tiles)のリスト, 報告した被災者の座標,
+                                                  restoreにかかった時間[ms]
+    """
+    checkpoint = Checkpoint(directory, SNAPSHOT_INTERVAL)
+    # 機体(Pico)は止まっていないので、ジャーナルのto_picoで同じ位置まで動かす
+    simulator = make_simulator(size, seed)
+    moves = []
+    for _, _, to_pico, run_tiles in checkpoint.read_journal():
+        simulator.apply(to_pico, run_tiles)
+        moves.append((to_pico, run_tiles))
+    time_start = time.perf_counter()
+    solver, _ = MazeSolver.restore(directory, max_run=max_run, victim_queue=VictimQueue())
+    restore_time = time.perf_counter()-time_start
+    continue_flag = True
+    while continue_flag:
+        continue_flag, to_pico = step(solver, simulator, checkpoint)
+        moves.append(to_pico)
+    checkpoint.close()
+    return moves, simulator.reported_victims, restore_time*1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[8, 16, 32], help="迷路の一辺のタイル数")
+    parser.add_argument("--seeds", type=int, default=2, help="1つの大きさで試すシードの数(0から)")
+    parser.add_argument("--max-run", type=int, nargs="+", default=[1, MAX_RUN], help="1つの指示で進む最大のタイル数")
+    args = parser.parse_args()
+
+    print("{:>7} {:>5} {:>7} {:>7} {:>7} {:>7} {:>10} {:>12}".format(
+        "size", "seed", "max_run", "steps", "killed", "victims", "same", "restore[ms]"))
+    failed = []
+    for size in args.sizes:
+        for seed in range(args.seeds):
+            for max_run in args.max_run:
+                moves, victims = run_uninterrupted(size, seed, max_run)
+                kill_step, tail_victims = choose_kill_step(moves)
+                with tempfile.TemporaryDirectory() as directory:
+                    # 強制終了するのは別のプロセス
+                    with ProcessPoolExecutor(1) as killed:
+                        # os._exitで止まるとBrokenProcessPoolになる
+                        with contextlib.suppress(Exception):
+                            killed.submit(run_until_killed, size, seed, max_run, directory, kill_step).result()
+                    moves_resumed, victims_resumed, restore_time = run_resumed(size, seed, max_run, directory)
+                same = moves == moves_resumed and victims == victims_resumed
+                print("{:>7} {:5d} {:7d} {:7d} {:7d} {:7d} {:>10} {:12.2f}".format(
+                    "{0}x{0}".format(size), seed, max_run, len(moves), kill_step, tail_victims, str(same), restore_time))
+                if not same or tail_victims == 0:
+                    failed.append((size, seed, max_run))
+    if failed:
+        # 違った組み合わせと、ジャーナルに被災者の報告がなく確かめられなかった組み合わせ
+        sys.exit("failed (size, seed, max_run): {}".format(failed))
@@ -0,0 +1,46 @@
+"""
+探索の方針(ExplorationStrategy)のベンチマーク
+    同じ迷路(MazeBatchと同じ条件でシード固定)をMazeBatch.FRONTIER_STRATEGIESのすべての方針で探索し、
+    大きさごとに次の値を比較する(方針は機体が動いた時間が短い順に並べる)
+        tiles/move: すべてのタイルを通るまでの1ステップあたりの新しいタイルの数
+        cover: すべてのタイルを通るまでのステップ数
+        robot[s]: スタートに戻るまでに機体が動いた時間(CostModelで見積もる)
+        p50[us], p99[us]: 1回の判断(calc_command)の時間
+    判断の時間を正しく測るため、ワーカーの数は省略すると1にする(並列にすると同じCPUを取り合う)
+
+    python benchmark_frontier.py --sizes 8 16 24 --seeds 10
+"""
+
+
+import argparse
+
+from MazeBatch import FRONTIER_STRATEGIES, aggregate, make_jobs, run_batch
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[8, 16, 24], help="迷路の一辺のタイル数")
+    parser.add_argument("--seeds", type=int, default=10, help="1つの大きさで試すシードの数(0から)")
+    parser.add_argument("--frontier", choices=FRONTIER_STRATEGIES, nargs="+", default=list(FRONTIER_STRATEGIES),
+                        help="比べる方針")
+    parser.add_argument("--planner", default="heap", help="経路計算の方法(MazeBatch.PLANNERSのキー)")
+    parser.add_argument("--workers", type=int, default=1, help="プロセスの数")
+    args = parser.parse_args()
+
+    results = run_batch(make_jobs(args.sizes, args.seeds, args.frontier, [args.planner]), args.workers)
+    groups = aggregate(results)
+    print("{:>7} {:>8} {:>9} {:>10} {:>8} {:>9} {:>8} {:>8}  {}".format(
+        "size", "frontier", "complete", "tiles/move", "cover", "robot[s]", "p50[us]", "p99[us]", "failed"))
+    for size in args.sizes:
+        rows = [(frontier, groups[(frontier, args.planner, size)]) for frontier in args.frontier]
+        rows.sort(key=lambda row: float("inf") if row[1]["robot_time"] is None else row[1]["robot_time"])
+        for frontier, group in rows:
+            histogram = group["step_histogram"]
+            print("{:>7} {:>8} {:>9} {:>10} {:>8} {:>9} {:>8} {:>8}  {}".format(
+                "{0}x{0}".format(size), frontier, "{}/{}".format(group["complete"], group["mazes"]),
+                "-" if group["tiles_per_move"] is None else "{:.3f}".format(group["tiles_per_move"]),
+                "-" if group["coverage_steps"] is None else "{:.1f}".format(group["coverage_steps"]),
+                "-" if group["robot_time"] is None else "{:.1f}".format(group["robot_time"]/1000),
+                "-" if histogram.count == 0 else "{:.1f}".format(histogram.percentile(0.5)/1000),
+                "-" if histogram.count == 0 else "{:.1f}".format(histogram.percentile(0.99)/1000),
+                " ".join(str(seed) for seed in group["failed"])))
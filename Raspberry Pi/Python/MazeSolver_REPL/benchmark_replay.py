@@ -0,0 +1,75 @@
+"""
+記録した走行の再生のベンチマーク(MazeSolver.replay)
+    MazeExportのファイル(MazeBatch.py --exportで書き出したものなど)のfrom_picoの列をまとめて再生し、
+    記録と同じ指示になった走行の数と、再生の速さ(ステップ/秒)を表示する
+    ファイルを渡さなければ、MazeBatchと同じ迷路を探索して一時ディレクトリに書き出したものを使う
+    (--cameraを付けると、VictimQueueでカメラの被災者を入れながら探索する 記録のbitで再生するので同じ指示になる)
+    --planner・--frontierを渡すと、記録と違う設定で再生し、経路計算などを変えて指示が変わる走行を数える(回帰テスト)
+    --baselineを付けると、main.pyのREPLと同じくログとマップの描画をしながら1ステップずつ再生した時間も測る
+
+    python benchmark_replay.py --sizes 16 32 --seeds 50
+    python benchmark_replay.py --sizes 16 --seeds 50 --camera
+    python benchmark_replay.py runs/*.mzr --planner incremental
+"""
+
+
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+from MazeBatch import FRONTIER_STRATEGIES, PLANNERS, make_jobs, run_batch
+from MazeExport import compare, get_frames, load_run
+from MazeLogger import MazeLogger
+from MazeSolver import *
+
+
+def replay_baseline(path: str) -> None:
+    """1ステップずつcalc_commandを呼び、ログとマップの描画を捨てる先に出力しながら再生する関数(比較用)"""
+    run = load_run(path)
+    reports = get_frames(run)[0]
+    with open(os.devnull, "w") as stream:
+        solver = MazeSolver(logger=MazeLogger(LOG_DEBUG, stream), max_run=int(run["trace"]["run_tiles"].max(initial=1)))
+        for from_pico, tiles_moved in zip(reports[0::2], reports[1::2]):
+            solver.calc_command(from_pico, None if tiles_moved == TILES_MOVED_NONE else tiles_moved)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", help="MazeExportのファイル(省略すると迷路を探索して作る)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[16, 32], help="作る迷路の一辺のタイル数")
+    parser.add_argument("--seeds", type=int, default=20, help="作る迷路の1つの大きさのシードの数")
+    parser.add_argument("--planner", choices=PLANNERS, help="記録の代わりに使う経路計算の方法")
+    parser.add_argument("--frontier", choices=FRONTIER_STRATEGIES, help="記録の代わりに使う探索の方針")
+    parser.add_argument("--camera", action="store_true", help="作る迷路をVictimQueueでカメラの被災者を入れながら探索する")
+    parser.add_argument("--baseline", action="store_true", help="ログと描画をしながら1ステップずつ再生した時間も測る")
+    args = parser.parse_args()
+
+    overrides = {}
+    if args.planner is not None:
+        overrides["planner"] = PLANNERS[args.planner]
+    if args.frontier is not None:
+        overrides["frontier_strategy"] = FRONTIER_STRATEGIES[args.frontier]
+    with tempfile.TemporaryDirectory() as directory:
+        paths = sorted(path for pattern in args.paths for path in glob.glob(pattern))
+        if not args.paths:
+            run_batch(make_jobs(args.sizes, args.seeds, ["lifo"], ["heap"]), export=directory, camera=args.camera)
+            paths = sorted(glob.glob(os.path.join(directory, "*.mzr")))
+        steps = sum(int(load_run(path)["header"]["trace_count"]) for path in paths)
+
+        time_start = time.perf_counter()
+        diverged = [(path, compare(path, **overrides)) for path in paths]
+        elapsed = time.perf_counter()-time_start
+        diverged = [(path, step) for path, step in diverged if step is not None]
+        print("{} runs, {} steps replayed in {:.2f} s ({:.0f} steps/s)".format(len(paths), steps, elapsed, steps/elapsed))
+        print("same commands: {}/{}".format(len(paths)-len(diverged), len(paths)))
+        for path, step in diverged:
+            print("  {}: diverged at step {}".format(os.path.basename(path), step))
+        if args.baseline:
+            time_start = time.perf_counter()
+            for path in paths:
+                replay_baseline(path)
+            elapsed_baseline = time.perf_counter()-time_start
+            print("baseline (logging and drawing every step): {:.2f} s ({:.0f} steps/s, {:.1f}x slower)".format(
+                elapsed_baseline, steps/elapsed_baseline, elapsed_baseline/elapsed))
@@ -0,0 +1,148 @@
+"""
+MazeSimulatorで迷路を最後まで探索するベンチマーク
+    シード固定の迷路(黒タイル・坂・銀タイル・被災者あり)をスタートに戻るまで探索し、
+    ステップ数、機体が動いた時間(CostModelの初期値)、1ステップの時間(p50, p99)、経路計算の時間、メモリのピークを表示する
+    --profileを付けると、すべての探索のフェーズごとの時間などをMazeProfilerで集計してJSONかCSVに書き出す
+
+    python benchmark_simulator.py --sizes 8 16 32 64 100 --seeds 3 --planner wavefront --frontier nearest
+    python benchmark_simulator.py --sizes 64 --profile profile.json
+    python benchmark_simulator.py --sizes 32 64 --max-run 8   多タイル移動(ステップ数 = 通信の往復の回数)
+    python benchmark_simulator.py --sizes 32 64 --speculative --delay 5   経路の先読み(機体が動く時間の代わりに5ms待つ)
+    python benchmark_simulator.py --sizes 100 --map chunked   ChunkedMazeMap(peakはマップの持ち方で変わる)
+    python benchmark_simulator.py --sizes 32 64 --time-budget 480   制限時間8分(visitedが減り、robotが480以下でreturnedになる)
+    python benchmark_simulator.py --sizes 16 32 --camera   視覚的被災者もVictimQueueで報告する(victimsが増える)
+"""
+
+
+import argparse
+import os
+import time
+import tracemalloc
+
+from MazeBatch import FRONTIER_STRATEGIES, MAZE_OPTIONS, PLANNERS
+from MazeLogger import MazeLogger
+from MazeProfiler import MazeProfiler
+from MazeSimulator import MazeSimulator
+from MazeSolver import *
+from VictimQueue import VictimQueue
+
+
+MAP_TYPES = {"dense": MAP_DENSE, "chunked": MAP_CHUNKED}
+
+
+def make_simulator(size: int, seed: int) -> MazeSimulator:
+    """ベンチマークに使う迷路を作る関数"""
+    return MazeSimulator.generate(size, size, seed, **MAZE_OPTIONS)
+
+
+def make_solver(frontier_strategy: int, planner: int, draw: bool, max_run: int, speculative: bool, map_type: int,
+                time_budget: int | None, camera: bool, profiler: MazeProfiler | None = None) -> MazeSolver:
+    """ベンチマークに使うMazeSolverを作る関数(drawならマップの描画まで含めたログを捨てる先に出力する)"""
+    return MazeSolver(frontier_strategy, planner, MazeLogger(LOG_DEBUG if draw else LOG_OFF, open(os.devnull, "w")), profiler,
+                      max_run=max_run, speculative=speculative, map_type=map_type, time_budget=time_budget,
+                      victim_queue=VictimQueue() if camera else None)
+
+
+def run(size: int, seed: int, frontier_strategy: int, planner: int, draw: bool, max_run: int, speculative: bool,
+        map_type: int, time_budget: int | None, camera: bool, delay: float = 0.0, profile: bool = False) -> dict:
+    """1つの迷路を探索し、ステップ数や時間を返す関数
+
+    Returns:
+        dict: MazeSimulator.runの結果にplanning_time(その場で経路を計算した時間[s 先読みした分は含まない])と
+              profiler(profileならMazeProfiler、そうでなければNone)、speculation(先読みの集計 しなければNone)、
+              victims_total(迷路にある被災者の数)を加えたもの
+    """
+    simulator = make_simulator(size, seed)
+    profiler = MazeProfiler() if profile else None
+    solver = make_solver(frontier_strategy, planner, draw, max_run, speculative, map_type, time_budget, camera, profiler)
+    # 経路計算の時間を測る
+    planning_time = 0
+
+    def timed(function):
+        def wrapper(*args, **kwargs):
+            nonlocal planning_time
+            time_start = time.perf_counter()
+            path = function(*args, **kwargs)
+            planning_time += time.perf_counter()-time_start
+            return path
+        return wrapper
+    solver.calc_path = timed(solver.calc_path)
+    solver.calc_path_to_nearest = timed(solver.calc_path_to_nearest)
+
+    result = simulator.run(solver, quiet=False, delay=delay)
+    result["planning_time"] = planning_time
+    result["profiler"] = profiler
+    result["speculation"] = None
+    result["victims_total"] = simulator.count_victims()
+    if solver.speculator is not None:
+        result["speculation"] = solver.speculator.stats()
+        solver.speculator.close()
+    return result
+
+
+def run_memory(size: int, seed: int, frontier_strategy: int, planner: int, draw: bool, max_run: int,
+               speculative: bool, map_type: int, time_budget: int | None, camera: bool) -> int:
+    """1つの迷路を探索し、メモリのピーク[byte]を返す関数(tracemallocで遅くなるので時間とは別に測る)"""
+    simulator = make_simulator(size, seed)
+    solver = make_solver(frontier_strategy, planner, draw, max_run, speculative, map_type, time_budget, camera)
+    tracemalloc.start()
+    simulator.run(solver, quiet=False)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def percentile(values: list, ratio: float) -> float:
+    """valuesのratio(0~1)のパーセンタイルを返す関数"""
+    values = sorted(values)
+    return values[min(int(len(values)*ratio), len(values)-1)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[8, 16, 32, 64, 100], help="迷路の一辺のタイル数")
+    parser.add_argument("--seeds", type=int, default=3, help="1つの大きさで試すシードの数(0から)")
+    parser.add_argument("--planner", choices=PLANNERS, default="heap", help="経路計算の方法")
+    parser.add_argument("--frontier", choices=FRONTIER_STRATEGIES, default="lifo", help="未探索タイルの選び方")
+    parser.add_argument("--draw", action="store_true", help="ログの出力とマップの描画もステップの時間に含める")
+    parser.add_argument("--max-run", type=int, default=1, help="1つの指示で進む最大のタイル数(2以上で多タイル移動)")
+    parser.add_argument("--speculative", action="store_true", help="行き止まりからの経路を別のスレッドで先読みする")
+    parser.add_argument("--delay", type=float, default=0.0, help="機体が動く時間の代わりに1ステップごとに待つ時間[ms]")
+    parser.add_argument("--map", choices=MAP_TYPES, default="dense", help="マップの持ち方")
+    parser.add_argument("--time-budget", type=float, help="制限時間[s](機体が動いた時間で、間に合うようにスタートに戻る)")
+    parser.add_argument("--camera", action="store_true", help="視覚的被災者をカメラの代わりにVictimQueueで渡す")
+    parser.add_argument("--no-memory", action="store_true", help="メモリのピークを測らない")
+    parser.add_argument("--profile", metavar="PATH", help="フェーズごとの集計を書き出すファイル(.jsonか.csv)")
+    args = parser.parse_args()
+
+    options = (FRONTIER_STRATEGIES[args.frontier], PLANNERS[args.planner], args.draw, args.max_run, args.speculative,
+               MAP_TYPES[args.map], None if args.time_budget is None else int(args.time_budget*1000), args.camera)
+    print("{:>7} {:>5} {:>7} {:>9} {:>9} {:>8} {:>9} {:>9} {:>9} {:>13} {:>10}".format(
+        "size", "seed", "steps", "visited", "returned", "victims", "robot[s]", "p50[ms]", "p99[ms]", "planning[ms]", "peak[KiB]"))
+    profiler = MazeProfiler()
+    speculation = {"hits": 0, "misses": 0, "saved_time": 0}
+    # 時間が他の探索とCPUを取り合わないように、1つずつ実行する(並列に回すときはMazeBatch.py)
+    for size in args.sizes:
+        for seed in range(args.seeds):
+            result = run(size, seed, *options, args.delay/1000, args.profile is not None)
+            if result["profiler"] is not None:
+                profiler.merge(result["profiler"])
+            if result["speculation"] is not None:
+                for key in speculation:
+                    speculation[key] += result["speculation"][key]
+            peak = None if args.no_memory else run_memory(size, seed, *options)
+            print("{:>7} {:5d} {:7d} {:>9} {:>9} {:>8} {:9.1f} {:9.3f} {:9.3f} {:13.2f} {:>10}".format(
+                "{0}x{0}".format(size), seed, result["steps"], "{}/{}".format(result["visited"], result["tiles"]),
+                str(result["returned"]), "{}/{}".format(result["victims"], result["victims_total"]), result["robot_time"]/1000, percentile(result["step_times"], 0.5)*1000,
+                percentile(result["step_times"], 0.99)*1000, result["planning_time"]*1000,
+                "-" if peak is None else "{:.0f}".format(peak/1024)))
+    if args.speculative:
+        needed = speculation["hits"]+speculation["misses"]
+        print("speculation hits: {}/{} ({:.0%}), saved: {:.2f} ms".format(
+            speculation["hits"], needed, speculation["hits"]/needed if needed else 0, speculation["saved_time"]/1e6))
+    if args.profile is not None:
+        profiler.export(args.profile)
+        print("phase         p50[us]   p99[us]")
+        for name, summary in profiler.to_dict().items():
+            if name.startswith("phase/"):
+                print("{:<12} {:9.1f} {:9.1f}".format(name[len("phase/"):], summary["p50"]/1000, summary["p99"]/1000))
@@ -0,0 +1,69 @@
+"""
+起動の時間のベンチマーク(MazeBackendのnumpyとliteの比較)
+    新しいPythonのプロセスで、main.pyと同じモジュールのimportにかかる時間と、
+    MazeSolverを作って最初のcalc_to_picoを返すまでの時間を測る(プロセスを作る時間は含まない)
+    Raspberry Piで電源を入れてから最初の動作を送るまでの時間の目安になる
+
+    python benchmark_startup.py --repeat 20
+"""
+
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from MazeBackend import BACKEND_LITE, BACKEND_NUMPY
+
+
+# 子プロセスで実行するコード(importの時間・最初のステップの時間[s]とNumPyを読み込んだかをJSONで出力する)
+CHILD_CODE = """
+import json, sys, time
+time_start = time.perf_counter()
+from Checkpoint import Checkpoint
+from CostModel import CostModel
+from MazeLogger import MazeLogger
+from MazeProfiler import MazeProfiler
+from MazeSolver import *
+from PicoLink import open_serial, run_solver
+time_import = time.perf_counter()
+numpy_imported = "numpy" in sys.modules
+solver = MazeSolver(logger=MazeLogger(LOG_OFF))
+solver.calc_to_pico(0b00000100)
+time_first = time.perf_counter()
+print(json.dumps({"import": time_import-time_start, "first_step": time_first-time_import,
+                  "map": type(solver.map_maze).__name__, "numpy_at_import": numpy_imported,
+                  "numpy_at_first_step": "numpy" in sys.modules}))
+"""
+
+
+def measure(backend: str) -> dict:
+    """backendで新しいプロセスを起動し、CHILD_CODEの結果を返す関数"""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    output = subprocess.run([sys.executable, "-c", CHILD_CODE], cwd=directory, check=True, capture_output=True, text=True,
+                            env=dict(os.environ, MAZE_BACKEND=backend, PYTHONDONTWRITEBYTECODE="1")).stdout
+    return json.loads(output)
+
+
+def median(values: list) -> float:
+    values = sorted(values)
+    return values[len(values)//2]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10, help="1つのバックエンドで起動する回数(中央値を表示する)")
+    args = parser.parse_args()
+
+    print("{:>8} {:>12} {:>11} {:>15} {:>10} {:>6}".format("backend", "map", "import[ms]", "first_step[ms]", "total[ms]", "numpy"))
+    for backend in (BACKEND_NUMPY, BACKEND_LITE):
+        # 1回目はバイトコードのキャッシュなどで遅いので捨てる
+        measure(backend)
+        results = [measure(backend) for _ in range(args.repeat)]
+        time_import = median([result["import"] for result in results])
+        time_first = median([result["first_step"] for result in results])
+        time_total = median([result["import"]+result["first_step"] for result in results])
+        print("{:>8} {:>12} {:11.1f} {:15.2f} {:10.1f} {:>6}".format(
+            backend, results[0]["map"], time_import*1000, time_first*1000, time_total*1000,
+            str(results[0]["numpy_at_first_step"])))
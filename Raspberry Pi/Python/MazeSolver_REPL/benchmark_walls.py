@@ -0,0 +1,108 @@
+"""
+壁の見間違いへの強さのベンチマーク(壁の多数決 MazeMapBase.vote_wall)
+    シミュレーターのセンサーに壁がないところを壁と見間違えさせ(MazeSimulator.set_phantom_walls)、
+    センサーで見た壁を多数決で決めるMazeSolverと、以前のように重ねるだけ(見間違えるとWALL_VIRTUALになる)のものを比べる
+        stuck: 囲まれて動けなくなったなどで止まった走行の数
+        cover: 通ったタイルの割合(止まった走行も含む)
+        robot[s]: 機体が動いた時間の平均(止まった走行も含む)
+        replans: 経路が通る壁が塞がって経路を計算し直した回数の平均
+        phantom: 終わったときに、実際は壁がないのに通れないことになっている壁の数の平均(黒タイル・バンプ/坂の横は数えない)
+        conflicts: 終わったときにWallCheckで見つかった食い違いの数の平均
+    最後にWallCheck.check_wallsの1回の時間(最後の走行のマップ全体)を表示する
+
+    python benchmark_walls.py --sizes 16 --seeds 20 --rates 0 0.005 0.01 0.02
+"""
+
+
+import argparse
+import time
+
+import numpy as np
+
+from MazeLogger import MazeLogger
+from MazeSimulator import MazeSimulator
+from MazeSolver import *
+from WallCheck import check_walls
+
+
+class OverlaySolver(MazeSolver):
+    """センサーで見た壁を重ねるだけで、通った壁も直さない(以前の書き方 比較用)"""
+
+    def set_map(self, status: int, direction_from_robot: int | None = None, is_tile: bool = False) -> bool:
+        if direction_from_robot is None or is_tile or status not in (WALL_NONE, WALL_EXIST):
+            return super().set_map(status, direction_from_robot, is_tile)
+        position = self.get_map_position(self.position, self.direction, direction_from_robot)
+        changed = self.map_maze.add_wall(position, status)
+        if changed:
+            self.notify_change(position)
+        return changed
+
+    def pass_walls(self, start_position: tuple[int, int], end_position: tuple[int, int]):
+        pass
+
+
+SOLVERS = {"overlay": OverlaySolver, "vote": MazeSolver}
+
+
+def to_maze_position(simulator: MazeSimulator, position: tuple[int, int]) -> tuple[int, int]:
+    """MazeSolverの座標(開始位置が(1,1)で北向き)をシミュレーターの迷路の座標にする関数"""
+    offset_y, offset_x = position[y]-1, position[x]-1
+    for _ in range(simulator.start_direction):
+        offset_y, offset_x = -offset_x, offset_y
+    return (simulator.start_position[y]+offset_y, simulator.start_position[x]+offset_x)
+
+
+def count_phantom_walls(simulator: MazeSimulator, solver: MazeSolver) -> int:
+    """MazeSolverのマップで通れないが、実際は壁がない壁のセルの数(黒タイル・バンプ/坂の隣の壁は数えない)"""
+    view = solver.map_maze.view()
+    top, left = solver.map_maze.top_left
+    count = 0
+    for index_y, index_x in zip(*np.nonzero(view & MASK_WALL_EXIST == WALL_EXIST)):
+        wall = to_maze_position(simulator, (int(index_y)+top, int(index_x)+left))
+        if not simulator.is_inside(wall) or sum(wall) % 2 == 0 or simulator.maze[wall] & MASK_WALL_EXIST == WALL_EXIST:
+            continue
+        neighbors = [(wall[y]+MV[direction][y], wall[x]+MV[direction][x]) for direction in range(4)]
+        if any(simulator.is_inside(tile) and sum(tile) % 2 == 0 and simulator.maze[tile] in (TILE_BLACK, TILE_BUMP_SLOPE)
+               for tile in neighbors):
+            continue
+        count += 1
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[16], help="迷路の一辺のタイル数")
+    parser.add_argument("--seeds", type=int, default=20, help="1つの大きさで試すシードの数(0から)")
+    parser.add_argument("--rates", type=float, nargs="+", default=[0.0, 0.005, 0.01, 0.02],
+                        help="壁がない向きを壁と見間違える確率")
+    parser.add_argument("--max-run", type=int, default=1, help="1つの指示で進む最大のタイル数")
+    args = parser.parse_args()
+
+    print("{:>7} {:>6} {:>8} {:>6} {:>7} {:>9} {:>8} {:>8} {:>10}".format(
+        "size", "rate", "walls", "stuck", "cover", "robot[s]", "replans", "phantom", "conflicts"))
+    for size in args.sizes:
+        for rate in args.rates:
+            for name, solver_class in SOLVERS.items():
+                stuck = visited = tiles = robot_time = replans = phantom = conflicts = 0
+                for seed in range(args.seeds):
+                    simulator = MazeSimulator.generate(size, size, seed, black_ratio=0.03, bump_ratio=0.02)
+                    simulator.set_phantom_walls(rate, seed)
+                    solver = solver_class(logger=MazeLogger(LOG_OFF), max_run=args.max_run)
+                    try:
+                        simulator.run(solver)
+                    except (IndexError, RuntimeError):
+                        stuck += 1
+                    visited += len(simulator.visited)
+                    tiles += simulator.count_tiles()
+                    robot_time += simulator.robot_time
+                    replans += solver.wall_replans
+                    phantom += count_phantom_walls(simulator, solver)
+                    conflicts += len(check_walls(solver.map_maze)["conflicts"])
+                print("{:>7} {:>6} {:>8} {:>6} {:>6.1f}% {:>9.1f} {:>8.2f} {:>8.2f} {:>10.2f}".format(
+                    "{0}x{0}".format(size), rate, name, stuck, visited/tiles*100, robot_time/args.seeds/1000,
+                    replans/args.seeds, phantom/args.seeds, conflicts/args.seeds))
+        repeat = 100
+        time_start = time.perf_counter()
+        for _ in range(repeat):
+            check_walls(solver.map_maze)
+        print("check_walls on the last {0}x{0} map: {1:.1f} us".format(size, (time.perf_counter()-time_start)/repeat*1e6))
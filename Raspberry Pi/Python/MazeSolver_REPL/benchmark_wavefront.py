@@ -0,0 +1,73 @@
+"""
+経路計算のベンチマーク(PLANNER_HEAPとPLANNER_WAVEFRONT)
+    探索済みの迷路で、次の3つにかかる時間を比較する
+        - 2点間の経路(北西の角から南東の角)
+        - 多くの未探索タイルのうち一番近いものへの経路
+        - マップ全体の距離(スタートに戻るコストの表など)
+    --seedで迷路とゴールにするタイルを変える
+
+    python benchmark_wavefront.py --sizes 10 50 100 --seed 0 --loops 0.1 1.0
+"""
+
+
+import argparse
+import random
+import time
+
+from MazeMap import MazeMap
+from MazeSimulator import MazeSimulator
+from MazeSolver import *
+from Wavefront import Wavefront
+
+
+def make_map(solver: MazeSolver, simulator: MazeSimulator):
+    """solverのマップをsimulatorの迷路をすべて探索し終わったマップにする関数
+
+    Args:
+        solver (MazeSolver): マップを書き換えるMazeSolver
+        simulator (MazeSimulator): 迷路を持つMazeSimulator
+    """
+    solver.map_maze = MazeMap(simulator.maze, UNKNOWN)
+    solver.map_size = [simulator.maze.shape[0]//2, simulator.maze.shape[1]//2]
+
+
+def measure(function, *args, repeat: int = 3) -> float:
+    """functionをrepeat回実行し、最短の実行時間[ms]を返す関数
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        time_start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter()-time_start)
+    return best*1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 100], help="迷路の一辺のタイル数")
+    parser.add_argument("--seed", type=int, default=0, help="迷路とゴールにするタイルのシード")
+    parser.add_argument("--loops", type=float, nargs="+", default=[0.1, 1.0], help="迷路のループの割合(loop_ratio)")
+    args = parser.parse_args()
+
+    solver = MazeSolver()
+    rng = random.Random(args.seed)
+    print("{:>9} {:>8} {:>10} {:>14} {:>14}".format("size", "loops", "query", "heap[ms]", "wavefront[ms]"))
+    for size in args.sizes:
+        for loop_ratio in args.loops:
+            make_map(solver, MazeSimulator.generate(size, size, args.seed, loop_ratio))
+            start_position = [1, 1]
+            goal_position = [size*2-1, size*2-1]
+            # 未探索タイルの代わりにランダムな20タイルをゴールにする
+            goal_positions = {(rng.randrange(size)*2+1, rng.randrange(size)*2+1) for _ in range(20)}
+            results = (
+                ("path", measure(solver.search_path, start_position, {tuple(goal_position)}, SOUTH,
+                                 lambda position: solver.calc_heuristic(position, goal_position)),
+                 measure(lambda: Wavefront(solver.map_maze).calc_path(start_position, goal_position, SOUTH))),
+                ("nearest", measure(solver.search_path, start_position, goal_positions, SOUTH),
+                 measure(lambda: Wavefront(solver.map_maze).calc_path_to_nearest(start_position, goal_positions, SOUTH))),
+                ("field", measure(solver.search_path, start_position, set(), SOUTH),
+                 measure(lambda: Wavefront(solver.map_maze).calc_distance(start_position, SOUTH))),
+            )
+            for query, heap_time, wavefront_time in results:
+                print("{:>9} {:8.1f} {:>10} {:14.2f} {:14.2f}".format(
+                    "{0}x{0}".format(size), loop_ratio, query, heap_time, wavefront_time))
@@ -1,14 +1,95 @@
+import argparse
+import asyncio
+import os
+
+from Checkpoint import Checkpoint
+from CostModel import CostModel
+from MazeLogger import MazeLogger
+from MazeProfiler import MazeProfiler
 from MazeSolver import *
+from PicoLink import open_serial, run_solver
+from VictimQueue import VictimQueue
+
+# python main.py /dev/ttyACM0 のようにシリアルポートを渡したときはPicoと1byteずつ(--max-runが2以上なら2byteずつ)通信する
+# 2つ目にディレクトリを渡すと、探索の状態を保存し、すでに保存されていればそこから再開する
+# REPLでは「v R H」のように入力すると、カメラで見つけた被災者(向きはRかL、名前はVICTIM_NAMES)として渡す
+parser = argparse.ArgumentParser()
+parser.add_argument("device", nargs="?", help="Picoのシリアルポート(省略するとREPL)")
+parser.add_argument("checkpoint", nargs="?", help="探索の状態を保存するディレクトリ")
+parser.add_argument("--profile", metavar="PATH", help="フェーズごとの時間などを集計して終わったときに書き出すファイル(.jsonか.csv)")
+parser.add_argument("--costs", metavar="PATH", help="経路計算で使う動作のコストの設定ファイル(JSON)")
+parser.add_argument("--max-run", type=int, default=1, help="1つの指示で進む最大のタイル数(2以上でPicoと2byteずつ通信する)")
+parser.add_argument("--frontier", choices=("lifo", "nearest", "gain"), default="lifo",
+                    help="探索の方針(benchmark_frontier.pyで機体が動く時間を比べて選ぶ 再開したときは保存した方針)")
+parser.add_argument("--chunked", action="store_true", help="マップを書き込んだところだけ確保するチャンクで持つ")
+parser.add_argument("--speculative", action="store_true", help="機体が動いている間に行き止まりからの経路を先読みする")
+parser.add_argument("--time-budget", type=float, metavar="SEC", help="競技の制限時間[s](間に合うようにスタートに戻る)")
+parser.add_argument("--time-margin", type=float, default=TIME_MARGIN/1000, metavar="SEC", help="スタートに戻る時間の余裕[s]")
+parser.add_argument("--check-walls", action="store_true", help="毎ステップ壁の食い違いを調べてログに出す(WallCheck)")
+parser.add_argument("--export", metavar="PATH", help="終わったときにマップ・姿勢・ステップごとの記録を書き出すファイル(MazeExport)")
+parser.add_argument("--record", metavar="PATH", help="ステップごとの記録を追記するファイル(python CostModel.py calibrateで使う)")
+args = parser.parse_args()
 
-mazesolver = MazeSolver()
+# シリアルのときはセンサーの情報と移動だけ、REPLのときはマップの描画まで出力する
+logger = MazeLogger(LOG_INFO if args.device is not None else LOG_DEBUG, record_path=args.record)
+cost_model = CostModel.load(args.costs) if args.costs is not None else None
+profiler = MazeProfiler() if args.profile is not None else None
+map_type = MAP_CHUNKED if args.chunked else MAP_DENSE
+frontier_strategy = {"lifo": FRONTIER_LIFO, "nearest": FRONTIER_NEAREST, "gain": FRONTIER_INFORMATION_GAIN}[args.frontier]
+time_budget = None if args.time_budget is None else int(args.time_budget*1000)
+time_margin = int(args.time_margin*1000)
+last_to_pico = None
+checkpoint = None
+if args.checkpoint is not None and os.path.exists(os.path.join(args.checkpoint, "journal.bin")):
+    mazesolver, last_to_pico = MazeSolver.restore(args.checkpoint, logger, cost_model=cost_model, max_run=args.max_run,
+                                                    speculative=args.speculative, map_type=map_type,
+                                                    time_budget=time_budget, time_margin=time_margin,
+                                                    check_walls=args.check_walls)
+    mazesolver.profiler = profiler
+else:
+    mazesolver = MazeSolver(frontier_strategy, logger=logger, profiler=profiler, cost_model=cost_model, max_run=args.max_run,
+                            speculative=args.speculative, map_type=map_type, time_budget=time_budget,
+                            time_margin=time_margin, check_walls=args.check_walls)
+# カメラの認識はvictim_queueにputする(VictimQueue.startで認識のスレッドを始める)
+victim_queue = VictimQueue()
+mazesolver.victim_queue = victim_queue
+if args.checkpoint is not None:
+    checkpoint = Checkpoint(args.checkpoint)
 continue_flag = True
 
-while continue_flag:
-    # 1byte受信
-    print("from_pico:", end="")
-    from_pico = int(input(), 2)
-    print("Receive a byte fron input:{:08b}".format(from_pico))
+try:
+    if args.device is not None:
+        fd = open_serial(args.device)
+        try:
+            asyncio.run(run_solver(fd, mazesolver, checkpoint=checkpoint, last_sent=last_to_pico, resend=True))
+        finally:
+            os.close(fd)
+            if checkpoint is not None:
+                checkpoint.close()
+        continue_flag = False
+
+    while continue_flag:
+        # 1byte受信
+        line = input("from_pico:")
+        if line.startswith("v "):
+            side, name = line.split()[1:]
+            victim_queue.put(RIGHT if side == "R" else LEFT, VICTIM_NAMES[name])
+            continue
+        from_pico = int(line, 2)
+        logger.info("Receive a byte fron input:{:08b}", from_pico)
 
-    continue_flag, to_pico = mazesolver.calc_to_pico(from_pico)
-    # 1byte送信
-    print("Send a byte to output:{:08b}".format(to_pico))
+        continue_flag, to_pico = mazesolver.calc_to_pico(from_pico)
+        # 1byte送信
+        logger.info("Send a byte to output:{:08b}", to_pico)
+        mazesolver.start_speculation()
+finally:
+    if args.export is not None:
+        mazesolver.export(args.export)
+    victim_queue.close()
+    logger.info("Victims: {}", victim_queue.stats())
+    if mazesolver.speculator is not None:
+        logger.info("Speculation: {}", mazesolver.speculator.stats())
+        mazesolver.speculator.close()
+    logger.close()
+    if profiler is not None:
+        profiler.export(args.profile)
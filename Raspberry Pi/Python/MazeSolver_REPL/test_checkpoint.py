@@ -0,0 +1,144 @@
+"""
+再開機能(Checkpoint, MazeSolver.restore)のテスト
+    MazeSimulatorの探索を途中で止め(ジャーナルの最後のステップは書きかけ)、チェックポイントのディレクトリから
+    MazeSolver.restoreで戻して最後まで探索したとき、止めずに探索したときと残りの指示が同じになるかを確かめる
+    カメラの被災者(VictimQueue)も入れ、最後のスナップショットより後のジャーナルに被災者の報告がある位置で止める
+    回転しただけで最初のタイルに入る前に止まった(tiles_movedが0の)ステップも、ジャーナルから同じ状態に戻るかを確かめる
+
+    python -m pytest test_checkpoint.py
+"""
+
+
+import os
+
+import pytest
+
+from Checkpoint import JOURNAL_RECORD_SIZE, Checkpoint
+from MazeLogger import MazeLogger
+from MazeSimulator import MazeSimulator
+from MazeSolver import *
+from VictimQueue import VictimQueue
+
+
+SNAPSHOT_INTERVAL = 16
+
+
+def make_simulator() -> MazeSimulator:
+    """テストに使う迷路(黒タイル・坂・銀タイル・被災者あり)を作る関数"""
+    return MazeSimulator.generate(8, 8, 0, loop_ratio=0.15, black_ratio=0.05, bump_ratio=0.05,
+                                  silver_ratio=0.05, victim_ratio=0.3)
+
+
+def make_solver(max_run: int) -> MazeSolver:
+    return MazeSolver(logger=MazeLogger(LOG_OFF), max_run=max_run, victim_queue=VictimQueue())
+
+
+def step(solver: MazeSolver, simulator: MazeSimulator, checkpoint: Checkpoint | None = None) -> tuple[bool, tuple[int, int]]:
+    """1ステップ進める関数(benchmark_checkpoint.stepと同じ)
+
+    Returns:
+        tuple[bool, tuple[int, int]]: 迷路探索継続フラグ, (picoに送ったデータ, 進むタイルの数)
+    """
+    from_pico = simulator.calc_from_pico()
+    simulator.detect_victims(solver.victim_queue)
+    continue_flag, to_pico, run_tiles = solver.calc_command(from_pico, simulator.tiles_moved)
+    if checkpoint is not None:
+        checkpoint.record(solver, from_pico, to_pico, simulator.tiles_moved)
+    simulator.apply(to_pico, run_tiles)
+    return continue_flag, (to_pico, run_tiles)
+
+
+def run_uninterrupted(max_run: int) -> list[tuple[int, int]]:
+    """止めずに探索したときの(to_pico, run_tiles)のリストを返す関数"""
+    simulator = make_simulator()
+    solver = make_solver(max_run)
+    moves = []
+    continue_flag = True
+    while continue_flag:
+        continue_flag, move = step(solver, simulator)
+        moves.append(move)
+    return moves
+
+
+def choose_kill_step(moves: list[tuple[int, int]]) -> int:
+    """半分より後で、最後のスナップショットより後に被災者を報告したステップがある止める位置を返す関数"""
+    reported = [(to_pico >> SHIFT_VICTIM_R | to_pico >> SHIFT_VICTIM_L) & MASK_VICTIM != VICTIM_NONE
+                for to_pico, _ in moves]
+    for kill_step in range(len(moves)//2, len(moves)):
+        if kill_step % SNAPSHOT_INTERVAL != 0 and any(reported[kill_step//SNAPSHOT_INTERVAL*SNAPSHOT_INTERVAL:kill_step]):
+            return kill_step
+    pytest.fail("no victim is reported after the last snapshot")
+
+
+def run_until_aborted(max_run: int, directory: str, kill_step: int) -> MazeSimulator:
+    """kill_stepステップ進めたところで、ジャーナルを閉じずに止める関数
+
+    止まったときに書きかけだった次のステップの半分をジャーナルの最後に足しておく(restoreでは捨てられる)
+
+    Returns:
+        MazeSimulator: 止まったときの機体(Picoは止まらないので、再開した後もそのまま使う)
+    """
+    simulator = make_simulator()
+    solver = make_solver(max_run)
+    checkpoint = Checkpoint(directory, SNAPSHOT_INTERVAL)
+    for _ in range(kill_step):
+        step(solver, simulator, checkpoint)
+    os.write(checkpoint.journal_fd, bytes(JOURNAL_RECORD_SIZE//2))
+    os.close(checkpoint.journal_fd)
+    return simulator
+
+
+@pytest.mark.parametrize("max_run", [1, 8])
+def test_restore_matches_uninterrupted_run(tmp_path, max_run):
+    moves = run_uninterrupted(max_run)
+    kill_step = choose_kill_step(moves)
+    simulator = run_until_aborted(max_run, str(tmp_path), kill_step)
+
+    checkpoint = Checkpoint(str(tmp_path), SNAPSHOT_INTERVAL)
+    assert checkpoint.steps == kill_step
+    solver, last_to_pico = MazeSolver.restore(str(tmp_path), MazeLogger(LOG_OFF), max_run=max_run,
+                                              victim_queue=VictimQueue())
+    assert last_to_pico == moves[kill_step-1][0]
+    moves_resumed = []
+    continue_flag = True
+    while continue_flag:
+        continue_flag, move = step(solver, simulator, checkpoint)
+        moves_resumed.append(move)
+    checkpoint.close()
+    assert moves_resumed == moves[kill_step:]
+
+
+def test_restore_rejects_mismatched_journal(tmp_path):
+    moves = run_uninterrupted(1)
+    kill_step = choose_kill_step(moves)
+    run_until_aborted(1, str(tmp_path), kill_step)
+
+    # 最後のスナップショットより後のステップの移動を書き換える
+    corrupted = kill_step-1
+    with open(os.path.join(str(tmp_path), "journal.bin"), "r+b") as file:
+        file.seek(corrupted*JOURNAL_RECORD_SIZE+2)
+        to_pico = file.read(1)[0]
+        file.seek(-1, os.SEEK_CUR)
+        file.write(bytes((to_pico ^ MOVE_BACK,)))
+    with pytest.raises(RuntimeError, match="journal step {} ".format(corrupted)):
+        MazeSolver.restore(str(tmp_path), MazeLogger(LOG_OFF), max_run=1, victim_queue=VictimQueue())
+
+
+@pytest.mark.parametrize("max_run", [1, 8])
+def test_restore_replays_stop_before_first_tile(tmp_path, max_run):
+    # 3ステップごとに回転しただけで止まる(tiles_movedが0)走行も、ジャーナルから同じ状態に戻る
+    simulator = make_simulator()
+    solver = make_solver(max_run)
+    checkpoint = Checkpoint(str(tmp_path), SNAPSHOT_INTERVAL)
+    continue_flag = True
+    while continue_flag:
+        from_pico = simulator.calc_from_pico()
+        simulator.detect_victims(solver.victim_queue)
+        continue_flag, to_pico, run_tiles = solver.calc_command(from_pico, simulator.tiles_moved)
+        checkpoint.record(solver, from_pico, to_pico, simulator.tiles_moved)
+        simulator.apply(to_pico, 0 if continue_flag and solver.steps % 3 == 0 else run_tiles)
+    checkpoint.close()
+    assert len(simulator.visited) == simulator.count_tiles()
+
+    restored, _ = MazeSolver.restore(str(tmp_path), MazeLogger(LOG_OFF), max_run=max_run, victim_queue=VictimQueue())
+    assert restored.get_state() == solver.get_state()